@@ -1,6 +1,15 @@
+import atexit
+
 from django.apps import AppConfig
+from django.core.signals import request_finished
 
 
 class AiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ai"
+
+    def ready(self):
+        from ai.events import buffer
+
+        request_finished.connect(buffer.flush_if_due, dispatch_uid="ai.events")
+        atexit.register(buffer.flush)
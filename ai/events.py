@@ -0,0 +1,104 @@
+"""
+Impression and click capture for served recommendations.
+
+Events are appended to ``RecommendationEvent`` through an in-process
+buffer that writes with one ``bulk_create`` once it holds
+``RECOMMENDATION_EVENT_BATCH_SIZE`` events or its oldest event is
+``RECOMMENDATION_EVENT_FLUSH_INTERVAL`` seconds old (checked on every add
+and at the end of each request). Each event carries the model id and
+confidence bucket of its recommendation, so click-through rates roll up
+without joining back to ``ml_recommendation``. Events are telemetry: a
+failed write is logged and dropped rather than failing the request, and
+a crash loses at most one buffer.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from ai.models import RecommendationEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "RECOMMENDATION_EVENT_BATCH_SIZE", 500)
+FLUSH_INTERVAL = getattr(settings, "RECOMMENDATION_EVENT_FLUSH_INTERVAL", 5)
+
+
+def confidence_bucket(score):
+    """Decile of a 0-1 confidence score, 0 to 9."""
+    return min(9, max(0, int(score * 10)))
+
+
+class EventBuffer:
+    def __init__(self, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._events = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, events):
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            due = len(self._events) >= self.batch_size
+        if due or self.is_due():
+            self.flush()
+
+    def is_due(self):
+        oldest = self._oldest
+        return oldest is not None and time.monotonic() - oldest >= self.interval
+
+    def flush_if_due(self, **kwargs):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        """Write buffered events; returns how many were written."""
+        with self._lock:
+            events, self._events, self._oldest = self._events, [], None
+        if not events:
+            return 0
+        try:
+            RecommendationEvent.objects.bulk_create(events, batch_size=self.batch_size)
+        except DatabaseError:
+            logger.exception("Dropped %d recommendation events", len(events))
+            return 0
+        return len(events)
+
+    def clear(self):
+        with self._lock:
+            self._events, self._oldest = [], None
+
+
+buffer = EventBuffer()
+
+
+def _event(kind, child_id, recommendation):
+    return RecommendationEvent(
+        recommendation_id=recommendation["recommendation_id"],
+        child_id=child_id,
+        lesson_id=recommendation["lesson_id"],
+        model_id=recommendation["model_id"],
+        confidence_bucket=confidence_bucket(recommendation["confidence_score"]),
+        kind=kind,
+    )
+
+
+def record_impressions(child_id, recommendations):
+    """Log that ``recommendations`` (``top_recommendations`` rows) were shown."""
+    buffer.add(
+        _event(RecommendationEvent.Kind.IMPRESSION, child_id, row)
+        for row in recommendations
+    )
+
+
+def record_click(child_id, recommendation):
+    buffer.add([_event(RecommendationEvent.Kind.CLICK, child_id, recommendation)])
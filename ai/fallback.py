@@ -0,0 +1,263 @@
+"""
+In-process fallback recommender for children without fresh batch rows.
+
+Published lessons are loaded into a small NumPy matrix (difficulty, tags,
+popularity from completions, average quiz score), so scoring a child is a
+handful of vector operations with no database round trip. The matrix is
+built on first use and rebuilt in a background thread every
+``FALLBACK_RECOMMENDER_REFRESH`` seconds; requests keep using the previous
+matrix meanwhile. Served picks are stored as ``Recommendation`` rows of the
+built-in ``MLModel`` so impressions, clicks and CTR are tracked like batch
+output; those rows are served for ``FALLBACK_RECOMMENDATION_TTL`` seconds
+only, then replaced by fresh picks (or by batch rows once they arrive).
+NumPy is imported on first use, so processes that never fall back do not
+load it; without NumPy installed the fallback serves nothing.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from ai.models import MLModel, Recommendation
+from core.cache import model_cache
+from lessons.models import lesson
+from profiles.models import ChildProfile
+from progress.models import Progress
+from quizzes.models import QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+REFRESH = getattr(settings, "FALLBACK_RECOMMENDER_REFRESH", 600)
+TTL = getattr(settings, "FALLBACK_RECOMMENDATION_TTL", 3600)
+MODEL_NAME = "builtin-fallback"
+MODEL_VERSION = "1"
+DIFFICULTY = {value: index for index, value in enumerate(lesson.Difficulty.values)}
+LEVEL = {value: index for index, value in enumerate(ChildProfile.LearningLevel.values)}
+# Score = fit to the child's level + popularity + quiz results + tag affinity.
+WEIGHTS = {"fit": 0.4, "popularity": 0.25, "quality": 0.15, "affinity": 0.2}
+REASON = "Suggested for your level from popular lessons"
+
+
+@lru_cache(maxsize=None)
+def numpy():
+    """The ``numpy`` module, or ``None`` when it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class LessonMatrix:
+    """Published lessons as parallel arrays, one row per lesson."""
+
+    __slots__ = (
+        "ids",
+        "position",
+        "difficulty",
+        "popularity",
+        "quality",
+        "tags",
+        "details",
+    )
+
+    def __init__(self, rows, completions, scores):
+        np = numpy()
+        tag_index = {}
+        for row in rows:
+            for tag in row["tags"] or ():
+                tag_index.setdefault(str(tag), len(tag_index))
+        count = len(rows)
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.position = {row["id"]: index for index, row in enumerate(rows)}
+        self.difficulty = np.array(
+            [DIFFICULTY.get(row["difficulty"], 0) for row in rows], dtype=np.float32
+        )
+        done = np.array([completions.get(row["id"], 0) for row in rows], np.float32)
+        self.popularity = np.log1p(done) / max(math.log1p(done.max(initial=0)), 1.0)
+        self.quality = np.clip(
+            np.array([scores.get(row["id"], 50.0) for row in rows], np.float32) / 100,
+            0,
+            1,
+        )
+        self.tags = np.zeros((count, max(len(tag_index), 1)), dtype=np.float32)
+        for index, row in enumerate(rows):
+            for tag in row["tags"] or ():
+                self.tags[index, tag_index[str(tag)]] = 1.0
+        self.details = [
+            {
+                "lesson_id": row["id"],
+                "title": row["title"],
+                "slug": row["slug"],
+                "thumbnail_url": row["thumbnail_url"],
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def load(cls):
+        rows = list(
+            lesson.objects.filter(is_published=True)
+            .order_by("pk")
+            .values("id", "title", "slug", "thumbnail_url", "difficulty", "tags")
+        )
+        completions = dict(
+            Progress.objects.filter(status=Progress.Status.COMPLETED)
+            .values("lesson_id")
+            .annotate(n=Count("id"))
+            .order_by()
+            .values_list("lesson_id", "n")
+        )
+        scores = dict(
+            QuizAttempt.objects.values("quiz__lesson_id")
+            .annotate(avg=Avg("score"))
+            .order_by()
+            .values_list("quiz__lesson_id", "avg")
+        )
+        return cls(rows, completions, {k: float(v) for k, v in scores.items()})
+
+    def __len__(self):
+        return len(self.ids)
+
+    def top(self, learning_level, age, completed=(), limit=5):
+        """``[(row, score)]`` best first, skipping ``completed`` lesson ids."""
+        if not len(self):
+            return []
+        np = numpy()
+        target = LEVEL.get(learning_level, 0) + (age - 5) * 0.25
+        fit = 1 - np.abs(self.difficulty - target) / 2
+        seen = [self.position[pk] for pk in completed if pk in self.position]
+        affinity = 0
+        if seen:
+            profile = self.tags[seen].sum(axis=0)
+            overlap = self.tags @ profile
+            affinity = overlap / max(float(overlap.max()), 1.0)
+        scores = (
+            WEIGHTS["fit"] * fit
+            + WEIGHTS["popularity"] * self.popularity
+            + WEIGHTS["quality"] * self.quality
+            + WEIGHTS["affinity"] * affinity
+        )
+        scores[seen] = -1
+        limit = min(limit, len(self) - len(seen))
+        if limit <= 0:
+            return []
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(row), float(scores[row])) for row in best]
+
+
+def expired_before():
+    """Fallback rows generated before this moment are no longer served."""
+    return timezone.now() - timedelta(seconds=TTL)
+
+
+class FallbackRecommender:
+    def __init__(self, refresh=REFRESH):
+        self.refresh = refresh
+        self._matrix = None
+        self._built_at = 0.0
+        self._model_id = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def matrix(self):
+        """The current matrix, built inline only the first time."""
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    self._set(LessonMatrix.load())
+        elif time.monotonic() - self._built_at >= self.refresh:
+            self._rebuild_in_background()
+        return self._matrix
+
+    def _set(self, matrix):
+        self._matrix = matrix
+        self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self._set(LessonMatrix.load())
+        except Exception:
+            logger.exception("Fallback recommender refresh failed")
+            self._built_at = time.monotonic()
+        finally:
+            self._rebuilding = False
+            # This thread's own connections; they would otherwise leak.
+            connections.close_all()
+
+    def invalidate(self):
+        with self._lock:
+            self._matrix = None
+            self._model_id = None
+
+    def model_id(self):
+        if self._model_id is None:
+            model, _ = MLModel.objects.get_or_create(
+                name=MODEL_NAME,
+                version=MODEL_VERSION,
+                defaults={
+                    "file_path": __name__,
+                    "metadata": {"weights": WEIGHTS},
+                },
+            )
+            self._model_id = model.pk
+        return self._model_id
+
+    def recommend(self, child_id, limit=5):
+        """Score, store and return picks in ``top_recommendations`` format."""
+        if numpy() is None:
+            return []
+        child = model_cache.get(ChildProfile, pk=child_id)
+        completed = Progress.objects.filter(
+            child_id=child_id, status=Progress.Status.COMPLETED
+        ).values_list("lesson_id", flat=True)
+        matrix = self.matrix()
+        picks = matrix.top(child.learning_level, child.age, set(completed), limit)
+        if not picks:
+            return []
+        model_id = self.model_id()
+        # Earlier picks have expired; they are only kept for the TTL.
+        Recommendation.objects.filter(
+            child_id=child_id, model_id=model_id, generated_at__lt=expired_before()
+        ).delete()
+        stored = Recommendation.objects.bulk_create(
+            [
+                Recommendation(
+                    child_id=child_id,
+                    lesson_id=matrix.details[row]["lesson_id"],
+                    confidence_score=round(min(1.0, max(0.0, score)), 4),
+                    reason=REASON,
+                    model_id=model_id,
+                )
+                for row, score in picks
+            ]
+        )
+        return [
+            {
+                "recommendation_id": recommendation.pk,
+                **matrix.details[row],
+                "confidence_score": recommendation.confidence_score,
+                "reason": REASON,
+                "model_id": model_id,
+            }
+            for recommendation, (row, _) in zip(stored, picks)
+        ]
+
+
+recommender = FallbackRecommender()
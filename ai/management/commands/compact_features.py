@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ai.pipeline import HISTORY_DAYS, compact_features
+from core.routers import ml_connection
+
+
+class Command(BaseCommand):
+    help = "Delete feature versions superseded for longer than the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=HISTORY_DAYS,
+            help="Keep superseded versions this many days (default: %(default)s)",
+        )
+
+    def handle(self, *args, **options):
+        with ml_connection():
+            deleted = compact_features(keep_days=options["keep_days"])
+        for table, count in deleted.items():
+            self.stdout.write(f"  {table}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {sum(deleted.values())} superseded rows")
+        )
@@ -1,5 +1,7 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 
 from lessons.models import lesson
 from profiles.models import ChildProfile
@@ -85,6 +87,12 @@ class LessonInteractionsRaw(BaseInteractionModel):
         validators=[MinValueValidator(0), MaxValueValidator(150)],
         help_text="Raw video watch percentage (0-150)",
     )
+    activity_completion_percentage = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        help_text="Share of playground activity rounds answered (0-100)",
+    )
     number_of_clicks = models.IntegerField(help_text="Number of clicks/interactions")
     completion_status = models.BooleanField(help_text="Whether lesson was completed")
     received_at = models.DateTimeField(auto_now_add=True)
@@ -94,6 +102,8 @@ class LessonInteractionsRaw(BaseInteractionModel):
         indexes = [
             models.Index(fields=["ml_student_id", "received_at"]),
             models.Index(fields=["student_uuid", "received_at"]),
+            # Daily analytics rollups scan from their watermark.
+            models.Index(fields=["received_at"]),
         ]
 
     def __str__(self):
@@ -134,6 +144,9 @@ class ProgressRaw(BaseInteractionModel):
 
     class Meta:
         db_table = "ml_progress_raw"
+        indexes = [
+            models.Index(fields=["ml_student_id"]),
+        ]
 
     def __str__(self):
         return f"Progress Raw - Student {self.ml_student_id}"
@@ -161,6 +174,7 @@ class LessonInteractionsClean(BaseInteractionModel):
         db_table = "ml_lesson_interactions_clean"
         indexes = [
             models.Index(fields=["child", "lesson_id"]),
+            models.Index(fields=["ml_student_id"]),
         ]
 
     def __str__(self):
@@ -191,6 +205,9 @@ class QuizAttemptsClean(BaseInteractionModel):
 
     class Meta:
         db_table = "ml_quiz_attempts_clean"
+        indexes = [
+            models.Index(fields=["ml_student_id"]),
+        ]
 
     def __str__(self):
         return f"Clean Quiz {self.lesson_id} - Attempt {self.attempt_number}"
@@ -234,6 +251,29 @@ class ProgressClean(models.Model):
         return f"Clean Progress - Student {self.ml_student_id}"
 
 
+class FeatureQuerySet(models.QuerySet):
+    """Versioned feature rows: one per student per ``computed_on`` day."""
+
+    def _newest_day(self):
+        return Subquery(
+            self.model.objects.filter(student_id=OuterRef("student_id"))
+            .order_by("-computed_on")
+            .values("computed_on")[:1]
+        )
+
+    def current(self):
+        """Each student's newest version."""
+        return self.filter(computed_on=self._newest_day())
+
+    def superseded(self):
+        """Versions a newer row for the same student replaces."""
+        return self.filter(computed_on__lt=self._newest_day())
+
+    def for_student(self, student_id):
+        """The newest version for one student, or ``None``."""
+        return self.filter(student_id=student_id).order_by("-computed_on").first()
+
+
 class LessonFeatures(models.Model):
     """Aggregated lesson features per student"""
 
@@ -250,10 +290,22 @@ class LessonFeatures(models.Model):
     avg_video_watch = models.FloatField(help_text="Average video watch percentage")
     avg_clicks = models.FloatField(help_text="Average number of clicks per lesson")
     completion_rate = models.FloatField(help_text="Lesson completion rate")
+    computed_on = models.DateField(
+        default=timezone.localdate, help_text="Day this version of the row is for"
+    )
     computed_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FeatureQuerySet.as_manager()
+
     class Meta:
         db_table = "ml_lesson_features"
+        # Also serves lookups by student_id alone.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_id", "computed_on"],
+                name="unique_lesson_features_student_day",
+            )
+        ]
 
     def __str__(self):
         return f"Lesson Features - Student {self.student_id}"
@@ -275,10 +327,22 @@ class QuizFeatures(models.Model):
     avg_wrong_questions = models.FloatField(help_text="Average wrong questions")
     avg_response_time = models.FloatField(help_text="Average response time")
     avg_attempt_number = models.FloatField(help_text="Average attempt number")
+    computed_on = models.DateField(
+        default=timezone.localdate, help_text="Day this version of the row is for"
+    )
     computed_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FeatureQuerySet.as_manager()
+
     class Meta:
         db_table = "ml_quiz_features"
+        # Also serves lookups by student_id alone.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_id", "computed_on"],
+                name="unique_quiz_features_student_day",
+            )
+        ]
 
     def __str__(self):
         return f"Quiz Features - Student {self.student_id}"
@@ -310,10 +374,22 @@ class ProgressLabeled(models.Model):
         choices=MasteryLevel.choices,
         help_text="Mastery level classification",
     )
+    computed_on = models.DateField(
+        default=timezone.localdate, help_text="Day this version of the row is for"
+    )
     computed_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FeatureQuerySet.as_manager()
+
     class Meta:
         db_table = "ml_progress_labeled"
+        # Also serves lookups by student_id alone.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_id", "computed_on"],
+                name="unique_progress_labeled_student_day",
+            )
+        ]
 
     def __str__(self):
         return f"Progress Labeled - Student {self.student_id} ({self.mastery_level})"
@@ -413,3 +489,35 @@ class Recommendation(models.Model):
 
     def __str__(self):
         return f"Recommend {self.lesson.title} for {self.child.user.username}"
+
+
+class RecommendationEvent(models.Model):
+    """Append-only impression/click stream for served recommendations"""
+
+    class Kind(models.TextChoices):
+        IMPRESSION = "impression", "Impression"
+        CLICK = "click", "Click"
+
+    recommendation_id = models.BigIntegerField(
+        help_text="Recommendation ID from ml_recommendation"
+    )
+    child_id = models.BigIntegerField(help_text="ChildProfile ID")
+    lesson_id = models.IntegerField(help_text="Lesson ID from lessons_lesson")
+    model_id = models.IntegerField(
+        null=True, blank=True, help_text="MLModel ID that produced the recommendation"
+    )
+    confidence_bucket = models.PositiveSmallIntegerField(
+        help_text="Confidence score decile (0 = 0.0-0.1 ... 9 = 0.9-1.0)"
+    )
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "ml_recommendation_event"
+        indexes = [
+            models.Index(fields=["occurred_at"]),
+            models.Index(fields=["child_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of recommendation {self.recommendation_id}"
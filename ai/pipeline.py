@@ -0,0 +1,294 @@
+"""
+Backend side of the ML data flow: raw -> clean -> features.
+
+Cleaning clips raw values into the ranges the clean tables declare. The
+clipping runs in the database (``Greatest``/``Least``) and rows are
+streamed through in chunks, so memory does not grow with table size.
+Wrap calls in ``core.routers.ml_connection()`` to run them on the ML
+team's connection.
+
+Feature tables keep one row per student per day. A recompute upserts
+today's row and skips students whose features have not changed, so
+readers find the newest version with one indexed lookup
+(``FeatureQuerySet.for_student``/``current``). ``compact_features`` drops
+superseded versions older than ``FEATURE_HISTORY_DAYS``.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, F, FloatField, Max, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from ai.models import (
+    LessonFeatures,
+    LessonInteractionsClean,
+    LessonInteractionsRaw,
+    ProgressClean,
+    ProgressLabeled,
+    ProgressRaw,
+    QuizAttemptsClean,
+    QuizAttemptsRaw,
+    QuizFeatures,
+)
+
+CHUNK_SIZE = 5_000
+ML_KEYS = ("ml_student_id", "student_uuid", "child_id")
+HISTORY_DAYS = getattr(settings, "FEATURE_HISTORY_DAYS", 30)
+LESSON_FEATURES = ("avg_time_spent", "avg_video_watch", "avg_clicks", "completion_rate")
+QUIZ_FEATURES = (
+    "avg_score",
+    "avg_wrong_questions",
+    "avg_response_time",
+    "avg_attempt_number",
+)
+
+
+def _clip(field, low, high):
+    return Greatest(Least(F(field), Value(high)), Value(low))
+
+
+def _batched(iterable, size=CHUNK_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(model, rows):
+    """Append raw rows (dicts of field values); returns the number written."""
+    written = 0
+    for batch in _batched(model(**row) for row in rows):
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def _stream_clean(raw, target, fields):
+    written = 0
+    columns = [*ML_KEYS, *fields]
+    rows = raw.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+    for batch in _batched(rows):
+        target.objects.bulk_create(
+            target(**dict(zip([*ML_KEYS, *fields.values()], row))) for row in batch
+        )
+        written += len(batch)
+    return written
+
+
+def _since(queryset, since):
+    return queryset.filter(received_at__gt=since) if since else queryset
+
+
+def clean_lesson_interactions(since=None):
+    raw = _since(LessonInteractionsRaw.objects.all(), since).annotate(
+        c_time=_clip("time_spent", 1.0, 30.0),
+        c_watch=_clip("video_watch_percentage", 0.0, 100.0),
+        c_clicks=Greatest(F("number_of_clicks"), Value(0)),
+    )
+    return _stream_clean(
+        raw,
+        LessonInteractionsClean,
+        {
+            "lesson_id": "lesson_id",
+            "c_time": "time_spent",
+            "c_watch": "video_watch_percentage",
+            "c_clicks": "number_of_clicks",
+            "completion_status": "completion_status",
+        },
+    )
+
+
+def clean_quiz_attempts(since=None):
+    raw = _since(QuizAttemptsRaw.objects.all(), since).annotate(
+        c_attempt=_clip("attempt_number", 1, 3),
+        c_score=_clip("score", 0.0, 100.0),
+        c_wrong=_clip("wrong_questions", 0, 4),
+        c_response=_clip("response_time", 5.0, 150.0),
+    )
+    return _stream_clean(
+        raw,
+        QuizAttemptsClean,
+        {
+            "lesson_id": "lesson_id",
+            "c_attempt": "attempt_number",
+            "c_score": "score",
+            "c_wrong": "wrong_questions",
+            "c_response": "response_time",
+        },
+    )
+
+
+def clean_progress(since=None):
+    """Keep each student's latest raw summary, clipped, in ``ProgressClean``."""
+    raw = (
+        _since(ProgressRaw.objects.all(), since)
+        .annotate(
+            c_completed=Greatest(F("lessons_completed"), Value(0)),
+            c_badges=_clip("badges_earned", 0, 12),
+            c_streak=_clip("streak_days", 0, 50),
+            c_mastery=_clip("topic_mastery", 0.0, 100.0),
+        )
+        .order_by("ml_student_id", "-received_at", "-pk")
+        .values_list(
+            "ml_student_id",
+            "child_id",
+            "c_completed",
+            "c_badges",
+            "c_streak",
+            "c_mastery",
+        )
+    )
+    written, previous = 0, None
+    latest = []
+    for row in raw.iterator(chunk_size=CHUNK_SIZE):
+        if row[0] == previous:
+            continue
+        previous = row[0]
+        latest.append(row)
+    for batch in _batched(latest):
+        ProgressClean.objects.bulk_create(
+            [
+                ProgressClean(
+                    ml_student_id=ml_id,
+                    child_id=child_id,
+                    lessons_completed=completed,
+                    badges_earned=badges,
+                    streak_days=streak,
+                    topic_mastery=mastery,
+                )
+                for ml_id, child_id, completed, badges, streak, mastery in batch
+            ],
+            update_conflicts=True,
+            unique_fields=["ml_student_id"],
+            update_fields=[
+                "child",
+                "lessons_completed",
+                "badges_earned",
+                "streak_days",
+                "topic_mastery",
+            ],
+        )
+        written += len(batch)
+    return written
+
+
+def _same(old, new, fields):
+    return old["child"] == new["child"] and all(
+        math.isclose(old[name], new[name], rel_tol=1e-9, abs_tol=1e-9)
+        for name in fields
+    )
+
+
+def _upsert_features(model, rows, fields, day=None):
+    """
+    Upsert ``rows`` (dicts keyed by ``ml_student_id``) as ``day``'s version;
+    returns how many students changed.
+    """
+    day = day or timezone.localdate()
+    written = 0
+    for batch in _batched(rows):
+        ids = [row["ml_student_id"] for row in batch]
+        current = {
+            row["student_id"]: row
+            for row in model.objects.current()
+            .filter(student_id__in=ids)
+            .values("student_id", "child", *fields)
+        }
+        changed = [
+            model(
+                student_id=row["ml_student_id"],
+                child_id=row["child"],
+                computed_on=day,
+                **{name: row[name] for name in fields},
+            )
+            for row in batch
+            if row["ml_student_id"] not in current
+            or not _same(current[row["ml_student_id"]], row, fields)
+        ]
+        model.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["student_id", "computed_on"],
+            update_fields=["child", *fields, "computed_at"],
+        )
+        written += len(changed)
+    return written
+
+
+def compute_lesson_features(day=None):
+    rows = (
+        LessonInteractionsClean.objects.values("ml_student_id")
+        .annotate(
+            child=Max("child_id"),
+            avg_time_spent=Avg("time_spent"),
+            avg_video_watch=Avg("video_watch_percentage"),
+            avg_clicks=Avg("number_of_clicks"),
+            completion_rate=Avg(
+                Case(
+                    When(completion_status=True, then=Value(1.0)),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+            ),
+        )
+        .order_by()
+    )
+    return _upsert_features(
+        LessonFeatures, rows.iterator(chunk_size=CHUNK_SIZE), LESSON_FEATURES, day
+    )
+
+
+def compute_quiz_features(day=None):
+    rows = (
+        QuizAttemptsClean.objects.values("ml_student_id")
+        .annotate(
+            child=Max("child_id"),
+            avg_score=Avg("score"),
+            avg_wrong_questions=Avg("wrong_questions"),
+            avg_response_time=Avg("response_time"),
+            avg_attempt_number=Avg("attempt_number"),
+        )
+        .order_by()
+    )
+    return _upsert_features(
+        QuizFeatures, rows.iterator(chunk_size=CHUNK_SIZE), QUIZ_FEATURES, day
+    )
+
+
+def compact_features(keep_days=HISTORY_DAYS, chunk_size=CHUNK_SIZE, today=None):
+    """
+    Delete superseded feature versions older than ``keep_days``, in short
+    primary-key chunks; returns rows deleted per table.
+    """
+    cutoff = (today or timezone.localdate()) - timedelta(days=keep_days)
+    deleted = {}
+    for model in (LessonFeatures, QuizFeatures, ProgressLabeled):
+        stale = model.objects.superseded().filter(computed_on__lt=cutoff)
+        deleted[model._meta.db_table] = 0
+        while True:
+            pks = list(stale.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                model.objects.filter(pk__in=pks).delete()
+            deleted[model._meta.db_table] += len(pks)
+    return deleted
+
+
+def run(since=None):
+    """Run the whole raw -> clean -> features pass; returns rows per step."""
+    return {
+        "lesson_interactions_clean": clean_lesson_interactions(since),
+        "quiz_attempts_clean": clean_quiz_attempts(since),
+        "progress_clean": clean_progress(since),
+        "lesson_features": compute_lesson_features(),
+        "quiz_features": compute_quiz_features(),
+    }
@@ -0,0 +1,46 @@
+from ai import fallback
+from ai.models import Recommendation
+from progress.models import Progress
+
+
+def top_recommendations(child_id, limit=5, since=None):
+    """
+    Highest-confidence published lessons recommended to a child, skipping
+    lessons the child has completed and expired fallback picks.
+    """
+    completed = Progress.objects.filter(
+        child_id=child_id, status=Progress.Status.COMPLETED
+    ).values("lesson_id")
+    rows = (
+        Recommendation.objects.filter(child_id=child_id, lesson__is_published=True)
+        .exclude(lesson_id__in=completed)
+        .exclude(
+            model__name=fallback.MODEL_NAME,
+            generated_at__lt=fallback.expired_before(),
+        )
+    )
+    if since is not None:
+        rows = rows.filter(generated_at__gte=since)
+    rows = rows.order_by("-confidence_score").values(
+        "id",
+        "lesson_id",
+        "lesson__title",
+        "lesson__slug",
+        "lesson__thumbnail_url",
+        "confidence_score",
+        "reason",
+        "model_id",
+    )[:limit]
+    return [
+        {
+            "recommendation_id": row["id"],
+            "lesson_id": row["lesson_id"],
+            "title": row["lesson__title"],
+            "slug": row["lesson__slug"],
+            "thumbnail_url": row["lesson__thumbnail_url"],
+            "confidence_score": row["confidence_score"],
+            "reason": row["reason"],
+            "model_id": row["model_id"],
+        }
+        for row in rows
+    ]
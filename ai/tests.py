@@ -1,3 +1,299 @@
-# from django.test import TestCase
+from datetime import date, timedelta
+from unittest import skipIf
 
-# Create your tests here.
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ai import events, fallback, pipeline
+from ai.models import (
+    LessonFeatures,
+    LessonInteractionsClean,
+    LessonInteractionsRaw,
+    MLModel,
+    ProgressClean,
+    ProgressRaw,
+    Recommendation,
+    RecommendationEvent,
+)
+from ai.recommendations import top_recommendations
+from lessons.models import lesson
+from profiles.models import ChildProfile, TeacherProfile, User
+from progress.models import Progress
+
+
+class PipelineTests(TestCase):
+    def test_raw_rows_are_clipped_into_clean_ranges(self):
+        pipeline.ingest(
+            LessonInteractionsRaw,
+            [
+                dict(
+                    ml_student_id=1,
+                    lesson_id=3,
+                    time_spent=45.0,
+                    video_watch_percentage=140.0,
+                    number_of_clicks=-2,
+                    completion_status=True,
+                ),
+                dict(
+                    ml_student_id=1,
+                    lesson_id=4,
+                    time_spent=0.2,
+                    video_watch_percentage=50.0,
+                    number_of_clicks=6,
+                    completion_status=False,
+                ),
+            ],
+        )
+
+        pipeline.clean_lesson_interactions()
+        pipeline.compute_lesson_features()
+
+        clean = LessonInteractionsClean.objects.order_by("lesson_id")
+        self.assertEqual(
+            list(clean.values_list("time_spent", "video_watch_percentage")),
+            [(30.0, 100.0), (1.0, 50.0)],
+        )
+        self.assertEqual(clean[0].number_of_clicks, 0)
+        features = LessonFeatures.objects.get(student_id=1)
+        self.assertEqual(features.completion_rate, 0.5)
+        self.assertEqual(features.avg_clicks, 3.0)
+
+    def test_progress_keeps_latest_summary_per_student(self):
+        for mastery in (20.0, 120.0):
+            ProgressRaw.objects.create(
+                ml_student_id=9,
+                lessons_completed=2,
+                badges_earned=30,
+                streak_days=3,
+                topic_mastery=mastery,
+            )
+
+        pipeline.clean_progress()
+        pipeline.clean_progress()
+
+        clean = ProgressClean.objects.get()
+        self.assertEqual(clean.topic_mastery, 100.0)
+        self.assertEqual(clean.badges_earned, 12)
+
+
+class FeatureVersionTests(TestCase):
+    DAY = date(2025, 3, 10)
+
+    def interact(self, ml_student_id, time_spent):
+        LessonInteractionsClean.objects.create(
+            ml_student_id=ml_student_id,
+            lesson_id=1,
+            time_spent=time_spent,
+            video_watch_percentage=80.0,
+            number_of_clicks=4,
+            completion_status=True,
+        )
+
+    def test_recompute_skips_unchanged_and_updates_same_day(self):
+        self.interact(1, 10.0)
+        self.interact(2, 12.0)
+
+        self.assertEqual(pipeline.compute_lesson_features(self.DAY), 2)
+        self.assertEqual(pipeline.compute_lesson_features(self.DAY), 0)
+        self.interact(2, 20.0)
+        self.assertEqual(pipeline.compute_lesson_features(self.DAY), 1)
+
+        self.assertEqual(LessonFeatures.objects.count(), 2)
+        self.assertEqual(LessonFeatures.objects.for_student(2).avg_time_spent, 16.0)
+
+    def test_new_day_adds_version_and_compaction_keeps_latest(self):
+        self.interact(1, 10.0)
+        old_day = self.DAY - timedelta(days=40)
+        pipeline.compute_lesson_features(old_day)
+        self.interact(1, 20.0)
+        pipeline.compute_lesson_features(self.DAY)
+
+        self.assertEqual(LessonFeatures.objects.filter(student_id=1).count(), 2)
+        current = LessonFeatures.objects.current().get()
+        self.assertEqual(
+            (current.computed_on, current.avg_time_spent), (self.DAY, 15.0)
+        )
+
+        deleted = pipeline.compact_features(keep_days=30, today=self.DAY)
+
+        self.assertEqual(deleted["ml_lesson_features"], 1)
+        self.assertEqual(
+            list(LessonFeatures.objects.values_list("computed_on", flat=True)),
+            [self.DAY],
+        )
+
+
+class RecommendationEventTests(TestCase):
+    def setUp(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.lesson = lesson.objects.create(
+            title="Colours",
+            description="",
+            video_url="https://x",
+            teacher=teacher,
+            is_published=True,
+        )
+        self.model = MLModel.objects.create(name="ranker", version="2", file_path="-")
+        self.child = ChildProfile.objects.create(
+            user=User.objects.create_user("c@example.com", "c", "pw"), age=5
+        )
+        self.recommendation = Recommendation.objects.create(
+            child=self.child,
+            lesson=self.lesson,
+            confidence_score=0.87,
+            model=self.model,
+        )
+        self.client.force_login(self.child.user)
+        events.buffer.clear()
+        self.addCleanup(events.buffer.clear)
+
+    def test_served_and_clicked_recommendations_are_logged(self):
+        data = self.client.get(reverse("ai:recommendations")).json()
+        self.assertEqual(
+            data["results"][0]["recommendation_id"], self.recommendation.pk
+        )
+        response = self.client.post(
+            reverse("ai:recommendation-click", args=[self.recommendation.pk])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(RecommendationEvent.objects.count(), 0)
+
+        self.assertEqual(events.buffer.flush(), 2)
+
+        self.assertEqual(
+            list(
+                RecommendationEvent.objects.order_by("pk").values_list(
+                    "kind", "model_id", "confidence_bucket", "child_id"
+                )
+            ),
+            [
+                ("impression", self.model.pk, 8, self.child.pk),
+                ("click", self.model.pk, 8, self.child.pk),
+            ],
+        )
+
+    def test_completed_lessons_are_not_recommended(self):
+        Progress.objects.create(
+            child=self.child, lesson=self.lesson, status=Progress.Status.COMPLETED
+        )
+
+        self.assertEqual(top_recommendations(self.child.pk), [])
+
+    def test_click_on_another_childs_recommendation_is_404(self):
+        other = ChildProfile.objects.create(
+            user=User.objects.create_user("o@example.com", "o", "pw"), age=4
+        )
+        self.client.force_login(other.user)
+
+        response = self.client.post(
+            reverse("ai:recommendation-click", args=[self.recommendation.pk])
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(events.buffer), 0)
+
+    def test_buffer_writes_once_full(self):
+        buffer = events.EventBuffer(batch_size=3, interval=60)
+        row = {
+            "recommendation_id": self.recommendation.pk,
+            "lesson_id": self.lesson.pk,
+            "model_id": None,
+            "confidence_score": 1.0,
+        }
+
+        def impressions(count):
+            return [
+                events._event("impression", self.child.pk, row) for _ in range(count)
+            ]
+
+        buffer.add(impressions(2))
+        self.assertEqual(RecommendationEvent.objects.count(), 0)
+        with self.assertNumQueries(1):
+            buffer.add(impressions(1))
+
+        self.assertEqual(
+            RecommendationEvent.objects.filter(confidence_bucket=9).count(), 3
+        )
+        self.assertEqual(len(buffer), 0)
+
+
+@skipIf(fallback.numpy() is None, "numpy is not installed")
+class FallbackRecommenderTests(TestCase):
+    def setUp(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.lessons = {
+            title: lesson.objects.create(
+                title=title,
+                description="",
+                video_url="https://x",
+                teacher=teacher,
+                difficulty=difficulty,
+                tags=tags,
+                is_published=True,
+            )
+            for title, difficulty, tags in [
+                ("Counting", "easy", ["numbers"]),
+                ("Adding", "easy", ["numbers"]),
+                ("Shapes", "easy", ["shapes"]),
+                ("Fractions", "hard", ["numbers"]),
+            ]
+        }
+        self.child = ChildProfile.objects.create(
+            user=User.objects.create_user("c@example.com", "c", "pw"), age=4
+        )
+        Progress.objects.create(
+            child=self.child,
+            lesson=self.lessons["Counting"],
+            status=Progress.Status.COMPLETED,
+        )
+        fallback.recommender.invalidate()
+        self.addCleanup(fallback.recommender.invalidate)
+        events.buffer.clear()
+        self.addCleanup(events.buffer.clear)
+
+    def test_scores_by_level_and_tags_skipping_completed(self):
+        matrix = fallback.LessonMatrix.load()
+
+        picks = matrix.top(
+            self.child.learning_level, 4, {self.lessons["Counting"].pk}, limit=4
+        )
+
+        titles = [matrix.details[row]["title"] for row, _ in picks]
+        self.assertEqual(titles, ["Adding", "Shapes", "Fractions"])
+        self.assertGreater(picks[0][1], picks[1][1])
+
+    def test_child_without_batch_rows_gets_stored_fallback(self):
+        self.client.force_login(self.child.user)
+
+        first = self.client.get(reverse("ai:recommendations"), {"limit": 2}).json()
+        with self.assertNumQueries(3):  # session, user, stored recommendations
+            second = self.client.get(reverse("ai:recommendations"), {"limit": 2})
+
+        self.assertEqual(first["results"], second.json()["results"])
+        model = MLModel.objects.get(name=fallback.MODEL_NAME)
+        self.assertEqual(
+            Recommendation.objects.filter(child=self.child, model=model).count(), 2
+        )
+        self.assertEqual(first["results"][0]["title"], "Adding")
+
+    def test_expired_fallback_picks_are_recomputed(self):
+        self.client.force_login(self.child.user)
+        self.client.get(reverse("ai:recommendations"), {"limit": 2})
+        Recommendation.objects.update(
+            generated_at=timezone.now() - timedelta(seconds=fallback.TTL + 1)
+        )
+        self.assertEqual(top_recommendations(self.child.pk), [])
+
+        results = self.client.get(reverse("ai:recommendations"), {"limit": 2}).json()
+
+        fresh = Recommendation.objects.filter(child=self.child)
+        self.assertEqual(fresh.count(), 2)
+        self.assertEqual(
+            [row["recommendation_id"] for row in results["results"]],
+            list(fresh.order_by("-confidence_score").values_list("pk", flat=True)),
+        )
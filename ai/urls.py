@@ -0,0 +1,14 @@
+from django.urls import path
+
+from ai import views
+
+app_name = "ai"
+
+urlpatterns = [
+    path("recommendations/", views.recommendations, name="recommendations"),
+    path(
+        "recommendations/<int:pk>/click/",
+        views.recommendation_click,
+        name="recommendation-click",
+    ),
+]
@@ -1,3 +1,52 @@
-# from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from ai import events, fallback
+from ai.models import Recommendation
+from ai.recommendations import top_recommendations
+from profiles import access
+
+MAX_RECOMMENDATIONS = getattr(settings, "MAX_RECOMMENDATIONS", 20)
+STALE_AFTER = getattr(settings, "RECOMMENDATION_STALE_AFTER", 7 * 24 * 3600)
+
+
+@require_GET
+def recommendations(request):
+    """
+    The caller's top recommendations; each one served is logged. Children
+    without batch rows newer than ``RECOMMENDATION_STALE_AFTER`` seconds get
+    the in-process fallback instead.
+    """
+    child_id, error = access.child_id(request)
+    if error:
+        return error
+    try:
+        limit = min(MAX_RECOMMENDATIONS, max(1, int(request.GET.get("limit", 5))))
+    except ValueError:
+        return JsonResponse({"detail": "limit must be an integer"}, status=400)
+    since = timezone.now() - timedelta(seconds=STALE_AFTER)
+    rows = top_recommendations(child_id, limit, since)
+    if not rows:
+        rows = fallback.recommender.recommend(child_id, limit)
+    events.record_impressions(child_id, rows)
+    return JsonResponse({"results": rows})
+
+
+@require_POST
+def recommendation_click(request, pk):
+    """Record that the caller opened recommendation ``pk``."""
+    child_id, error = access.child_id(request)
+    if error:
+        return error
+    row = get_object_or_404(
+        Recommendation.objects.values("lesson_id", "model_id", "confidence_score"),
+        pk=pk,
+        child_id=child_id,
+    )
+    events.record_click(child_id, {"recommendation_id": pk, **row})
+    return HttpResponse(status=204)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import run
+
+
+class Command(BaseCommand):
+    help = "Roll new progress, quiz and recommendation rows into daily facts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Rebuild every day from scratch"
+        )
+
+    def handle(self, *args, **options):
+        first_day = run(full=options["full"])
+        if first_day is None:
+            self.stdout.write("Nothing to roll up")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt facts from {first_day}"))
@@ -0,0 +1,123 @@
+from django.db import models
+
+
+class DailyActivityFact(models.Model):
+    """Active children and activity per day and child age"""
+
+    day = models.DateField(help_text="UTC day")
+    child_age = models.PositiveSmallIntegerField(help_text="Child's age (4-6)")
+    active_children = models.IntegerField(
+        default=0,
+        help_text="Distinct children with a lesson interaction, completion or quiz",
+    )
+    lessons_completed = models.IntegerField(default=0)
+    quiz_attempts = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "analytics_daily_activity"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "child_age"], name="unique_daily_activity"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} age {self.child_age}: {self.active_children} active"
+
+
+class HourlyActivityFact(models.Model):
+    """Active children and activity per UTC hour and child age"""
+
+    day = models.DateField(help_text="UTC day")
+    hour = models.PositiveSmallIntegerField(help_text="UTC hour of the day (0-23)")
+    child_age = models.PositiveSmallIntegerField(help_text="Child's age (4-6)")
+    active_children = models.IntegerField(
+        default=0,
+        help_text="Distinct children with a lesson interaction, completion or quiz",
+    )
+    lessons_completed = models.IntegerField(default=0)
+    quiz_attempts = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "analytics_hourly_activity"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "hour", "child_age"], name="unique_hourly_activity"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.hour:02d}h age {self.child_age}"
+
+
+class DailyLessonFact(models.Model):
+    """Per-lesson activity per day and child age"""
+
+    day = models.DateField(help_text="UTC day")
+    lesson_id = models.IntegerField(help_text="Lesson ID from lessons_lesson")
+    difficulty = models.CharField(max_length=20, help_text="Lesson difficulty")
+    child_age = models.PositiveSmallIntegerField(help_text="Child's age (4-6)")
+    completions = models.IntegerField(default=0)
+    quiz_attempts = models.IntegerField(default=0)
+    quiz_score_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Sum of attempt scores"
+    )
+    recommendations = models.IntegerField(
+        default=0, help_text="Recommendations generated"
+    )
+
+    class Meta:
+        db_table = "analytics_daily_lesson"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "lesson_id", "child_age"], name="unique_daily_lesson"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["day", "difficulty"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} lesson {self.lesson_id} age {self.child_age}"
+
+
+class DailyRecommendationFact(models.Model):
+    """Recommendation impressions and clicks per day, model and confidence"""
+
+    day = models.DateField(help_text="UTC day")
+    model_id = models.IntegerField(
+        null=True, blank=True, help_text="MLModel ID (null for unattributed)"
+    )
+    confidence_bucket = models.PositiveSmallIntegerField(
+        help_text="Confidence score decile (0-9)"
+    )
+    impressions = models.IntegerField(default=0)
+    clicks = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "analytics_daily_recommendation"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "model_id", "confidence_bucket"],
+                name="unique_daily_recommendation",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} model {self.model_id} bucket {self.confidence_bucket}"
+
+
+class RollupWatermark(models.Model):
+    """How far each rollup has processed its sources"""
+
+    name = models.CharField(max_length=50, unique=True, help_text="Rollup name")
+    processed_until = models.DateTimeField(
+        help_text="Source rows at or after this time are not yet rolled up"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analytics_rollup_watermark"
+
+    def __str__(self):
+        return f"{self.name} @ {self.processed_until}"
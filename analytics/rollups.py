@@ -0,0 +1,215 @@
+"""
+Daily and hourly analytics rollups.
+
+Each run deletes the fact rows from the watermark's UTC day onwards and
+reinserts them with one set-based ``INSERT ... SELECT ... GROUP BY`` per
+table, so the
+analytics endpoint only ever reads a few pre-aggregated rows. Whole days
+are recomputed, which keeps distinct counts exact and makes reruns
+idempotent. The watermark trails the clock by ``ANALYTICS_ROLLUP_LAG``
+seconds so rows from transactions that commit late are still picked up.
+Rows stamped before the watermark (e.g. backfills) need ``full=True``.
+
+Facts only read timestamps that are never rewritten: quiz attempts,
+completion dates, append-only lesson interactions and recommendation
+rows. ``Progress.last_accessed`` is overwritten on every visit, so it is
+not used, and rebuilding a past day gives the same numbers every time.
+"""
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from ai.models import LessonInteractionsRaw, Recommendation, RecommendationEvent
+from analytics.models import (
+    DailyActivityFact,
+    DailyLessonFact,
+    DailyRecommendationFact,
+    HourlyActivityFact,
+    RollupWatermark,
+)
+from core.routers import primary_only
+from lessons.models import lesson
+from profiles.models import ChildProfile
+from progress.models import Progress
+from quizzes.models import Quiz, QuizAttempt
+
+ROLLUP_NAME = "daily"
+LAG = getattr(settings, "ANALYTICS_ROLLUP_LAG", 300)
+
+ACTIVITY_SQL = """
+INSERT INTO {activity} (day, child_age, active_children, lessons_completed,
+                        quiz_attempts)
+SELECT u.day, c.age, COUNT(DISTINCT u.child_id), SUM(u.completed), SUM(u.attempts)
+FROM (
+    SELECT DATE(i.received_at) AS day, i.child_id, 0 AS completed, 0 AS attempts
+    FROM {interaction} i WHERE i.child_id IS NOT NULL AND i.received_at >= %s
+    UNION ALL
+    SELECT DATE(p.completion_date), p.child_id, 1, 0
+    FROM {progress} p WHERE p.status = %s AND p.completion_date >= %s
+    UNION ALL
+    SELECT DATE(a.created_at), a.child_id, 0, 1
+    FROM {attempt} a WHERE a.created_at >= %s
+) u
+JOIN {child} c ON c.id = u.child_id
+GROUP BY u.day, c.age
+"""
+
+HOURLY_ACTIVITY_SQL = """
+INSERT INTO {hourly_activity} (day, hour, child_age, active_children,
+                               lessons_completed, quiz_attempts)
+SELECT u.day, u.hour, c.age, COUNT(DISTINCT u.child_id), SUM(u.completed),
+       SUM(u.attempts)
+FROM (
+    SELECT DATE(i.received_at) AS day, {interaction_hour} AS hour, i.child_id,
+           0 AS completed, 0 AS attempts
+    FROM {interaction} i WHERE i.child_id IS NOT NULL AND i.received_at >= %s
+    UNION ALL
+    SELECT DATE(p.completion_date), {completion_hour}, p.child_id, 1, 0
+    FROM {progress} p WHERE p.status = %s AND p.completion_date >= %s
+    UNION ALL
+    SELECT DATE(a.created_at), {attempt_hour}, a.child_id, 0, 1
+    FROM {attempt} a WHERE a.created_at >= %s
+) u
+JOIN {child} c ON c.id = u.child_id
+GROUP BY u.day, u.hour, c.age
+"""
+
+LESSON_SQL = """
+INSERT INTO {lesson_fact} (day, lesson_id, difficulty, child_age, completions,
+                           quiz_attempts, quiz_score_total, recommendations)
+SELECT u.day, u.lesson_id, l.difficulty, c.age,
+       SUM(u.completed), SUM(u.attempts), SUM(u.score), SUM(u.recommended)
+FROM (
+    SELECT DATE(p.completion_date) AS day, p.lesson_id, p.child_id,
+           1 AS completed, 0 AS attempts, 0 AS score, 0 AS recommended
+    FROM {progress} p WHERE p.status = %s AND p.completion_date >= %s
+    UNION ALL
+    SELECT DATE(a.created_at), q.lesson_id, a.child_id, 0, 1, a.score, 0
+    FROM {attempt} a JOIN {quiz} q ON q.id = a.quiz_id
+    WHERE a.created_at >= %s
+    UNION ALL
+    SELECT DATE(r.generated_at), r.lesson_id, r.child_id, 0, 0, 0, 1
+    FROM {recommendation} r WHERE r.generated_at >= %s
+) u
+JOIN {lesson} l ON l.id = u.lesson_id
+JOIN {child} c ON c.id = u.child_id
+GROUP BY u.day, u.lesson_id, l.difficulty, c.age
+"""
+
+RECOMMENDATION_SQL = """
+INSERT INTO {recommendation_fact} (day, model_id, confidence_bucket, impressions,
+                                   clicks)
+SELECT DATE(e.occurred_at), e.model_id, e.confidence_bucket,
+       SUM(CASE WHEN e.kind = %s THEN 1 ELSE 0 END),
+       SUM(CASE WHEN e.kind = %s THEN 1 ELSE 0 END)
+FROM {event} e WHERE e.occurred_at >= %s
+GROUP BY DATE(e.occurred_at), e.model_id, e.confidence_bucket
+"""
+
+FACTS = (
+    DailyActivityFact,
+    HourlyActivityFact,
+    DailyLessonFact,
+    DailyRecommendationFact,
+)
+
+
+def _tables():
+    models = {
+        "activity": DailyActivityFact,
+        "hourly_activity": HourlyActivityFact,
+        "lesson_fact": DailyLessonFact,
+        "recommendation_fact": DailyRecommendationFact,
+        "progress": Progress,
+        "interaction": LessonInteractionsRaw,
+        "attempt": QuizAttempt,
+        "quiz": Quiz,
+        "recommendation": Recommendation,
+        "event": RecommendationEvent,
+        "lesson": lesson,
+        "child": ChildProfile,
+    }
+    return {
+        name: connection.ops.quote_name(model._meta.db_table)
+        for name, model in models.items()
+    }
+
+
+def _hourly_activity(tables, since, completed):
+    """``HOURLY_ACTIVITY_SQL`` and its params; the hour is extracted in UTC."""
+    hours = {}
+    params = []
+    for name, column, condition in (
+        ("interaction_hour", "i.received_at", [since]),
+        ("completion_hour", "p.completion_date", [completed, since]),
+        ("attempt_hour", "a.created_at", [since]),
+    ):
+        hours[name], hour_params = connection.ops.datetime_extract_sql(
+            "hour", column, (), None
+        )
+        params += [*hour_params, *condition]
+    return HOURLY_ACTIVITY_SQL.format(**tables, **hours), params
+
+
+def earliest_source_time():
+    stamps = [
+        LessonInteractionsRaw.objects.aggregate(t=Min("received_at"))["t"],
+        Progress.objects.aggregate(t=Min("completion_date"))["t"],
+        QuizAttempt.objects.aggregate(t=Min("created_at"))["t"],
+        Recommendation.objects.aggregate(t=Min("generated_at"))["t"],
+        RecommendationEvent.objects.aggregate(t=Min("occurred_at"))["t"],
+    ]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return min(stamps) if stamps else None
+
+
+def run(full=False, now=None):
+    """Rebuild facts from the watermark's day; returns the first day rebuilt."""
+    now = now or timezone.now()
+    first_day = None
+    # On the primary, and one run at a time (the watermark row is locked).
+    with primary_only(), transaction.atomic():
+        mark = (
+            RollupWatermark.objects.select_for_update().filter(name=ROLLUP_NAME).first()
+        )
+        if full or mark is None:
+            start = earliest_source_time()
+            for fact in FACTS:
+                fact.objects.all().delete()
+        else:
+            start = mark.processed_until
+        if start is not None:
+            first_day = start.astimezone(dt_timezone.utc).date()
+            since = connection.ops.adapt_datetimefield_value(
+                datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc)
+            )
+            completed = Progress.Status.COMPLETED
+            for fact in FACTS:
+                fact.objects.filter(day__gte=first_day).delete()
+            tables = _tables()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    ACTIVITY_SQL.format(**tables), [since, completed, since, since]
+                )
+                cursor.execute(*_hourly_activity(tables, since, completed))
+                cursor.execute(
+                    LESSON_SQL.format(**tables), [completed, since, since, since]
+                )
+                cursor.execute(
+                    RECOMMENDATION_SQL.format(**tables),
+                    [
+                        RecommendationEvent.Kind.IMPRESSION,
+                        RecommendationEvent.Kind.CLICK,
+                        since,
+                    ],
+                )
+        RollupWatermark.objects.update_or_create(
+            name=ROLLUP_NAME,
+            defaults={"processed_until": now - timedelta(seconds=LAG)},
+        )
+    return first_day
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ai.models import (
+    LessonInteractionsRaw,
+    MLModel,
+    Recommendation,
+    RecommendationEvent,
+)
+from analytics import rollups
+from analytics.models import DailyActivityFact, DailyLessonFact, HourlyActivityFact
+from lessons.models import lesson
+from profiles.models import ChildProfile, TeacherProfile, User
+from progress.models import Progress
+from quizzes.models import Quiz, QuizAttempt
+
+DAY = datetime(2026, 3, 2, 10, tzinfo=dt_timezone.utc)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.lesson = lesson.objects.create(
+            title="Shapes",
+            description="",
+            video_url="https://x",
+            teacher=teacher,
+            difficulty=lesson.Difficulty.MEDIUM,
+        )
+        self.quiz = Quiz.objects.create(lesson=self.lesson, title="Shapes quiz")
+        self.children = [
+            ChildProfile.objects.create(
+                user=User.objects.create_user(f"c{n}@example.com", f"c{n}", "pw"),
+                age=age,
+            )
+            for n, age in enumerate((4, 4, 6))
+        ]
+
+    def _activity(self, child, when, score):
+        Progress.objects.update_or_create(
+            child=child,
+            lesson=self.lesson,
+            defaults={
+                "status": Progress.Status.COMPLETED,
+                "last_accessed": when,
+                "completion_date": when,
+            },
+        )
+        attempt = QuizAttempt.objects.create(
+            child=child, quiz=self.quiz, score=Decimal(score)
+        )
+        QuizAttempt.objects.filter(pk=attempt.pk).update(created_at=when)
+
+    def test_rollup_aggregates_by_day_lesson_and_age(self):
+        for child, score in zip(self.children, (60, 80, 90)):
+            self._activity(child, DAY, score)
+        Recommendation.objects.create(
+            child=self.children[0], lesson=self.lesson, confidence_score=0.9
+        )
+        Recommendation.objects.update(generated_at=DAY)
+
+        self.assertEqual(rollups.run(now=DAY + timedelta(hours=1)), DAY.date())
+
+        four = DailyActivityFact.objects.get(day=DAY.date(), child_age=4)
+        self.assertEqual(
+            (four.active_children, four.lessons_completed, four.quiz_attempts),
+            (2, 2, 2),
+        )
+        fact = DailyLessonFact.objects.get(day=DAY.date(), child_age=4)
+        self.assertEqual(fact.difficulty, "medium")
+        self.assertEqual(fact.quiz_score_total, Decimal("140"))
+        self.assertEqual(fact.recommendations, 1)
+
+    def test_hourly_activity_is_bucketed_by_utc_hour(self):
+        self._activity(self.children[0], DAY, 60)
+        self._activity(self.children[1], DAY + timedelta(hours=3), 80)
+
+        rollups.run(now=DAY + timedelta(hours=4))
+        rollups.run(now=DAY + timedelta(hours=5))
+
+        self.assertEqual(
+            list(
+                HourlyActivityFact.objects.order_by("hour").values_list(
+                    "day", "hour", "child_age", "active_children", "quiz_attempts"
+                )
+            ),
+            [(DAY.date(), 10, 4, 1, 1), (DAY.date(), 13, 4, 1, 1)],
+        )
+
+    def test_incremental_run_rebuilds_only_from_watermark_day(self):
+        self._activity(self.children[0], DAY, 50)
+        rollups.run(now=DAY + timedelta(hours=1))
+        next_day = DAY + timedelta(days=1)
+        self._activity(self.children[1], next_day, 70)
+
+        self.assertEqual(rollups.run(now=next_day + timedelta(hours=1)), DAY.date())
+        rollups.run(now=next_day + timedelta(hours=2))
+
+        self.assertEqual(DailyActivityFact.objects.filter(child_age=4).count(), 2)
+        self.assertEqual(
+            DailyActivityFact.objects.get(day=next_day.date()).active_children, 1
+        )
+
+    def test_rerolling_a_past_day_is_reproducible(self):
+        self._activity(self.children[0], DAY, 50)
+        interaction = LessonInteractionsRaw.objects.create(
+            ml_student_id=1,
+            child=self.children[1],
+            lesson_id=self.lesson.pk,
+            time_spent=3,
+            video_watch_percentage=80,
+            number_of_clicks=4,
+            completion_status=False,
+        )
+        LessonInteractionsRaw.objects.filter(pk=interaction.pk).update(received_at=DAY)
+        rollups.run(now=DAY + timedelta(hours=1))
+        # A later visit overwrites last_accessed; the past day must not move.
+        Progress.objects.update(last_accessed=DAY + timedelta(days=3))
+
+        rollups.run(full=True, now=DAY + timedelta(days=3))
+
+        four = DailyActivityFact.objects.get(day=DAY.date(), child_age=4)
+        self.assertEqual((four.active_children, four.quiz_attempts), (2, 1))
+
+    def test_endpoint_reads_facts(self):
+        now = timezone.now()
+        self._activity(self.children[2], now, 75)
+        model = MLModel.objects.create(name="ranker", version="3", file_path="-")
+        RecommendationEvent.objects.bulk_create(
+            RecommendationEvent(
+                recommendation_id=1,
+                child_id=self.children[2].pk,
+                lesson_id=self.lesson.pk,
+                model_id=model.pk,
+                confidence_bucket=7,
+                kind=kind,
+            )
+            for kind in ("impression", "impression", "impression", "click")
+        )
+        rollups.run(full=True)
+        staff = User.objects.create_user("s@example.com", "s", "pw", is_staff=True)
+        self.client.force_login(staff)
+
+        # Session, user, six fact reads, model names, watermark.
+        with self.assertNumQueries(10):
+            data = self.client.get(reverse("analytics:platform")).json()
+
+        self.assertEqual(data["daily"][0]["active_children"], 1)
+        self.assertEqual(data["by_hour"][0]["quiz_attempts"], 1)
+        self.assertEqual(data["by_difficulty"][0]["average_quiz_score"], 75.0)
+        self.assertEqual(
+            data["recommendation_ctr"],
+            [
+                {
+                    "model_id": model.pk,
+                    "model": "ranker 3",
+                    "confidence": "0.7-0.8",
+                    "impressions": 3,
+                    "clicks": 1,
+                    "ctr": 0.3333,
+                }
+            ],
+        )
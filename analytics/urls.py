@@ -0,0 +1,9 @@
+from django.urls import path
+
+from analytics import views
+
+app_name = "analytics"
+
+urlpatterns = [
+    path("admin/analytics/", views.platform_analytics, name="platform"),
+]
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from ai.models import MLModel
+from analytics.models import (
+    DailyActivityFact,
+    DailyLessonFact,
+    DailyRecommendationFact,
+    HourlyActivityFact,
+    RollupWatermark,
+)
+from analytics.rollups import ROLLUP_NAME
+
+MAX_DAYS = 366
+
+
+def _average(total, count):
+    return round(float(total) / count, 2) if count else None
+
+
+@require_GET
+def platform_analytics(request):
+    """Platform metrics for the last ``days`` days, read from rollup facts."""
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff account required"}, status=403)
+    try:
+        days = min(MAX_DAYS, max(1, int(request.GET.get("days", 30))))
+    except ValueError:
+        return JsonResponse({"detail": "days must be an integer"}, status=400)
+    since = timezone.now().date() - timedelta(days=days - 1)
+
+    activity = DailyActivityFact.objects.filter(day__gte=since)
+    lessons = DailyLessonFact.objects.filter(day__gte=since)
+    daily = (
+        activity.values("day")
+        .annotate(
+            active_children=Sum("active_children"),
+            lessons_completed=Sum("lessons_completed"),
+            quiz_attempts=Sum("quiz_attempts"),
+        )
+        .order_by("day")
+    )
+    by_age = (
+        activity.values("child_age")
+        .annotate(
+            lessons_completed=Sum("lessons_completed"),
+            quiz_attempts=Sum("quiz_attempts"),
+        )
+        .order_by("child_age")
+    )
+    # Activity by UTC hour of day over the whole window.
+    by_hour = (
+        HourlyActivityFact.objects.filter(day__gte=since)
+        .values("hour")
+        .annotate(
+            active_children=Sum("active_children"),
+            lessons_completed=Sum("lessons_completed"),
+            quiz_attempts=Sum("quiz_attempts"),
+        )
+        .order_by("hour")
+    )
+    totals = ("quiz_attempts", "quiz_score_total", "completions", "recommendations")
+    by_difficulty = (
+        lessons.values("difficulty")
+        .annotate(**{name: Sum(name) for name in totals})
+        .order_by("difficulty")
+    )
+    by_lesson = (
+        lessons.values("lesson_id", "difficulty")
+        .annotate(**{name: Sum(name) for name in totals})
+        .order_by("-completions", "lesson_id")[:50]
+    )
+
+    by_model = list(
+        DailyRecommendationFact.objects.filter(day__gte=since)
+        .values("model_id", "confidence_bucket")
+        .annotate(impressions=Sum("impressions"), clicks=Sum("clicks"))
+        .order_by("model_id", "confidence_bucket")
+    )
+    model_ids = {row["model_id"] for row in by_model} - {None}
+    models = MLModel.objects.in_bulk(model_ids) if model_ids else {}
+
+    def ctr_row(row):
+        model = models.get(row["model_id"])
+        bucket = row["confidence_bucket"]
+        return {
+            "model_id": row["model_id"],
+            "model": f"{model.name} {model.version}" if model else None,
+            "confidence": f"{bucket / 10:.1f}-{(bucket + 1) / 10:.1f}",
+            "impressions": row["impressions"],
+            "clicks": row["clicks"],
+            "ctr": (
+                round(row["clicks"] / row["impressions"], 4)
+                if row["impressions"]
+                else None
+            ),
+        }
+
+    def lesson_row(row):
+        return {
+            **{key: row[key] for key in row if key != "quiz_score_total"},
+            "average_quiz_score": _average(
+                row["quiz_score_total"], row["quiz_attempts"]
+            ),
+        }
+
+    mark = RollupWatermark.objects.filter(name=ROLLUP_NAME).first()
+    return JsonResponse(
+        {
+            "since": since,
+            "processed_until": mark.processed_until if mark else None,
+            "daily": list(daily),
+            "by_age": list(by_age),
+            "by_hour": list(by_hour),
+            "by_difficulty": [lesson_row(row) for row in by_difficulty],
+            "top_lessons": [lesson_row(row) for row in by_lesson],
+            "recommendation_ctr": [ctr_row(row) for row in by_model],
+        }
+    )
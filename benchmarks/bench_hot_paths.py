@@ -0,0 +1,120 @@
+import random
+
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from ai import fallback, pipeline
+from ai.models import LessonInteractionsRaw, MLStudentMap
+from ai.recommendations import top_recommendations
+from core import ratelimit
+from profiles.models import TeacherProfile, User
+from quizzes.grading import grade
+
+INGEST_ROWS = 2_000
+SAMPLE = 50
+
+
+def bench_raw_ingest(bench, rolled_back):
+    rng = random.Random(7)
+    maps = list(MLStudentMap.objects.values("ml_student_id", "student_uuid")[:SAMPLE])
+    rows = [
+        dict(
+            rng.choice(maps),
+            lesson_id=rng.randint(1, 40),
+            time_spent=rng.lognormvariate(2, 0.8),
+            video_watch_percentage=rng.uniform(0, 150),
+            number_of_clicks=rng.randint(-2, 60),
+            completion_status=rng.random() < 0.5,
+        )
+        for _ in range(INGEST_ROWS)
+    ]
+    written = bench(rolled_back(pipeline.ingest), LessonInteractionsRaw, rows)
+    assert written == INGEST_ROWS
+
+
+def bench_etl_raw_to_features(bench, rolled_back, dataset):
+    counts = bench(rolled_back(pipeline.run), rounds=3)
+    assert counts["progress_clean"] == len(dataset.child_ids)
+
+
+def bench_recommendation_fetch(bench, dataset):
+    children = dataset.child_ids[:SAMPLE]
+
+    def fetch():
+        return [top_recommendations(child_id) for child_id in children]
+
+    results = bench(fetch)
+    assert any(results)
+
+
+def bench_quiz_grading(bench, dataset):
+    rng = random.Random(11)
+    submissions = [
+        (quiz_id, [rng.randrange(4) for _ in range(5)])
+        for quiz_id in rng.choices(dataset.quiz_ids, k=SAMPLE * 4)
+    ]
+
+    def grade_all():
+        return [grade(quiz_id, answers) for quiz_id, answers in submissions]
+
+    graded = bench(grade_all)
+    assert all(total == 5 for _, _, total in graded)
+
+
+def bench_progress_dashboard(bench, dataset):
+    teacher = (
+        TeacherProfile.objects.annotate(lesson_total=Count("lessons"))
+        .select_related("user")
+        .order_by("-lesson_total")
+        .first()
+    )
+    client = Client()
+    client.force_login(teacher.user)
+    url = reverse("progress:teacher-dashboard")
+
+    response = bench(client.get, url)
+    assert response.status_code == 200
+    assert len(response.json()["lessons"]) == teacher.lesson_total
+
+
+def bench_catalog_listing(bench, dataset):
+    client = Client()
+    url = reverse("lessons:catalog")
+
+    def browse():
+        return [client.get(url, {"page": page}) for page in (1, 2)] + [
+            client.get(url, {"difficulty": "easy"})
+        ]
+
+    responses = bench(browse)
+    assert all(response.status_code == 200 for response in responses)
+
+
+def bench_rate_limit_check(bench, dataset):
+    request = RequestFactory().post("/api/auth/token/")
+    request.user = User.objects.get(child_profile__pk=dataset.child_ids[0])
+    checks = 1_000
+
+    def run():
+        for _ in range(checks):
+            ratelimit.check(request, "quiz_attempt")
+
+    bench(run)
+    # Budget: a check must stay well under 100 microseconds.
+    assert bench.stats["median"] / checks < 100e-6
+
+
+def bench_fallback_scoring(bench, dataset):
+    matrix = fallback.LessonMatrix.load()
+    rng = random.Random(13)
+    completed = set(rng.sample(list(matrix.position), k=min(10, len(matrix))))
+    calls = 1_000
+
+    def run():
+        for age in range(calls):
+            matrix.top("beginner", 4 + age % 3, completed)
+
+    bench(run)
+    # Budget: scoring one child must stay under a millisecond.
+    assert bench.stats["median"] / calls < 1e-3
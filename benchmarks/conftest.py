@@ -0,0 +1,166 @@
+"""
+Benchmarks for the data model hot paths.
+
+Run from the repository root::
+
+    python -m pytest benchmarks                          # small dataset
+    BENCH_SIZE=medium python -m pytest benchmarks
+    BENCH_UPDATE_BASELINE=1 python -m pytest benchmarks  # record a baseline
+
+Every benchmark runs against one synthetic population per session (see
+``core.synthetic``) in a throwaway test database. Benchmarks assert
+budgets relative to their own work (time per call), which hold on any
+machine. Wall-clock medians only mean something on the machine that
+measured them, so the baseline is recorded locally in ``baseline.json``
+(not committed). Once it exists, a median more than ``BENCH_TOLERANCE``
+times the baseline for the same dataset size fails the test, which is
+how to compare a change against the code before it.
+"""
+
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+BASELINE_PATH = HERE / "baseline.json"
+
+SIZE = os.environ.get("BENCH_SIZE", "small")
+SEED = int(os.environ.get("BENCH_SEED", "42"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "5"))
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "1.5"))
+UPDATE_BASELINE = os.environ.get("BENCH_UPDATE_BASELINE") == "1"
+# Differences below this many seconds are timer noise, never regressions.
+NOISE_FLOOR = 0.002
+
+_results = {}
+
+
+class DisableMigrations(dict):
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+def _load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+class Bench:
+    """Times ``func`` over several rounds, like pytest-benchmark's fixture."""
+
+    def __init__(self, name, baseline):
+        self.name = name
+        self.baseline = baseline
+        self.stats = None
+
+    def __call__(self, func, *args, rounds=ROUNDS, warmup=1, **kwargs):
+        for _ in range(warmup):
+            func(*args, **kwargs)
+        timings = []
+        for _ in range(rounds):
+            started = perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(perf_counter() - started)
+        self.stats = {
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "rounds": rounds,
+        }
+        _results[self.name] = self.stats
+        self._compare()
+        return result
+
+    def _compare(self):
+        expected = self.baseline.get(self.name)
+        median = self.stats["median"]
+        if UPDATE_BASELINE or expected is None:
+            return
+        if median > expected * TOLERANCE and median - expected > NOISE_FLOOR:
+            pytest.fail(
+                f"{self.name} regressed on the {SIZE} dataset: median "
+                f"{median * 1000:.2f} ms vs baseline {expected * 1000:.2f} ms "
+                f"(tolerance x{TOLERANCE})"
+            )
+
+
+def pytest_configure(config):
+    # Only when running this suite (its own pytest.ini); a plain ``pytest``
+    # from the repository root must not need Django.
+    if config.inipath is None or config.inipath.parent != HERE:
+        return
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kids_App.settings")
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.MIGRATION_MODULES = DisableMigrations()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not (UPDATE_BASELINE and _results):
+        return
+    baseline = _load_baseline()
+    sizes = baseline.setdefault(SIZE, {})
+    sizes.update(
+        {name: round(stats["median"], 6) for name, stats in sorted(_results.items())}
+    )
+    BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def django_db():
+    """Build a throwaway test database without migrations."""
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
+
+
+@pytest.fixture(scope="session")
+def dataset(django_db):
+    from core.synthetic import generate
+
+    return generate(SIZE, seed=SEED)
+
+
+@pytest.fixture
+def bench(request, dataset):
+    return Bench(request.node.name, _load_baseline().get(SIZE, {}))
+
+
+@pytest.fixture
+def rolled_back():
+    """Wrap a writing callable so each call leaves the database unchanged."""
+    from django.db import transaction
+
+    def wrap(func):
+        def run(*args, **kwargs):
+            with transaction.atomic():
+                result = func(*args, **kwargs)
+                transaction.set_rollback(True)
+            return result
+
+        return run
+
+    return wrap
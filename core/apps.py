@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from core import outbox, ratelimit
+        from core.cache import model_cache
+        from core.instrumentation import metrics
+
+        model_cache.configure(getattr(settings, "MODEL_CACHE_POLICIES", {}))
+        metrics.register_collector(model_cache.prometheus_lines)
+        metrics.register_collector(ratelimit.prometheus_lines)
+        metrics.register_collector(outbox.prometheus_lines)
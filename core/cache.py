@@ -0,0 +1,228 @@
+"""
+Two-tier model cache.
+
+Lookups hit an in-process LRU first, then the shared Django cache (Redis in
+production, local memory otherwise), then the database. Which models are
+cached, for how long and by which keys is declared in the
+``MODEL_CACHE_POLICIES`` setting::
+
+    MODEL_CACHE_POLICIES = {
+        "profiles.ChildProfile": {
+            "ttl": 300,                 # shared tier, seconds
+            "local_ttl": 5,             # in-process tier, seconds
+            "keys": ["pk", "user_id"],  # fields lookups may use
+            "select_related": ["user"],
+        },
+    }
+
+``post_save``/``post_delete`` signals drop both tiers in the writing process
+once the transaction commits, so no reader can cache the old row again
+between the drop and the commit; misses are loaded from the primary for
+the same reason. The drop covers the keys of the values the
+instance was loaded with too (a renamed slug evicts the old one). Other
+processes drop their local copy within ``local_ttl``. Queryset ``update()``
+and ``bulk_*`` calls send no signals, so code using them must call
+``model_cache.invalidate()`` itself. Cached instances are shared, so treat
+them as read-only.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from core.instrumentation import current_request
+from core.routers import primary_only
+
+MISS = object()
+
+
+class LocalLRU:
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, maxsize=10_000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISS
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachePolicy:
+    def __init__(self, model, ttl=300, local_ttl=5, keys=("pk",), select_related=()):
+        self.model = model
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.keys = tuple(keys)
+        self.select_related = tuple(select_related)
+        self.label = model._meta.label_lower
+        self.attnames = tuple(
+            model._meta.pk.attname if field == "pk" else field for field in self.keys
+        )
+
+    def loaded_values(self, instance):
+        # Read from __dict__ so deferred fields are not fetched.
+        return tuple(instance.__dict__.get(attname) for attname in self.attnames)
+
+    def queryset(self):
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        return queryset
+
+
+class ModelCache:
+    def __init__(self, alias="default", maxsize=10_000):
+        self.alias = alias
+        self.local = LocalLRU(maxsize)
+        self.policies = {}
+        self.stats = {}
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def register(self, model, **options):
+        policy = CachePolicy(model, **options)
+        self.policies[model] = policy
+        self.stats[policy.label] = dict.fromkeys(
+            ("local_hits", "shared_hits", "misses", "invalidations"), 0
+        )
+        uid = f"model_cache_{policy.label}"
+        post_init.connect(self._on_init, sender=model, dispatch_uid=uid)
+        post_save.connect(self._on_change, sender=model, dispatch_uid=uid)
+        post_delete.connect(self._on_change, sender=model, dispatch_uid=uid)
+        return policy
+
+    def configure(self, policies):
+        """Register every ``"app_label.Model": {options}`` entry."""
+        for label, options in policies.items():
+            self.register(apps.get_model(label), **options)
+
+    def _key(self, policy, field, value):
+        return f"mc:{policy.label}:{field}={value}"
+
+    def get(self, model, **lookup):
+        """Fetch one instance by a single declared key, e.g. ``pk=5``."""
+        policy = self.policies[model]
+        ((field, value),) = lookup.items()
+        if field not in policy.keys:
+            raise ValueError(f"{field!r} is not a cache key for {policy.label}")
+        key = self._key(policy, field, value)
+        stats = self.stats[policy.label]
+        request_stats = current_request.get()
+
+        instance = self.local.get(key)
+        if instance is not MISS:
+            stats["local_hits"] += 1
+            if request_stats:
+                request_stats.cache_hits += 1
+            return instance
+        instance = self.shared.get(key, MISS)
+        if instance is not MISS:
+            stats["shared_hits"] += 1
+            if request_stats:
+                request_stats.cache_hits += 1
+            self.local.set(key, instance, policy.local_ttl)
+            return instance
+
+        stats["misses"] += 1
+        if request_stats:
+            request_stats.cache_misses += 1
+        # A lagging replica could put back the row an invalidation just dropped.
+        with primary_only():
+            instance = policy.queryset().get(**lookup)
+        # Store under every declared key so other lookups hit too.
+        keys = self._keys_for(policy, instance)
+        self.shared.set_many(dict.fromkeys(keys, instance), policy.ttl)
+        for each in keys:
+            self.local.set(each, instance, policy.local_ttl)
+        return instance
+
+    def _keys_for(self, policy, instance):
+        return [
+            self._key(policy, field, getattr(instance, field)) for field in policy.keys
+        ]
+
+    def invalidate(self, instance, using=None):
+        """Drop ``instance``'s current and loaded keys once ``using`` commits."""
+        policy = self.policies.get(type(instance))
+        if policy is None:
+            return
+        keys = set(self._keys_for(policy, instance))
+        loaded = getattr(instance, "_model_cache_loaded", ())
+        keys.update(
+            self._key(policy, field, value)
+            for field, value in zip(policy.keys, loaded)
+            if value is not None
+        )
+        instance._model_cache_loaded = policy.loaded_values(instance)
+        transaction.on_commit(lambda: self._drop(policy, keys), using=using)
+
+    def _drop(self, policy, keys):
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many(list(keys))
+        self.stats[policy.label]["invalidations"] += 1
+
+    def _on_init(self, sender, instance, **kwargs):
+        instance._model_cache_loaded = self.policies[sender].loaded_values(instance)
+
+    def _on_change(self, sender, instance, using=None, **kwargs):
+        self.invalidate(instance, using)
+
+    def prometheus_lines(self):
+        lines = [
+            "# HELP learnify_model_cache_events_total Model cache events by model.",
+            "# TYPE learnify_model_cache_events_total counter",
+        ]
+        for label, counts in self.stats.items():
+            for event, value in counts.items():
+                lines.append(
+                    f'learnify_model_cache_events_total{{model="{label}",'
+                    f'event="{event}"}} {value}'
+                )
+        return lines
+
+    def snapshot(self):
+        """Per-model counters plus overall local tier size."""
+        return {
+            "local_entries": len(self.local),
+            "models": {label: dict(counts) for label, counts in self.stats.items()},
+        }
+
+
+model_cache = ModelCache(maxsize=getattr(settings, "MODEL_CACHE_LOCAL_MAXSIZE", 10_000))
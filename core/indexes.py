@@ -0,0 +1,466 @@
+"""
+Workload-driven index advice.
+
+``capture`` runs a workload with an ``execute_wrapper`` installed and
+keeps one example (SQL and parameters) of every distinct SELECT.
+``candidates`` runs ``EXPLAIN`` on each and, for every sizeable table the
+plan reads, proposes an index from the statement's own predicates when no
+existing index leads with them: equality columns first, then one range
+or the ``ORDER BY`` columns; partial when the statement filters on a
+constant boolean and, on PostgreSQL, covering when it reads only a few
+other columns. ``measure`` creates a proposal, times the statements it
+targets before and after, checks the planner uses it and drops it again.
+
+``WORKLOAD`` replays the application's hot paths against a population
+from ``core.synthetic``; see the ``advise_indexes`` command. On a live
+database only ``READ_ONLY_WORKLOAD`` is replayed and nothing is measured,
+so no index is ever created there.
+"""
+
+import json
+import re
+import statistics
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models import Count
+
+from core.routers import primary_only
+
+MIN_TABLE_ROWS = 1_000
+MAX_INCLUDE = 3
+# Django aliases repeated tables as T3, U0, ...
+ALIAS = re.compile(r'(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?([A-Z]\d+)"?)?')
+COLUMN = r'"?{alias}"?\."?(\w+)"?'
+OPERATOR = r"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)?"
+CLAUSE_END = re.compile(r"\b(GROUP BY|ORDER BY|LIMIT|HAVING)\b", re.I)
+SQLITE_ACCESS = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?\b")
+
+
+@dataclass
+class Statement:
+    sql: str
+    params: tuple
+    count: int = 0
+    seconds: float = 0.0
+    sources: set = field(default_factory=set)
+
+
+class Recorder:
+    """``execute_wrapper`` keeping one example of each SELECT."""
+
+    def __init__(self):
+        self.statements = {}
+        self.source = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many and sql.lstrip().upper().startswith("SELECT"):
+                statement = self.statements.get(sql)
+                if statement is None:
+                    statement = self.statements[sql] = Statement(
+                        sql, tuple(params or ())
+                    )
+                statement.count += 1
+                statement.seconds += perf_counter() - started
+                statement.sources.add(self.source)
+
+
+def capture(workload, population):
+    """
+    Run ``[(name, func(population))]``; return the statements seen. Reads
+    are kept on ``default`` so every one is recorded and later EXPLAINed
+    against the same database.
+    """
+    recorder = Recorder()
+    with primary_only(), connection.execute_wrapper(recorder):
+        for name, func in workload:
+            recorder.source = name
+            func(population)
+    return list(recorder.statements.values())
+
+
+def _aliases(sql):
+    aliases = {}
+    for table, alias in ALIAS.findall(sql):
+        aliases[alias or table] = table
+        aliases[table] = table
+    return aliases
+
+
+def _explain(statement):
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement.sql, statement.params)
+            return [row[-1] for row in cursor.fetchall()]
+        if vendor == "postgresql":
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement.sql, statement.params)
+            plan = cursor.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+    raise NotImplementedError(f"EXPLAIN is not supported on {vendor}")
+
+
+def _pg_tables(node):
+    if "Relation Name" in node:
+        yield node["Relation Name"], node.get("Alias")
+    for child in node.get("Plans", ()):
+        yield from _pg_tables(child)
+
+
+def tables_read(statement):
+    """``[(table, alias)]`` the plan reads, by scan or index search."""
+    plan = _explain(statement)
+    if connection.vendor == "postgresql":
+        return list(_pg_tables(plan[0]["Plan"]))
+    aliases = _aliases(statement.sql)
+    found = []
+    for detail in plan:
+        match = SQLITE_ACCESS.match(detail)
+        if match:
+            name = match[2] or match[1]
+            found.append((aliases.get(name, name), name))
+    return found
+
+
+def uses_index(statement, name):
+    """Whether the plan for ``statement`` reads through index ``name``."""
+    plan = _explain(statement)
+    if connection.vendor == "postgresql":
+        return name in json.dumps(plan)
+    return any(name in detail for detail in plan)
+
+
+@dataclass
+class Candidate:
+    model: type
+    fields: list
+    condition: dict = None
+    include: list = None
+    statements: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        return (
+            self.model._meta.db_table,
+            tuple(self.fields),
+            tuple(sorted((self.condition or {}).items())),
+            tuple(self.include or ()),
+        )
+
+    def index(self):
+        options = {}
+        if self.condition:
+            options["condition"] = models.Q(**self.condition)
+        if self.include:
+            options["include"] = self.include
+        # Partial and covering indexes need a name up front; use the default.
+        plain = models.Index(fields=self.fields)
+        plain.set_name_with_model(self.model)
+        return models.Index(fields=self.fields, name=plain.name, **options)
+
+    def declaration(self):
+        parts = [f"fields={self.fields!r}"]
+        if self.condition:
+            args = ", ".join(f"{k}={v!r}" for k, v in self.condition.items())
+            parts.append(f"condition=models.Q({args})")
+        if self.include:
+            parts.append(f"include={self.include!r}")
+        parts.append(f'name="{self.index().name}"')
+        return f"models.Index({', '.join(parts)})"
+
+    def sql(self):
+        with connection.schema_editor(collect_sql=True) as editor:
+            return str(self.index().create_sql(self.model, editor))
+
+
+def _models_by_table():
+    return {model._meta.db_table: model for model in apps.get_models()}
+
+
+def _existing_prefixes(table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        tuple(info["columns"])
+        for info in constraints.values()
+        if info["index"] or info["unique"] or info["primary_key"]
+    ]
+
+
+def _columns(text, alias):
+    return re.findall(COLUMN.format(alias=re.escape(alias)), text)
+
+
+def _proposal(statement, model, alias):
+    sql = statement.sql
+    where_at = sql.upper().find(" WHERE ")
+    if where_at < 0:
+        return None
+    rest = sql[where_at + 7 :]
+    end = CLAUSE_END.search(rest)
+    where = rest[: end.start()] if end else rest
+    if re.search(r"\bOR\b", where, re.I):
+        # Each branch needs its own index; a composite one would not help.
+        return None
+    order_at = sql.upper().rfind(" ORDER BY ")
+    order = sql[order_at + 10 :] if order_at > where_at else ""
+
+    by_column = {f.column: f for f in model._meta.concrete_fields}
+    column = COLUMN.format(alias=re.escape(alias))
+    equality, ranges, condition = [], [], {}
+    for match in re.finditer(column + OPERATOR, where):
+        model_field = by_column.get(match[1])
+        operator = (match[2] or "").upper()
+        if model_field is None:
+            continue
+        if not operator and isinstance(model_field, models.BooleanField):
+            negated = where[: match.start()].rstrip().upper().endswith("NOT")
+            condition[model_field.name] = not negated
+        elif operator in ("=", "IN", "IS"):
+            equality.append(model_field.name)
+        elif operator:
+            ranges.append(model_field.name)
+    ordering = [
+        ("-" if direction.upper() == "DESC" else "") + by_column[name].name
+        for name, direction in re.findall(column + r"\s*(ASC|DESC)?", order)
+        if name in by_column and not by_column[name].primary_key
+    ]
+    fields = [
+        name
+        for name in dict.fromkeys(equality + (ranges[:1] or ordering))
+        if name.lstrip("-") not in condition
+    ]
+    if not fields:
+        return None
+    columns = tuple(model._meta.get_field(name.lstrip("-")).column for name in fields)
+    existing = _existing_prefixes(model._meta.db_table)
+    if any(prefix[: len(columns)] == columns for prefix in existing):
+        return None
+
+    include = None
+    if connection.features.supports_covering_indexes:
+        select = sql[: sql.upper().find(" FROM ")]
+        extra = [
+            by_column[name].name
+            for name in dict.fromkeys(_columns(select, alias))
+            if name in by_column
+            and not by_column[name].primary_key
+            and by_column[name].name not in {f.lstrip("-") for f in fields}
+        ]
+        if 0 < len(extra) <= MAX_INCLUDE:
+            include = extra
+    return Candidate(model, fields, condition or None, include)
+
+
+def candidates(statements, min_rows=MIN_TABLE_ROWS):
+    """
+    Index proposals for statements on tables of at least ``min_rows`` rows
+    whose predicates no existing index leads with.
+    """
+    tables = _models_by_table()
+    sizes = {}
+    found = {}
+    for statement in statements:
+        for table, alias in tables_read(statement):
+            model = tables.get(table)
+            if model is None:
+                continue
+            if table not in sizes:
+                sizes[table] = model._base_manager.count()
+            if sizes[table] < min_rows:
+                continue
+            candidate = _proposal(statement, model, alias or table)
+            if candidate is None:
+                continue
+            candidate = found.setdefault(candidate.key, candidate)
+            if statement not in candidate.statements:
+                candidate.statements.append(statement)
+    return list(found.values())
+
+
+def time_statement(statement, rounds=5):
+    timings = []
+    with connection.cursor() as cursor:
+        for _ in range(rounds):
+            started = perf_counter()
+            cursor.execute(statement.sql, statement.params)
+            cursor.fetchall()
+            timings.append(perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure(candidate, rounds=5, keep=False):
+    """``[(statement, before, after, used)]`` with the candidate index added."""
+    before = [time_statement(s, rounds) for s in candidate.statements]
+    index = candidate.index()
+    with connection.schema_editor() as editor:
+        editor.add_index(candidate.model, index)
+    try:
+        results = []
+        for statement, seconds in zip(candidate.statements, before):
+            after = time_statement(statement, rounds)
+            used = uses_index(statement, index.name)
+            results.append((statement, seconds, after, used))
+    finally:
+        if not keep:
+            with connection.schema_editor() as editor:
+                editor.remove_index(candidate.model, index)
+    return results
+
+
+SAMPLE = 20
+
+
+def current_population():
+    """A ``core.synthetic.Population`` describing rows already stored."""
+    from core.synthetic import Population
+    from lessons.models import lesson
+    from profiles.models import ChildProfile
+    from quizzes.models import Quiz
+
+    population = Population()
+    population.lesson_ids = list(lesson.objects.values_list("pk", flat=True))
+    population.quiz_ids = list(Quiz.objects.values_list("pk", flat=True))
+    population.child_ids = list(ChildProfile.objects.values_list("pk", flat=True))
+    return population
+
+
+def _rolled_back(func):
+    def run(population):
+        with transaction.atomic():
+            func(population)
+            transaction.set_rollback(True)
+
+    run.writes = True
+    return run
+
+
+def _catalog(population):
+    from django.test import Client
+
+    client = Client()
+    for params in ({"page": 1}, {"page": 2}, {"difficulty": "easy"}):
+        client.get("/api/lessons/", params)
+
+
+def _teacher_dashboard(population):
+    from django.test import Client
+
+    from profiles.models import TeacherProfile
+
+    teachers = TeacherProfile.objects.annotate(n=Count("lessons")).order_by("-n")
+    client = Client()
+    for teacher in teachers.select_related("user")[:3]:
+        client.force_login(teacher.user)
+        client.get("/api/teachers/dashboard/")
+
+
+def _recommendations(population):
+    from ai.recommendations import top_recommendations
+
+    for child_id in population.child_ids[:SAMPLE]:
+        top_recommendations(child_id)
+
+
+def _per_child_progress(population):
+    from progress.models import Progress
+
+    for child_id in population.child_ids[:SAMPLE]:
+        list(
+            Progress.objects.filter(
+                child_id=child_id, status=Progress.Status.COMPLETED
+            ).values_list("lesson_id", flat=True)
+        )
+
+
+def _lesson_stats(population):
+    from progress.models import Progress
+
+    for lesson_id in population.lesson_ids[:SAMPLE]:
+        Progress.objects.filter(
+            lesson_id=lesson_id, status=Progress.Status.COMPLETED
+        ).count()
+
+
+def _grading(population):
+    from quizzes.grading import grade
+
+    for quiz_id in population.quiz_ids[:SAMPLE]:
+        grade(quiz_id, [0, 1, 2, 3, 0])
+
+
+def _fallback_matrix(population):
+    from ai.fallback import LessonMatrix, numpy
+
+    if numpy() is not None:
+        LessonMatrix.load()
+
+
+def _privacy_lookup(population):
+    from profiles.privacy import SOURCES, ChildKeys
+
+    keys = ChildKeys(population.child_ids[:3])
+    for source in SOURCES:
+        list(source.queryset(keys).values_list("pk", flat=True))
+
+
+def _ml_lookup(population):
+    from ai.models import (
+        LessonFeatures,
+        MLStudentMap,
+        ProgressLabeled,
+        ProgressRaw,
+        QuizAttemptsClean,
+        QuizFeatures,
+    )
+
+    ml_ids = MLStudentMap.objects.values_list("ml_student_id", flat=True)
+    for ml_id in ml_ids[:SAMPLE]:
+        list(ProgressRaw.objects.filter(ml_student_id=ml_id))
+        list(QuizAttemptsClean.objects.filter(ml_student_id=ml_id))
+        for model in (LessonFeatures, QuizFeatures, ProgressLabeled):
+            list(model.objects.filter(student_id=ml_id))
+
+
+def _pipeline(population):
+    from ai import pipeline
+
+    pipeline.run()
+
+
+def _rollups(population):
+    from analytics import rollups
+
+    rollups.run(full=True)
+
+
+def _reconcile(population):
+    from progress.counters import reconcile_lesson_stats
+
+    reconcile_lesson_stats()
+
+
+WORKLOAD = [
+    ("catalog", _catalog),
+    ("teacher_dashboard", _teacher_dashboard),
+    ("recommendations", _recommendations),
+    ("child_progress", _per_child_progress),
+    ("lesson_stats", _lesson_stats),
+    ("quiz_grading", _grading),
+    ("fallback_matrix", _fallback_matrix),
+    ("privacy_lookup", _privacy_lookup),
+    ("ml_lookup", _ml_lookup),
+    ("etl_pipeline", _rolled_back(_pipeline)),
+    ("analytics_rollups", _rolled_back(_rollups)),
+    ("reconcile_stats", _rolled_back(_reconcile)),
+]
+# Paths that write (even if rolled back) lock rows, so they stay off live data.
+READ_ONLY_WORKLOAD = [
+    (name, func) for name, func in WORKLOAD if not getattr(func, "writes", False)
+]
@@ -0,0 +1,198 @@
+"""
+Always-on request instrumentation with a Prometheus text export.
+
+Every request records its latency. A sampled fraction
+(``INSTRUMENTATION_SAMPLE_RATE``) also wraps each database connection with
+``execute_wrapper`` to count queries, time them and spot N+1 patterns:
+the same SQL text issued ``N_PLUS_ONE_THRESHOLD`` or more times in one
+request, e.g. ``child.user`` dereferenced in a loop. Sampled counters are
+exported alongside the number of sampled requests so rates can be scaled.
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+TABLE_RE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+
+SAMPLE_RATE = getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0.1)
+N_PLUS_ONE_THRESHOLD = getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+
+# Set while a sampled request is running so other layers (the model cache)
+# can attribute their work to it.
+current_request = ContextVar("instrumented_request", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            running += count
+            yield bound, running
+
+
+class RequestStats:
+    """Per-request query recorder, installed with ``execute_wrapper``."""
+
+    __slots__ = ("queries", "query_seconds", "statements", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def repeated_statements(self, threshold):
+        return [
+            (sql, count) for sql, count in self.statements.items() if count >= threshold
+        ]
+
+
+def _labels(**labels):
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.collectors = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+            self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.query_seconds = defaultdict(float)
+            self.sampled = defaultdict(int)
+            self.cache = defaultdict(lambda: [0, 0])
+            self.n_plus_one = defaultdict(int)
+
+    def register_collector(self, collector):
+        """Add a callable returning extra exposition lines at scrape time."""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def observe_request(self, method, route, status, seconds, stats=None):
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            self.latency[(method, route, status_class)].observe(seconds)
+            if stats is None:
+                return
+            self.sampled[route] += 1
+            self.query_counts[route].observe(stats.queries)
+            self.query_seconds[route] += stats.query_seconds
+            cache = self.cache[route]
+            cache[0] += stats.cache_hits
+            cache[1] += stats.cache_misses
+            for sql, count in stats.repeated_statements(N_PLUS_ONE_THRESHOLD):
+                match = TABLE_RE.search(sql)
+                self.n_plus_one[(route, match.group(1) if match else "unknown")] += 1
+                logger.warning(
+                    "Possible N+1 on %s: %d identical queries: %s", route, count, sql
+                )
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                for bound, count in hist.cumulative():
+                    lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+                lines.append(f"{name}_sum{_labels(**labels)} {hist.total}")
+                lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+        def counter(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+
+        with self._lock:
+            histogram(
+                "learnify_request_duration_seconds",
+                "Request latency by route.",
+                (
+                    ({"method": m, "route": r, "status": s}, h)
+                    for (m, r, s), h in self.latency.items()
+                ),
+            )
+            counter(
+                "learnify_sampled_requests_total",
+                "Requests whose queries were instrumented.",
+                (({"route": r}, n) for r, n in self.sampled.items()),
+            )
+            histogram(
+                "learnify_db_queries_per_request",
+                "Database queries per sampled request.",
+                (({"route": r}, h) for r, h in self.query_counts.items()),
+            )
+            counter(
+                "learnify_db_query_seconds_total",
+                "Time spent in database queries by sampled requests.",
+                (({"route": r}, v) for r, v in self.query_seconds.items()),
+            )
+            counter(
+                "learnify_request_cache_hits_total",
+                "Model cache hits by sampled requests.",
+                (({"route": r}, v[0]) for r, v in self.cache.items()),
+            )
+            counter(
+                "learnify_request_cache_misses_total",
+                "Model cache misses by sampled requests.",
+                (({"route": r}, v[1]) for r, v in self.cache.items()),
+            )
+            counter(
+                "learnify_n_plus_one_total",
+                "Sampled requests repeating one query at least the threshold.",
+                (
+                    ({"route": r, "table": t}, n)
+                    for (r, t), n in self.n_plus_one.items()
+                ),
+            )
+            collectors = list(self.collectors)
+        for collector in collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
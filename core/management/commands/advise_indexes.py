@@ -0,0 +1,102 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import indexes
+from core.synthetic import SIZES, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the application's hot queries, EXPLAIN them and propose "
+        "indexes for full table scans, with before/after timings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=sorted(SIZES), default="small")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=indexes.MIN_TABLE_ROWS,
+            help="Ignore scans of tables smaller than this",
+        )
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help=(
+                "EXPLAIN the read-only workload on the configured database "
+                "without creating indexes or keeping any writes"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError(
+                f"EXPLAIN parsing is not supported on {connection.vendor}"
+            )
+        if options["current_db"]:
+            # Possibly production: propose only, and roll back what the
+            # replayed requests write (sessions, last_login).
+            with transaction.atomic():
+                statements = indexes.capture(
+                    indexes.READ_ONLY_WORKLOAD, indexes.current_population()
+                )
+                transaction.set_rollback(True)
+            self.report(statements, options, measure=False)
+            return
+
+        from django.test.utils import (
+            setup_databases,
+            setup_test_environment,
+            teardown_databases,
+            teardown_test_environment,
+        )
+
+        # Tables straight from the models, as the repository has no migrations.
+        connection.settings_dict["TEST"]["MIGRATE"] = False
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, serialized_aliases=()
+        )
+        try:
+            started = perf_counter()
+            population = generate(options["size"], seed=options["seed"])
+            self.stdout.write(
+                f"Generated {options['size']} population "
+                f"({population.total_rows} rows) in {perf_counter() - started:.1f}s"
+            )
+            self.report(indexes.capture(indexes.WORKLOAD, population), options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, statements, options, measure=True):
+        self.stdout.write(f"Captured {len(statements)} distinct statements")
+        proposals = indexes.candidates(statements, options["min_rows"])
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS("No full table scans to fix"))
+            return
+        for candidate in proposals:
+            label = candidate.model._meta.label
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            self.stdout.write(f"  Meta.indexes: {candidate.declaration()}")
+            self.stdout.write(f"  SQL: {candidate.sql()};")
+            if not measure:
+                for statement in candidate.statements:
+                    sources = ", ".join(sorted(statement.sources))
+                    self.stdout.write(f"  [{sources}] not measured on this database")
+                    self.stdout.write(f"    {statement.sql[:160]}")
+                continue
+            for statement, before, after, used in indexes.measure(
+                candidate, options["rounds"]
+            ):
+                sources = ", ".join(sorted(statement.sources))
+                note = "" if used else " (index not used)"
+                self.stdout.write(
+                    f"  [{sources}] {before * 1000:.2f} ms -> "
+                    f"{after * 1000:.2f} ms{note}"
+                )
+                self.stdout.write(f"    {statement.sql[:160]}")
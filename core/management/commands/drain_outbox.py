@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Dispatch pending outbox events to their handlers in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when idle",
+        )
+        parser.add_argument(
+            "--keep-hours",
+            type=float,
+            default=outbox.KEEP_HOURS,
+            help="Delete processed events older than this when idle",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the outbox once and exit"
+        )
+
+    def handle(self, *args, **options):
+        worker_id = outbox.default_worker_id()
+        processed = failed = 0
+        purged_at = None
+        try:
+            while True:
+                done, errors = outbox.drain(options["batch_size"], worker_id)
+                processed += done
+                failed += errors
+                if done + errors:
+                    continue
+                if purged_at is None or time.monotonic() - purged_at >= 3600:
+                    outbox.purge(options["keep_hours"])
+                    purged_at = time.monotonic()
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {processed} events ({failed} failed)")
+        )
+        for topic, values in outbox.lag().items():
+            self.stdout.write(
+                f"  {topic}: {values['pending']} pending, {values['dead']} dead, "
+                f"lag {values['lag_seconds']:.0f}s"
+            )
@@ -0,0 +1,63 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import SIZES, RowWriter, generate
+
+
+class Command(BaseCommand):
+    help = "Fill every app's tables with a deterministic synthetic population"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=sorted(SIZES), default="small")
+        parser.add_argument("--children", type=int, help="Override the child count")
+        parser.add_argument("--lessons", type=int, help="Override the lesson count")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument(
+            "--orm",
+            action="store_true",
+            help="Insert with bulk_create instead of COPY/executemany",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Allow running with DEBUG off",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to add synthetic data with DEBUG off")
+        writer = None if options["orm"] else RowWriter()
+        if writer is None:
+            method = "bulk_create"
+        else:
+            method = "COPY" if writer.use_copy else "executemany"
+        self.stdout.write(
+            f"Generating {options['size']} population "
+            f"({method}, seed {options['seed']})"
+        )
+        started = perf_counter()
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} children")
+
+        population = generate(
+            options["size"],
+            seed=options["seed"],
+            children=options["children"],
+            lessons=options["lessons"],
+            progress=progress,
+            batch_size=options["batch_size"],
+            writer=writer,
+        )
+        elapsed = perf_counter() - started
+        for label, count in sorted(population.counts.items()):
+            self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {population.total_rows} rows in {elapsed:.1f}s "
+                f"({population.total_rows / elapsed:,.0f} rows/s)"
+            )
+        )
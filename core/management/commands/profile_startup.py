@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot a fresh interpreter under python -X importtime and report import "
+        "time per app/package and the slowest modules"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=sorted(startup.TARGETS),
+            default="setup",
+            help="setup: django.setup(); wsgi: WSGI app and URLconf; "
+            "command: load --command",
+        )
+        parser.add_argument("--command", help="Management command for --target command")
+        parser.add_argument(
+            "--boot-settings",
+            help="Settings module the profiled process boots with, e.g. "
+            "kids_App.settings_batch (default: the current one)",
+        )
+        parser.add_argument("--limit", type=int, default=15)
+
+    def handle(self, *args, **options):
+        if options["target"] == "command" and not options["command"]:
+            raise CommandError("--target command needs --command NAME")
+        try:
+            records, wall = startup.profile(
+                options["target"],
+                options["command"],
+                options["boot_settings"] or options["settings"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(f"Startup failed: {exc}")
+        total = sum(record.self_us for record in records)
+        self.stdout.write(
+            f"{options['target']}: {wall * 1000:.0f} ms wall, "
+            f"{total / 1000:.0f} ms in {len(records)} imports"
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nBy app / package (self time)"))
+        groups = startup.by_group(records)
+        for group, micros in groups.most_common(options["limit"]):
+            self.stdout.write(
+                f"  {micros / 1000:8.1f} ms  {100 * micros / max(total, 1):5.1f}%  "
+                f"{group}"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSlowest modules (cumulative)"))
+        # Top-level imports only, so a module and its parents are not repeated.
+        roots = [record for record in records if record.depth <= 1]
+        roots.sort(key=lambda record: -record.cumulative_us)
+        for record in roots[: options["limit"]]:
+            self.stdout.write(
+                f"  {record.cumulative_us / 1000:8.1f} ms  {record.module}"
+            )
@@ -0,0 +1,72 @@
+import random
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from core import instrumentation
+from core.routers import is_pinned, pinning_scope
+
+PIN_COOKIE = "db_primary"
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a request's reads on the primary once it writes, and for
+    ``DATABASE_REPLICA_PIN_SECONDS`` afterwards (via a cookie) so a client
+    reading right after its own POST never sees replica lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+
+    def __call__(self, request):
+        writes = request.method not in ("GET", "HEAD", "OPTIONS")
+        has_cookie = PIN_COOKIE in request.COOKIES
+        with pinning_scope(writes or has_cookie):
+            response = self.get_response(request)
+            wrote = is_pinned() and (writes or not has_cookie)
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=self.pin_seconds, httponly=True
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Records latency for every request and, for a sampled fraction, query
+    counts, query time, model cache hits and N+1 patterns. Install it first
+    in ``MIDDLEWARE`` so it times the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = None
+        started = perf_counter()
+        if random.random() < instrumentation.SAMPLE_RATE:
+            stats = instrumentation.RequestStats()
+            token = instrumentation.current_request.set(stats)
+            try:
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(stats))
+                    response = self.get_response(request)
+            finally:
+                instrumentation.current_request.reset(token)
+        else:
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "unmatched"
+        instrumentation.metrics.observe_request(
+            request.method,
+            route,
+            response.status_code,
+            perf_counter() - started,
+            stats,
+        )
+        return response
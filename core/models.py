@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from profiles.models import User
 
@@ -29,3 +30,40 @@ class AuditLog(models.Model):
     def __str__(self):
         username = self.user.username if self.user else "System"
         return f"{username} - {self.action} at {self.created_at}"
+
+
+class OutboxEvent(models.Model):
+    """Domain event queued in the same transaction as a write"""
+
+    topic = models.CharField(max_length=100, help_text="Handler topic in core.outbox")
+    payload = models.JSONField(default=dict, help_text="Handler arguments")
+    attempts = models.IntegerField(default=0, help_text="Failed handler runs")
+    last_error = models.TextField(
+        null=True, blank=True, help_text="Error from the last failed run"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Not dispatched before this time (backoff)"
+    )
+    locked_by = models.CharField(
+        max_length=100, blank=True, default="", help_text="Worker holding the lease"
+    )
+    lease_expires_at = models.DateTimeField(
+        null=True, blank=True, help_text="When another worker may claim the event"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the handler ran successfully"
+    )
+
+    class Meta:
+        db_table = "core_outboxevent"
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                condition=models.Q(processed_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
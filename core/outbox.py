@@ -0,0 +1,260 @@
+"""
+Transactional outbox for domain events shared across apps.
+
+``publish`` adds an ``OutboxEvent`` row inside the caller's transaction,
+so an event exists exactly when the write it describes was committed and
+the request path pays for one insert. Workers (``drain_outbox``) lease
+batches of pending events with ``SELECT ... FOR UPDATE SKIP LOCKED``, so
+any number of them can poll the table, group the batch by topic and call
+each topic's handler once with the payloads of the whole group.
+
+Delivery is at least once. A handler's writes and the marking of its
+events as processed share one savepoint, and marking re-checks the lease,
+so work from a worker that lost its lease is rolled back rather than
+applied twice. Events of a worker that died are claimed again once their
+lease expires. When a batch fails its events are retried one by one, so
+only the failing event is rescheduled with exponential backoff. Every
+claim counts as an attempt, so an event whose handler keeps outliving the
+lease (or killing its worker) stops being claimed too: after
+``OUTBOX_MAX_ATTEMPTS`` attempts it is left in the table for inspection.
+
+Handlers are registered per topic, usually from a module imported in
+``AppConfig.ready``::
+
+    @outbox.handler("quiz_attempt.submitted")
+    def attempts_submitted(payloads): ...
+
+Apps that react to the same write publish one topic each.
+"""
+
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from core.models import OutboxEvent
+from core.routers import primary_only
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "OUTBOX_BATCH_SIZE", 100)
+MAX_ATTEMPTS = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5)
+LEASE_SECONDS = getattr(settings, "OUTBOX_LEASE_SECONDS", 60)
+BACKOFF_BASE_SECONDS = getattr(settings, "OUTBOX_BACKOFF_BASE_SECONDS", 5)
+BACKOFF_MAX_SECONDS = getattr(settings, "OUTBOX_BACKOFF_MAX_SECONDS", 600)
+KEEP_HOURS = getattr(settings, "OUTBOX_KEEP_HOURS", 24)
+
+HANDLERS = {}
+
+
+class LeaseLost(Exception):
+    """Another worker claimed the events while their handler ran."""
+
+
+def handler(topic):
+    """Register the decorated function as the batch handler of ``topic``."""
+
+    def register(func):
+        if HANDLERS.get(topic, func) is not func:
+            raise ValueError(f"Outbox topic {topic} already has a handler")
+        HANDLERS[topic] = func
+        return func
+
+    return register
+
+
+def publish(topic, payload):
+    """Queue ``payload`` for ``topic``; call inside the write's transaction."""
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff_delay(attempts):
+    delay = BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, BACKOFF_MAX_SECONDS))
+
+
+def claimable(now):
+    return OutboxEvent.objects.filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+        processed_at__isnull=True,
+        attempts__lt=MAX_ATTEMPTS,
+        available_at__lte=now,
+    )
+
+
+def claim_batch(worker_id, batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` pending events to ``worker_id``, oldest first."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            claimable(now)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        # Re-checking claimability keeps backends without row locks honest.
+        claimable(now).filter(pk__in=ids).update(
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=F("attempts") + 1,
+        )
+    return list(
+        OutboxEvent.objects.filter(
+            pk__in=ids, locked_by=worker_id, processed_at__isnull=True
+        ).order_by("pk")
+    )
+
+
+def _leased(events):
+    return OutboxEvent.objects.filter(
+        pk__in=[event.pk for event in events],
+        locked_by=events[0].locked_by,
+        processed_at__isnull=True,
+    )
+
+
+def _run(func, events):
+    with transaction.atomic():
+        func([event.payload for event in events])
+        if _leased(events).update(processed_at=timezone.now()) != len(events):
+            raise LeaseLost()
+
+
+def _fail(event, error):
+    # The claim already counted this attempt.
+    attempts = event.attempts
+    _leased([event]).update(
+        last_error=error,
+        available_at=timezone.now() + backoff_delay(attempts),
+        locked_by="",
+        lease_expires_at=None,
+    )
+    if attempts >= MAX_ATTEMPTS:
+        logger.error("Outbox event %s (%s) gave up: %s", event.pk, event.topic, error)
+
+
+def dispatch(events):
+    """Call each topic's handler with its claimed events; ``(processed, failed)``."""
+    groups = defaultdict(list)
+    for event in events:
+        groups[event.topic].append(event)
+    processed = failed = 0
+    for topic, group in groups.items():
+        func = HANDLERS.get(topic)
+        if func is None:
+            for event in group:
+                _fail(event, f"No outbox handler for {topic}")
+            failed += len(group)
+            continue
+        try:
+            _run(func, group)
+            processed += len(group)
+            continue
+        except LeaseLost:
+            logger.warning("Lost the lease on %d %s events", len(group), topic)
+            continue
+        except Exception as exc:
+            if len(group) == 1:
+                logger.exception("Outbox event %s (%s) failed", group[0].pk, topic)
+                _fail(group[0], str(exc))
+                failed += 1
+                continue
+            logger.warning("Batch of %d %s events failed", len(group), topic)
+        # Retry one by one so only the failing events are rescheduled.
+        for event in group:
+            try:
+                _run(func, [event])
+            except LeaseLost:
+                continue
+            except Exception as exc:
+                logger.exception("Outbox event %s (%s) failed", event.pk, topic)
+                _fail(event, str(exc))
+                failed += 1
+            else:
+                processed += 1
+    return processed, failed
+
+
+def drain(batch_size=BATCH_SIZE, worker_id=None):
+    """Claim and dispatch one batch; returns ``(processed, failed)``."""
+    # Handlers read the rows their events describe, so stay on the primary.
+    with primary_only():
+        events = claim_batch(worker_id or default_worker_id(), batch_size)
+        return dispatch(events) if events else (0, 0)
+
+
+def purge(keep_hours=KEEP_HOURS, chunk_size=1000):
+    """Delete events processed more than ``keep_hours`` ago; returns the count."""
+    cutoff = timezone.now() - timedelta(hours=keep_hours)
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects.filter(processed_at__lt=cutoff).values_list(
+                "pk", flat=True
+            )[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
+
+
+def lag(now=None):
+    """``{topic: {"pending", "dead", "lag_seconds"}}`` over unprocessed events."""
+    now = now or timezone.now()
+    # An event on its last attempt is live until its lease runs out.
+    live = Q(attempts__lt=MAX_ATTEMPTS) | Q(lease_expires_at__gte=now)
+    rows = (
+        OutboxEvent.objects.filter(processed_at__isnull=True)
+        .values("topic")
+        .annotate(
+            pending=Count("pk", filter=live),
+            dead=Count("pk", filter=~live),
+            oldest=Min("created_at", filter=live),
+        )
+        .order_by("topic")
+    )
+    return {
+        row["topic"]: {
+            "pending": row["pending"],
+            "dead": row["dead"],
+            "lag_seconds": (
+                (now - row["oldest"]).total_seconds() if row["oldest"] else 0
+            ),
+        }
+        for row in rows
+    }
+
+
+def prometheus_lines():
+    try:
+        topics = lag()
+    except DatabaseError:
+        logger.exception("Could not read outbox lag")
+        return []
+    lines = []
+    for name, key, help_text in (
+        ("learnify_outbox_pending_events", "pending", "Events waiting for a handler."),
+        ("learnify_outbox_dead_events", "dead", "Events that exhausted retries."),
+        (
+            "learnify_outbox_lag_seconds",
+            "lag_seconds",
+            "Age of the oldest pending event.",
+        ),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for topic, values in topics.items():
+            lines.append(f'{name}{{topic="{topic}"}} {values[key]}')
+    return lines
@@ -0,0 +1,230 @@
+"""
+Token-bucket rate limiting per caller and scope.
+
+Policies live in ``RATE_LIMITS``::
+
+    RATE_LIMITS = {
+        "auth": {"rate": "10/m", "burst": 20},  # refill 10 a minute, hold 20
+        "quiz_attempt": "30/m",                 # burst defaults to the count
+    }
+
+Callers are identified by user ``uuid`` (free for bearer tokens, already
+loaded for sessions) or, when anonymous, by client IP. Behind a load
+balancer the IP comes from ``RATE_LIMIT_TRUSTED_PROXY_HEADER`` (see
+``client_ip``). A view can narrow the bucket further with ``key``; login
+uses the submitted email, so one account's failures do not lock out
+everybody behind the same NAT, and stacks a looser per-IP scope
+(``auth_ip``) on top so one address cannot spray passwords across
+accounts. Buckets live in
+process memory by default, which is exact for a single node; with
+``RATE_LIMIT_REDIS_URL`` set they live in Redis and are updated by one
+atomic Lua script per check. If Redis is unreachable requests are let
+through rather than failing.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+PROXY_HEADER = getattr(settings, "RATE_LIMIT_TRUSTED_PROXY_HEADER", None)
+PROXY_COUNT = getattr(settings, "RATE_LIMIT_TRUSTED_PROXY_COUNT", 1)
+
+
+class Policy:
+    __slots__ = ("scope", "rate", "capacity")
+
+    def __init__(self, scope, rate, burst=None):
+        count, _, period = rate.partition("/")
+        self.scope = scope
+        self.rate = int(count) / PERIODS[period[0]]
+        self.capacity = burst or int(count)
+
+    @classmethod
+    def from_setting(cls, scope, value):
+        if isinstance(value, str):
+            return cls(scope, value)
+        return cls(scope, value["rate"], value.get("burst"))
+
+
+class LocalBucketStore:
+    """
+    In-process buckets: ``{key: (tokens, stamp, full_at)}`` in least
+    recently used order, so a full store evicts one bucket per insert.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost=1):
+        """Spend ``cost`` tokens; return 0 or the seconds until possible."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, state[0] + (now - state[1]) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 's')
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 's', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Shared buckets; one round trip per check via a cached Lua script."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+        self.errors = redis.RedisError
+
+    def take(self, key, rate, capacity, cost=1):
+        try:
+            return float(self.script(keys=[key], args=[rate, capacity, cost]))
+        except self.errors:
+            logger.warning("Rate limit store unavailable; allowing %s", key)
+            return 0.0
+
+    def reset(self):
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    url = getattr(settings, "RATE_LIMIT_REDIS_URL", None)
+    return RedisBucketStore(url) if url else LocalBucketStore()
+
+
+@lru_cache(maxsize=None)
+def get_policy(scope):
+    value = getattr(settings, "RATE_LIMITS", {}).get(scope)
+    return Policy.from_setting(scope, value) if value else None
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting == "RATE_LIMITS":
+        get_policy.cache_clear()
+    elif setting == "RATE_LIMIT_REDIS_URL":
+        get_store.cache_clear()
+
+
+rejections = defaultdict(int)
+
+
+def prometheus_lines():
+    lines = [
+        "# HELP learnify_rate_limited_total Requests rejected by rate limits.",
+        "# TYPE learnify_rate_limited_total counter",
+    ]
+    for scope, count in sorted(rejections.items()):
+        lines.append(f'learnify_rate_limited_total{{scope="{scope}"}} {count}')
+    return lines
+
+
+def client_ip(request):
+    """
+    The address of the client. With ``PROXY_HEADER`` set (e.g.
+    ``HTTP_X_FORWARDED_FOR``) it is the entry ``PROXY_COUNT`` hops from the
+    right, the one our outermost proxy appended; entries left of it are
+    whatever the client sent.
+    """
+    if PROXY_HEADER:
+        hops = [hop.strip() for hop in request.META.get(PROXY_HEADER, "").split(",")]
+        hops = [hop for hop in hops if hop]
+        if len(hops) >= PROXY_COUNT:
+            return hops[-PROXY_COUNT]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def caller_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u:{user.uuid}"
+    return f"ip:{client_ip(request)}"
+
+
+def check(request, scope, cost=1, key=None):
+    """
+    Return seconds to wait (0 when allowed) for ``request`` in ``scope``.
+    ``key(request)`` may name what the caller is acting on, e.g. the
+    submitted username; it is hashed into the bucket key.
+    """
+    policy = get_policy(scope)
+    if policy is None:
+        return 0.0
+    bucket = f"rl:{scope}:{caller_key(request)}"
+    target = key(request) if key else None
+    if target:
+        bucket += ":" + hashlib.sha256(target.encode()).hexdigest()[:16]
+    return get_store().take(bucket, policy.rate, policy.capacity, cost)
+
+
+def rate_limit(scope, key=None):
+    """View decorator answering 429 with ``Retry-After`` once over the limit."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            wait = check(request, scope, key=key)
+            if wait:
+                rejections[scope] += 1
+                response = JsonResponse(
+                    {"detail": "Too many requests", "retry_after": round(wait, 3)},
+                    status=429,
+                )
+                response["Retry-After"] = str(math.ceil(wait))
+                return response
+            return view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
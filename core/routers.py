@@ -0,0 +1,144 @@
+"""
+Primary/replica database routing.
+
+Reads for the catalog, progress dashboards and ML exports (the apps in
+``DATABASE_REPLICA_APPS``) go to a healthy replica. Everything else, every
+write, and every read after a write in the same request stays on
+``default``. ML bulk jobs wrap their work in ``ml_connection()`` so ``ai``
+tables use the dedicated ``ml`` connection.
+
+Writes only pin inside a ``pinning_scope`` (the request middleware opens
+one per request), so a long-lived process is never pinned by accident.
+Workers and commands that read what they write (outbox dispatch, the
+media queue, report exports, counters, rosters) run inside
+``primary_only()``; ML bulk jobs such as ``compact_features`` run inside
+``ml_connection()``.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+_pinned = ContextVar("db_pinned_to_primary", default=False)
+_scoped = ContextVar("db_pinning_scope", default=False)
+_ml_bulk = ContextVar("db_ml_bulk_job", default=False)
+
+ML_APPS = {"ai"}
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+@contextmanager
+def pinning_scope(pinned=False):
+    """Start a fresh pinning state, e.g. for one HTTP request."""
+    token = _pinned.set(pinned)
+    scope = _scoped.set(True)
+    try:
+        yield
+    finally:
+        _scoped.reset(scope)
+        _pinned.reset(token)
+
+
+def primary_only():
+    """Force all reads inside the block onto ``default``."""
+    return pinning_scope(True)
+
+
+@contextmanager
+def ml_connection():
+    """Route ``ai`` reads and writes inside the block to the ``ml`` alias."""
+    token = _ml_bulk.set(True)
+    try:
+        yield "ml"
+    finally:
+        _ml_bulk.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Probes replicas with ``SELECT 1`` at most once per interval and keeps
+    failed ones out of rotation until the next successful probe.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(
+            settings, "DATABASE_REPLICA_CHECK_INTERVAL", 30
+        )
+        self._down = set()
+        self._next_check = 0.0
+
+    def healthy(self, aliases):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.interval
+            for alias in aliases:
+                self.check(alias)
+        return [alias for alias in aliases if alias not in self._down]
+
+    def check(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            self._down.add(alias)
+            return False
+        self._down.discard(alias)
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+        self.replica_apps = set(
+            getattr(
+                settings,
+                "DATABASE_REPLICA_APPS",
+                ["lessons", "quizzes", "progress", "ai"],
+            )
+        )
+
+    def _is_ml_job(self, model):
+        return _ml_bulk.get() and model._meta.app_label in ML_APPS
+
+    def db_for_read(self, model, **hints):
+        if self._is_ml_job(model):
+            return "ml"
+        if _pinned.get() or model._meta.app_label not in self.replica_apps:
+            return "default"
+        if not self.replicas:
+            return "default"
+        healthy = replica_health.healthy(self.replicas)
+        return random.choice(healthy) if healthy else "default"
+
+    def db_for_write(self, model, **hints):
+        if self._is_ml_job(model):
+            return "ml"
+        # Reads later in this request must see this write.
+        if _scoped.get():
+            _pinned.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias points at the same logical database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,111 @@
+"""
+Import-time profiling of process startup.
+
+``profile`` starts a fresh interpreter with ``python -X importtime`` that
+does what a worker or cron job does on boot (``TARGETS``) and parses the
+per-module timings Python writes to stderr. ``by_group`` attributes each
+module's own (self) time to the installed app that contains it, or else
+to its top-level package, so the groups add up to the total import time.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from time import perf_counter
+
+from django.apps import apps
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+# -X importtime only reports imports that go through __import__, and Django
+# loads apps, models and settings with importlib.import_module; route it
+# through __import__ before Django binds it so those modules are timed too.
+PRELUDE = (
+    "import importlib, importlib.util, sys\n"
+    "def _import_module(name, package=None):\n"
+    "    name = importlib.util.resolve_name(name, package)\n"
+    "    __import__(name)\n"
+    "    return sys.modules[name]\n"
+    "importlib.import_module = _import_module\n"
+)
+TARGETS = {
+    "setup": "import django; django.setup()",
+    "wsgi": (
+        "from django.core.wsgi import get_wsgi_application\n"
+        "get_wsgi_application()\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns"
+    ),
+    "command": (
+        "import django; django.setup()\n"
+        "from django.core.management import get_commands, load_command_class\n"
+        "load_command_class(get_commands()[{name!r}], {name!r})"
+    ),
+}
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text):
+    """``ImportRecord`` for every ``-X importtime`` line in ``text``."""
+    records = []
+    for line in text.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            records.append(
+                ImportRecord(match[4], int(match[1]), int(match[2]), len(match[3]) // 2)
+            )
+    return records
+
+
+def profile(target="setup", command=None, settings_module=None):
+    """``(records, wall_seconds)`` for booting ``target`` in a new process."""
+    code = PRELUDE + TARGETS[target].format(name=command)
+    env = dict(os.environ)
+    if settings_module:
+        env["DJANGO_SETTINGS_MODULE"] = settings_module
+    started = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.getcwd(),
+    )
+    wall = perf_counter() - started
+    records = parse_importtime(result.stderr)
+    if result.returncode:
+        errors = [
+            line for line in result.stderr.splitlines() if "import time:" not in line
+        ]
+        raise RuntimeError("\n".join(errors[-5:]) or f"exit code {result.returncode}")
+    return records, wall
+
+
+def _app_modules():
+    return sorted(
+        ((config.name, config.label) for config in apps.get_app_configs()),
+        key=lambda item: -len(item[0]),
+    )
+
+
+def by_group(records, app_modules=None):
+    """Self time in microseconds per installed app label or package."""
+    app_modules = _app_modules() if app_modules is None else app_modules
+    totals = Counter()
+    for record in records:
+        for name, label in app_modules:
+            if record.module == name or record.module.startswith(name + "."):
+                totals[f"app:{label}"] += record.self_us
+                break
+        else:
+            totals[record.module.partition(".")[0]] += record.self_us
+    return totals
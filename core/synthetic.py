@@ -0,0 +1,436 @@
+"""
+Deterministic synthetic population for benchmarks and local datasets.
+
+``generate(size, seed)`` fills every app's tables with a skewed but
+reproducible population: a few popular lessons collect most progress,
+attempts and raw ML events, and the raw tables carry the same outliers the
+ML cleaning step has to clip. Children are produced in chunks, so memory
+stays bounded whatever the size. Primary keys are allocated up front so
+foreign keys can be set without reading rows back after each insert.
+
+Rows go through ``bulk_create`` by default. ``RowWriter`` bypasses the
+ORM's SQL compilation (and uses ``COPY`` on PostgreSQL), which is what
+makes tens of millions of rows practical.
+"""
+
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ai.models import (
+    LessonInteractionsRaw,
+    MLModel,
+    MLStudentMap,
+    ProgressRaw,
+    QuizAttemptsRaw,
+    Recommendation,
+)
+from lessons.models import lesson
+from profiles.models import ChildProfile, TeacherProfile, User
+from progress.counters import reconcile_lesson_stats
+from progress.models import Progress
+from quizzes.models import Question, Quiz, QuizAttempt
+
+SIZES = {
+    "small": {"children": 200, "lessons": 40},
+    "medium": {"children": 2_000, "lessons": 200},
+    "large": {"children": 20_000, "lessons": 1_000},
+}
+
+TAGS = ["numbers", "letters", "shapes", "colors", "animals", "music", "science"]
+LEVELS_BY_AGE = {
+    4: [ChildProfile.LearningLevel.BEGINNER] * 8
+    + [ChildProfile.LearningLevel.INTERMIDATE] * 2,
+    5: [ChildProfile.LearningLevel.BEGINNER] * 4
+    + [ChildProfile.LearningLevel.INTERMIDATE] * 5
+    + [ChildProfile.LearningLevel.ADVANCED],
+    6: [ChildProfile.LearningLevel.BEGINNER] * 2
+    + [ChildProfile.LearningLevel.INTERMIDATE] * 5
+    + [ChildProfile.LearningLevel.ADVANCED] * 3,
+}
+DIFFICULTY_WEIGHTS = {
+    lesson.Difficulty.EASY: 5,
+    lesson.Difficulty.MEDIUM: 3,
+    lesson.Difficulty.HARD: 2,
+}
+QUESTIONS_PER_QUIZ = 5
+MODEL_NAME = "synthetic-recommender"
+
+
+class IdAllocator:
+    """Hands out primary keys above the current maximum of each model."""
+
+    def __init__(self):
+        self._next = {}
+
+    def take(self, model, count=1):
+        if model not in self._next:
+            current = model.objects.aggregate(top=Max("pk"))["top"] or 0
+            self._next[model] = current + 1
+        start = self._next[model]
+        self._next[model] += count
+        return range(start, start + count)
+
+
+class RowWriter:
+    """
+    ``Generator`` writer that skips the ORM's per-row SQL compilation.
+
+    Rows are streamed with ``COPY ... FROM STDIN`` on PostgreSQL (psycopg 3)
+    and sent with one ``executemany`` elsewhere. Only fields whose values
+    need adapting (dates, decimals, JSON, UUIDs) go through
+    ``get_db_prep_save``; ``auto_now_add`` fields are filled as by
+    ``bulk_create``.
+    """
+
+    PASSTHROUGH = {
+        "AutoField",
+        "BigAutoField",
+        "SmallAutoField",
+        "IntegerField",
+        "BigIntegerField",
+        "SmallIntegerField",
+        "PositiveIntegerField",
+        "FloatField",
+        "BooleanField",
+        "CharField",
+        "TextField",
+        "SlugField",
+        "URLField",
+        "EmailField",
+    }
+
+    def __init__(self, using="default"):
+        self.using = using
+        self.connection = connections[using]
+        self.use_copy = self.connection.vendor == "postgresql" and self._psycopg3()
+
+    @staticmethod
+    def _psycopg3():
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        return is_psycopg3
+
+    def _preparer(self, field):
+        target = field.target_field if field.is_relation else field
+        stamp = getattr(field, "auto_now", False) or getattr(
+            field, "auto_now_add", False
+        )
+        if target.get_internal_type() in self.PASSTHROUGH and not stamp:
+            attname = field.attname
+            return lambda obj: getattr(obj, attname)
+        connection = self.connection
+        return lambda obj: field.get_db_prep_save(field.pre_save(obj, True), connection)
+
+    def __call__(self, model, objs):
+        ops = self.connection.ops
+        # Leave database-assigned primary keys to their sequence.
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not (field.primary_key and getattr(objs[0], field.attname) is None)
+        ]
+        preparers = [self._preparer(field) for field in fields]
+        rows = ([prepare(obj) for prepare in preparers] for obj in objs)
+        table = ops.quote_name(model._meta.db_table)
+        columns = ", ".join(ops.quote_name(field.column) for field in fields)
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            if self.use_copy:
+                sql = f"COPY {table} ({columns}) FROM STDIN"
+                with cursor.cursor.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                placeholders = ", ".join(["%s"] * len(fields))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows
+                )
+
+
+class Population:
+    """Summary of what ``generate`` inserted."""
+
+    def __init__(self):
+        self.counts = {}
+        self.lesson_ids = []
+        self.quiz_ids = []
+        self.child_ids = []
+
+    def add(self, model, rows):
+        label = model._meta.label
+        self.counts[label] = self.counts.get(label, 0) + rows
+
+    @property
+    def total_rows(self):
+        return sum(self.counts.values())
+
+
+class Generator:
+    def __init__(self, seed=42, batch_size=2_000, now=None, writer=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.now = now or timezone.now()
+        self.ids = IdAllocator()
+        self.population = Population()
+        self.password = make_password(None)
+        self.write = writer or self._bulk_create
+
+    def _bulk_create(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def insert(self, model, objs):
+        if objs:
+            self.write(model, objs)
+            self.population.add(model, len(objs))
+
+    def _when(self, days=90):
+        return self.now - timedelta(seconds=self.rng.uniform(0, days * 86_400))
+
+    def _users(self, prefix, role, count):
+        users = [
+            User(
+                id=pk,
+                uuid=uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                username=f"{prefix}{pk}",
+                email=f"{prefix}{pk}@synthetic.learnify.test",
+                password=self.password,
+                role=role,
+            )
+            for pk in self.ids.take(User, count)
+        ]
+        self.insert(User, users)
+        return users
+
+    def catalog(self, lesson_count):
+        teacher_count = max(2, lesson_count // 10)
+        user_ids = [
+            user.pk for user in self._users("teacher", User.Role.TEACHER, teacher_count)
+        ]
+        teacher_ids = list(self.ids.take(TeacherProfile, teacher_count))
+        lesson_ids = list(self.ids.take(lesson, lesson_count))
+        owners = [self.rng.choice(teacher_ids) for _ in lesson_ids]
+        self.insert(
+            TeacherProfile,
+            [
+                TeacherProfile(id=pk, user_id=user_id, upload_count=owners.count(pk))
+                for pk, user_id in zip(teacher_ids, user_ids)
+            ],
+        )
+        difficulties = list(DIFFICULTY_WEIGHTS)
+        weights = list(DIFFICULTY_WEIGHTS.values())
+        self.insert(
+            lesson,
+            [
+                lesson(
+                    id=pk,
+                    title=f"Synthetic lesson {pk}",
+                    slug=f"synthetic-lesson-{pk}",
+                    description="Generated for load testing",
+                    video_url=f"https://cdn.learnify.test/lessons/{pk}.mp4",
+                    duration_seconds=self.rng.randint(60, 900),
+                    difficulty=self.rng.choices(difficulties, weights)[0],
+                    teacher_id=owner,
+                    tags=self.rng.sample(TAGS, self.rng.randint(1, 3)),
+                    is_published=self.rng.random() < 0.9,
+                )
+                for pk, owner in zip(lesson_ids, owners)
+            ],
+        )
+        quiz_ids = list(self.ids.take(Quiz, lesson_count))
+        self.insert(
+            Quiz,
+            [
+                Quiz(id=pk, lesson_id=lesson_id, title=f"Quiz {pk}")
+                for pk, lesson_id in zip(quiz_ids, lesson_ids)
+            ],
+        )
+        question_ids = iter(self.ids.take(Question, lesson_count * QUESTIONS_PER_QUIZ))
+        questions = []
+        self.answer_keys = {}
+        for quiz_id in quiz_ids:
+            key = []
+            for order in range(QUESTIONS_PER_QUIZ):
+                option_count = self.rng.randint(4, 5)
+                correct = self.rng.randrange(option_count)
+                key.append((option_count, correct))
+                questions.append(
+                    Question(
+                        id=next(question_ids),
+                        quiz_id=quiz_id,
+                        question_text=f"Question {order + 1}",
+                        options=[f"Option {n + 1}" for n in range(option_count)],
+                        correct_option_index=correct,
+                        order=order,
+                    )
+                )
+            self.answer_keys[quiz_id] = key
+        self.insert(Question, questions)
+        self.population.lesson_ids = lesson_ids
+        self.population.quiz_ids = quiz_ids
+        # Zipf-like popularity: a handful of lessons draw most activity.
+        self.lesson_weights = [1 / (rank + 1) for rank in range(lesson_count)]
+        self.quiz_by_lesson = dict(zip(lesson_ids, quiz_ids))
+
+    def children(self, child_count, progress=None):
+        model, _ = MLModel.objects.get_or_create(
+            name=MODEL_NAME, version="1", defaults={"file_path": "synthetic://model"}
+        )
+        self.model_id = model.pk
+        ml_start = (MLStudentMap.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+        for offset in range(0, child_count, self.batch_size):
+            count = min(self.batch_size, child_count - offset)
+            with transaction.atomic():
+                self._child_chunk(count, ml_start + offset)
+            if progress:
+                progress(offset + count, child_count)
+
+    def _child_chunk(self, count, ml_start):
+        rng = self.rng
+        users = self._users("child", User.Role.CHILD, count)
+        child_ids = list(self.ids.take(ChildProfile, count))
+        children, maps, progress, attempts, recs = [], [], [], [], []
+        lesson_raw, quiz_raw, progress_raw = [], [], []
+        for index, (child_id, user) in enumerate(zip(child_ids, users)):
+            age = rng.choice((4, 5, 6))
+            children.append(
+                ChildProfile(
+                    id=child_id,
+                    user_id=user.pk,
+                    age=age,
+                    learning_level=rng.choice(LEVELS_BY_AGE[age]),
+                )
+            )
+            ml_id = ml_start + index
+            ml = {
+                "ml_student_id": ml_id,
+                "student_uuid": str(user.uuid),
+                "child_id": child_id,
+            }
+            maps.append(MLStudentMap(**ml))
+
+            # Heavy-tailed engagement: most children touch a few lessons.
+            wanted = min(
+                int(rng.paretovariate(1.2) * 2), len(self.population.lesson_ids)
+            )
+            opened = set(
+                rng.choices(self.population.lesson_ids, self.lesson_weights, k=wanted)
+            )
+            completed = 0
+            for lesson_id in opened:
+                status = rng.choices(list(Progress.Status), weights=(1, 3, 6))[0]
+                done = status == Progress.Status.COMPLETED
+                completed += done
+                accessed = self._when()
+                progress.append(
+                    Progress(
+                        child_id=child_id,
+                        lesson_id=lesson_id,
+                        status=status,
+                        points_earned=rng.randint(5, 50) if done else 0,
+                        last_accessed=accessed,
+                        completion_date=accessed if done else None,
+                    )
+                )
+                for _ in range(rng.randint(1, 3)):
+                    lesson_raw.append(
+                        LessonInteractionsRaw(
+                            lesson_id=lesson_id,
+                            time_spent=max(0.1, rng.lognormvariate(2, 0.8)),
+                            video_watch_percentage=min(150, rng.uniform(0, 1.6) * 100),
+                            number_of_clicks=rng.randint(-2, 60),
+                            completion_status=done,
+                            **ml,
+                        )
+                    )
+                if done or rng.random() < 0.3:
+                    attempts.extend(self._attempts(child_id, lesson_id, ml, quiz_raw))
+            progress_raw.append(
+                ProgressRaw(
+                    lessons_completed=completed,
+                    badges_earned=rng.randint(0, 14),
+                    streak_days=rng.randint(0, 60),
+                    topic_mastery=rng.uniform(-5, 110),
+                    **ml,
+                )
+            )
+            for lesson_id in rng.sample(self.population.lesson_ids, 3):
+                recs.append(
+                    Recommendation(
+                        child_id=child_id,
+                        lesson_id=lesson_id,
+                        confidence_score=round(rng.random(), 3),
+                        model_id=self.model_id,
+                    )
+                )
+        self.insert(ChildProfile, children)
+        self.insert(MLStudentMap, maps)
+        self.insert(Progress, progress)
+        self.insert(QuizAttempt, attempts)
+        self.insert(LessonInteractionsRaw, lesson_raw)
+        self.insert(QuizAttemptsRaw, quiz_raw)
+        self.insert(ProgressRaw, progress_raw)
+        self.insert(Recommendation, recs)
+        self.population.child_ids.extend(child_ids)
+
+    def _attempts(self, child_id, lesson_id, ml, quiz_raw):
+        rng = self.rng
+        quiz_id = self.quiz_by_lesson[lesson_id]
+        key = self.answer_keys[quiz_id]
+        skill = rng.betavariate(4, 2)
+        for attempt_number in range(1, rng.randint(1, 4) + 1):
+            answers = [
+                correct if rng.random() < skill else rng.randrange(options)
+                for options, correct in key
+            ]
+            right = sum(a == c for a, (_, c) in zip(answers, key))
+            score = Decimal(right * 100 // len(key))
+            duration = rng.randint(5, 240)
+            completed_at = self._when()
+            quiz_raw.append(
+                QuizAttemptsRaw(
+                    lesson_id=lesson_id,
+                    attempt_number=attempt_number,
+                    score=float(score) + rng.choice((0, 0, 0, -10, 15)),
+                    wrong_questions=len(key) - right,
+                    response_time=duration * rng.uniform(0.5, 1.5),
+                    **ml,
+                )
+            )
+            yield QuizAttempt(
+                child_id=child_id,
+                quiz_id=quiz_id,
+                answers=answers,
+                score=score,
+                duration_seconds=duration,
+                completed_at=completed_at,
+            )
+
+    def finish(self):
+        """Fix sequences after explicit ids and rebuild derived counters."""
+        models = [User, TeacherProfile, ChildProfile, lesson, Quiz, Question]
+        connection = connections["default"]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        reconcile_lesson_stats()
+
+
+def generate(
+    size="small", seed=42, children=None, lessons=None, progress=None, **options
+):
+    """Insert a synthetic population and return its ``Population`` summary."""
+    shape = SIZES[size]
+    generator = Generator(seed=seed, **options)
+    with transaction.atomic():
+        generator.catalog(lessons or shape["lessons"])
+    generator.children(children or shape["children"], progress=progress)
+    generator.finish()
+    return generator.population
@@ -1,3 +1,470 @@
-# from django.test import TestCase
+import os
+import subprocess
+import sys
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from ai.models import LessonInteractionsRaw, ProgressRaw
+from core import indexes, instrumentation, outbox, ratelimit, routers, startup
+from core.cache import CachePolicy, model_cache
+from core.db import build_databases, parse_database_url
+from core.models import OutboxEvent
+from core.routers import (
+    PrimaryReplicaRouter,
+    ReplicaHealth,
+    ml_connection,
+    pinning_scope,
+)
+from core.synthetic import generate
+from lessons.models import lesson
+from profiles.models import ChildProfile, User
+from progress.models import Progress
+from quizzes.models import QuizAttempt
+
+
+class DatabaseUrlTests(SimpleTestCase):
+    def test_parses_postgres_url(self):
+        config = parse_database_url(
+            "postgres://ml:s%40lt@db:5433/learnify?sslmode=require"
+        )
+
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["PASSWORD"], "s@lt")
+        self.assertEqual(config["PORT"], "5433")
+        self.assertEqual(config["OPTIONS"], {"sslmode": "require"})
+
+    def test_replicas_mirror_default_under_test(self):
+        databases = build_databases(
+            "sqlite:///primary.sqlite3", replica_urls=["sqlite:///replica.sqlite3"]
+        )
+
+        self.assertEqual(databases["replica_0"]["NAME"], "replica.sqlite3")
+        self.assertEqual(databases["replica_0"]["TEST"], {"MIRROR": "default"})
+        self.assertEqual(databases["ml"]["TEST"], {"MIRROR": "default"})
+
+
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.router.replicas = ["replica_0"]
+        health = ReplicaHealth(interval=3600)
+        health._next_check = float("inf")
+        patcher = mock.patch.object(routers, "replica_health", health)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_catalog_reads_use_replica_until_a_write(self):
+        with pinning_scope():
+            self.assertEqual(self.router.db_for_read(lesson), "replica_0")
+            self.assertEqual(self.router.db_for_read(User), "default")
+            self.assertEqual(self.router.db_for_write(lesson), "default")
+            self.assertEqual(self.router.db_for_read(lesson), "default")
+
+    def test_writes_outside_a_scope_do_not_pin(self):
+        self.assertEqual(self.router.db_for_write(lesson), "default")
+        self.assertFalse(routers.is_pinned())
+        self.assertEqual(self.router.db_for_read(lesson), "replica_0")
+
+    def test_ml_jobs_use_dedicated_connection(self):
+        with ml_connection():
+            self.assertEqual(self.router.db_for_write(LessonInteractionsRaw), "ml")
+            self.assertEqual(self.router.db_for_write(lesson), "default")
+
+
+class HealthTests(TestCase):
+    databases = {"default", "ml"}
+
+    def test_health_reports_connections(self):
+        response = self.client.get(reverse("core:health"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["databases"]["default"]["ok"])
+
+
+class ModelCacheTests(TestCase):
+    def setUp(self):
+        model_cache.local.clear()
+        model_cache.shared.clear()
+        user = User.objects.create_user("kid@example.com", "kid", "pw")
+        self.child = ChildProfile.objects.create(user=user, age=5)
+
+    def test_second_lookup_skips_database(self):
+        model_cache.get(ChildProfile, pk=self.child.pk)
+
+        with self.assertNumQueries(0):
+            cached = model_cache.get(ChildProfile, user_id=self.child.user_id)
+            cached = model_cache.get(ChildProfile, pk=self.child.pk)
+            self.assertEqual(str(cached), "Child: kid")
+
+    def test_save_invalidates_both_tiers_on_commit(self):
+        model_cache.get(ChildProfile, pk=self.child.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.child.age = 6
+            self.child.save()
+            # Until the commit other readers must not cache the old row again.
+            self.assertEqual(model_cache.get(ChildProfile, pk=self.child.pk).age, 5)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(model_cache.get(ChildProfile, pk=self.child.pk).age, 6)
+
+    def test_misses_are_loaded_from_the_primary(self):
+        pinned = []
+        queryset = CachePolicy.queryset
+
+        def recording(policy):
+            pinned.append(routers.is_pinned())
+            return queryset(policy)
+
+        with mock.patch.object(CachePolicy, "queryset", recording):
+            model_cache.get(ChildProfile, pk=self.child.pk)
+
+        self.assertEqual(pinned, [True])
+
+    def test_changed_key_evicts_the_old_value(self):
+        old_user_id = self.child.user_id
+        model_cache.get(ChildProfile, user_id=old_user_id)
+        child = ChildProfile.objects.get(pk=self.child.pk)
+        child.user = User.objects.create_user("new@example.com", "new", "pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            child.save()
+
+        with self.assertRaises(ChildProfile.DoesNotExist):
+            model_cache.get(ChildProfile, user_id=old_user_id)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.metrics.reset()
+        patcher = mock.patch.object(instrumentation, "SAMPLE_RATE", 1.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_queries_are_flagged_and_exported(self):
+        staff = User.objects.create_user("ops@example.com", "ops", "pw", is_staff=True)
+        self.client.force_login(staff)
+        stats = instrumentation.RequestStats()
+        stats.statements['SELECT "x" FROM "accounts_user" WHERE id = %s'] = 8
+        instrumentation.metrics.observe_request("GET", "api/demo/", 200, 0.01, stats)
+
+        self.client.get(reverse("core:cache-stats"))
+        body = self.client.get(reverse("core:metrics")).content.decode()
+
+        self.assertIn(
+            'learnify_n_plus_one_total{route="api/demo/",table="accounts_user"} 1', body
+        )
+        self.assertIn(
+            'learnify_sampled_requests_total{route="api/admin/cache-stats/"} 1', body
+        )
+        self.assertIn("learnify_model_cache_events_total", body)
+
+    def test_proxied_callers_are_not_internal(self):
+        patcher = mock.patch.object(ratelimit, "PROXY_HEADER", "HTTP_X_FORWARDED_FOR")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        url = reverse("core:metrics")
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(
+            self.client.get(url, HTTP_X_FORWARDED_FOR="203.0.113.9").status_code, 403
+        )
+
+
+class GeneratePopulationTests(TestCase):
+    def test_fills_every_app_with_round_tripping_values(self):
+        out = StringIO()
+        call_command(
+            "generate_population",
+            children=30,
+            lessons=6,
+            batch_size=20,
+            force=True,
+            stdout=out,
+        )
+
+        self.assertIn("executemany", out.getvalue())
+        self.assertEqual(ChildProfile.objects.count(), 30)
+        self.assertEqual(lesson.objects.count(), 6)
+        self.assertTrue(
+            set(ChildProfile.objects.values_list("age", flat=True)) <= {4, 5, 6}
+        )
+        attempt = QuizAttempt.objects.first()
+        self.assertIsInstance(attempt.answers, list)
+        self.assertIsInstance(attempt.score, Decimal)
+        self.assertIsNotNone(attempt.created_at)
+        self.assertEqual(ProgressRaw.objects.count(), 30)
+        self.assertFalse(
+            LessonInteractionsRaw.objects.filter(
+                video_watch_percentage__gt=150
+            ).exists()
+        )
+        # Explicit ids must not break later ORM inserts.
+        User.objects.create_user("after@example.com", "after", "pw")
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        ratelimit.get_store().reset()
+        self.addCleanup(ratelimit.get_store().reset)
+
+    def test_bucket_allows_burst_then_refills(self):
+        store = ratelimit.LocalBucketStore()
+        with mock.patch("core.ratelimit.time.monotonic", return_value=100.0):
+            waits = [store.take("k", rate=1.0, capacity=3) for _ in range(4)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 1.0)
+
+        with mock.patch("core.ratelimit.time.monotonic", return_value=101.5):
+            self.assertEqual(store.take("k", rate=1.0, capacity=3), 0.0)
+
+    @override_settings(RATE_LIMITS={"auth": {"rate": "1/m", "burst": 2}})
+    def test_endpoint_answers_429_with_retry_after(self):
+        url = reverse("profiles:token-obtain")
+        statuses = [
+            self.client.post(url, {}, content_type="application/json") for _ in range(3)
+        ]
+
+        self.assertEqual([r.status_code for r in statuses], [401, 401, 429])
+        self.assertEqual(statuses[2]["Retry-After"], "60")
+        self.assertIn(
+            'learnify_rate_limited_total{scope="auth"}',
+            instrumentation.metrics.render(),
+        )
+
+    @override_settings(RATE_LIMITS={"auth": {"rate": "1/m", "burst": 1}})
+    def test_login_buckets_are_per_email_and_forwarded_ip(self):
+        url = reverse("profiles:token-obtain")
+        patcher = mock.patch.object(ratelimit, "PROXY_HEADER", "HTTP_X_FORWARDED_FOR")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def login(email, forwarded):
+            return self.client.post(
+                url,
+                {"email": email, "password": "wrong"},
+                content_type="application/json",
+                HTTP_X_FORWARDED_FOR=forwarded,
+            ).status_code
+
+        self.assertEqual(login("a@example.com", "spoofed, 10.0.0.1"), 401)
+        self.assertEqual(login("A@example.com ", "other, 10.0.0.1"), 429)
+        self.assertEqual(login("b@example.com", "10.0.0.1"), 401)
+        self.assertEqual(login("a@example.com", "10.0.0.2"), 401)
+
+    @override_settings(
+        RATE_LIMITS={"auth": "5/m", "auth_ip": {"rate": "1/m", "burst": 2}}
+    )
+    def test_one_ip_cannot_spray_many_accounts(self):
+        url = reverse("profiles:token-obtain")
+        statuses = [
+            self.client.post(
+                url,
+                {"email": f"kid{n}@example.com", "password": "guess"},
+                content_type="application/json",
+            ).status_code
+            for n in range(3)
+        ]
+
+        self.assertEqual(statuses, [401, 401, 429])
+
+    def test_full_store_evicts_the_least_recently_used_bucket(self):
+        store = ratelimit.LocalBucketStore(max_keys=2)
+        for key in ("a", "b", "a", "c"):
+            store.take(key, rate=1.0, capacity=1)
+
+        self.assertEqual(list(store._buckets), ["a", "c"])
+
+    @override_settings(RATE_LIMITS={"ingest": "1/m"})
+    def test_buckets_are_per_user(self):
+        request = mock.Mock(user=mock.Mock(is_authenticated=True, uuid="a"))
+        other = mock.Mock(user=mock.Mock(is_authenticated=True, uuid="b"))
+
+        self.assertEqual(ratelimit.check(request, "ingest"), 0.0)
+        self.assertGreater(ratelimit.check(request, "ingest"), 0)
+        self.assertEqual(ratelimit.check(other, "ingest"), 0.0)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.batches = []
+        patcher = mock.patch.dict(outbox.HANDLERS, {"test.event": self.handle})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, payloads):
+        self.batches.append([payload["n"] for payload in payloads])
+        if any(payload.get("fail") for payload in payloads):
+            raise ValueError("boom")
+
+    def test_batches_go_to_the_handler_and_failures_are_isolated(self):
+        for n in range(3):
+            outbox.publish("test.event", {"n": n, "fail": n == 1})
+
+        self.assertEqual(outbox.drain(), (2, 1))
+        self.assertEqual(self.batches, [[0, 1, 2], [0], [1], [2]])
+        failed = OutboxEvent.objects.get(processed_at__isnull=True)
+        self.assertEqual((failed.payload["n"], failed.attempts), (1, 1))
+        self.assertGreater(failed.available_at, timezone.now())
+        self.assertEqual(outbox.drain(), (0, 0))
+        self.assertEqual(outbox.lag()["test.event"]["pending"], 1)
+        self.assertIn(
+            'learnify_outbox_pending_events{topic="test.event"} 1',
+            outbox.prometheus_lines(),
+        )
+
+    def test_handlers_run_pinned_to_the_primary(self):
+        pinned = []
+        outbox.publish("test.pinned", {})
+        with mock.patch.dict(
+            outbox.HANDLERS,
+            {"test.pinned": lambda _: pinned.append(routers.is_pinned())},
+        ):
+            outbox.drain()
+
+        self.assertEqual(pinned, [True])
+        self.assertFalse(routers.is_pinned())
+
+    def test_events_outliving_their_lease_give_up(self):
+        outbox.publish("test.event", {"n": 0})
+        for _ in range(outbox.MAX_ATTEMPTS):
+            self.assertEqual(len(outbox.claim_batch("worker-a")), 1)
+            OutboxEvent.objects.update(lease_expires_at=timezone.now())
+
+        self.assertEqual(outbox.claim_batch("worker-b"), [])
+        self.assertEqual(outbox.lag()["test.event"]["dead"], 1)
+
+    def test_expired_leases_are_claimed_again_once(self):
+        outbox.publish("test.event", {"n": 0})
+        stale = outbox.claim_batch("worker-a")
+        self.assertEqual(outbox.claim_batch("worker-b"), [])
+
+        OutboxEvent.objects.update(lease_expires_at=timezone.now())
+        claimed = outbox.claim_batch("worker-b")
+        self.assertEqual(outbox.dispatch(stale), (0, 0))
+        self.assertEqual(outbox.dispatch(claimed), (1, 0))
+        self.assertEqual(self.batches, [[0], [0]])
+        self.assertTrue(OutboxEvent.objects.get().processed_at)
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_self_time_is_grouped_by_app(self):
+        records = startup.parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     ai.events\n"
+            "import time:       300 |        420 |   ai.models\n"
+            "import time:        80 |        80 | numpy.core\n"
+        )
+
+        self.assertEqual(
+            [(r.module, r.depth) for r in records],
+            [("ai.events", 2), ("ai.models", 1), ("numpy.core", 0)],
+        )
+        self.assertEqual(
+            startup.by_group(records, [("ai", "ai")]),
+            {"app:ai": 420, "numpy": 80},
+        )
+
+    def test_batch_settings_boot_without_the_web_stack(self):
+        records, _ = startup.profile(settings_module="kids_App.settings_batch")
+
+        modules = {record.module for record in records}
+        self.assertIn("ai.models", modules)
+        self.assertNotIn("django.contrib.admin", modules)
+        self.assertNotIn("debug_toolbar", modules)
+
+    def test_batch_settings_pass_the_checks_of_manage_py(self):
+        # Commands run the system checks, which load ROOT_URLCONF.
+        result = subprocess.run(
+            [sys.executable, "manage.py", "check"],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "kids_App.settings_batch"},
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("no issues", result.stdout)
+
+
+class IndexAdvisorTests(TransactionTestCase):
+    # Indexes are created and dropped, which SQLite refuses inside atomic().
+
+    def setUp(self):
+        self.population = generate("small", children=10, lessons=4)
+
+    def advise(self, queryset):
+        workload = [("probe", lambda population: list(queryset))]
+        statements = indexes.capture(workload, self.population)
+        return indexes.candidates(statements, min_rows=0)
+
+    def index_names(self, model):
+        with connection.cursor() as cursor:
+            return set(
+                connection.introspection.get_constraints(cursor, model._meta.db_table)
+            )
+
+    def test_workload_reads_stay_on_the_recorded_connection(self):
+        pinned = []
+
+        def probe(population):
+            pinned.append(routers.is_pinned())
+            return list(lesson.objects.filter(is_published=True))
+
+        statements = indexes.capture([("probe", probe)], self.population)
+
+        self.assertEqual(pinned, [True])
+        self.assertEqual(len(statements), 1)
+
+    def test_proposes_measures_and_drops_index(self):
+        [candidate] = self.advise(
+            Progress.objects.filter(completion_date__gte=timezone.now())
+        )
+
+        self.assertEqual(candidate.model, Progress)
+        self.assertEqual(candidate.fields, ["completion_date"])
+        [(statement, before, after, used)] = indexes.measure(candidate, rounds=1)
+        self.assertTrue(used)
+        self.assertNotIn(candidate.index().name, self.index_names(Progress))
+
+    def test_boolean_filter_makes_a_partial_index(self):
+        [candidate] = self.advise(
+            lesson.objects.filter(is_published=True, duration_seconds__gte=60)
+        )
+
+        self.assertEqual(candidate.fields, ["duration_seconds"])
+        self.assertEqual(candidate.condition, {"is_published": True})
+        self.assertIn("condition=models.Q(is_published=True)", candidate.declaration())
+
+    def test_existing_index_is_not_proposed_again(self):
+        self.assertEqual(
+            self.advise(Progress.objects.filter(lesson_id=1, status="completed")), []
+        )
+
+    def test_command_only_explains_on_current_database(self):
+        out = StringIO()
+        with mock.patch.object(indexes, "measure") as measure:
+            call_command(
+                "advise_indexes",
+                "--current-db",
+                "--min-rows=0",
+                "--rounds=1",
+                stdout=out,
+            )
+
+        measure.assert_not_called()
+        self.assertIn("Captured", out.getvalue())
+        self.assertNotIn("etl_pipeline", out.getvalue())
+        self.assertFalse(User.objects.filter(last_login__isnull=False).exists())
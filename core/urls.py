@@ -0,0 +1,11 @@
+from django.urls import path
+
+from core import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("health/", views.health, name="health"),
+    path("admin/cache-stats/", views.cache_stats, name="cache-stats"),
+    path("metrics/", views.prometheus_metrics, name="metrics"),
+]
@@ -1,3 +1,59 @@
-# from django.shortcuts import render
+import time
 
-# Create your views here.
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.cache import model_cache
+from core.instrumentation import metrics
+from core.ratelimit import client_ip
+from core.routers import replica_health
+
+
+@require_GET
+def health(request):
+    """Probe every configured connection; 503 if the primary is down."""
+    databases = {}
+    for alias in connections:
+        started = time.perf_counter()
+        if alias.startswith("replica_"):
+            ok = replica_health.check(alias)
+        else:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                ok = True
+            except DatabaseError:
+                ok = False
+        databases[alias] = {
+            "ok": ok,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    status = 200 if databases["default"]["ok"] else 503
+    return JsonResponse(
+        {"status": "ok" if status == 200 else "degraded", "databases": databases},
+        status=status,
+    )
+
+
+@require_GET
+def cache_stats(request):
+    """Model cache hit/miss counters for this process (staff only)."""
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff account required"}, status=403)
+    return JsonResponse(model_cache.snapshot())
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint for internal IPs and staff. The address is
+    ``client_ip``'s, so traffic relayed by a local proxy is not internal.
+    """
+    internal = client_ip(request) in getattr(settings, "INTERNAL_IPS", [])
+    if not internal and not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -2,15 +2,45 @@
 ASGI config for kids_App project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSockets go to the playground activity endpoint
+(``playground.consumers``). Lifespan events start and stop the playground's
+periodic flush of finished sessions.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kids_App.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from playground.consumers import playground_socket  # noqa: E402
+from playground.sessions import registry  # noqa: E402
+
+
+async def lifespan(scope, receive, send):
+    flusher = None
+    while True:
+        event = await receive()
+        if event["type"] == "lifespan.startup":
+            flusher = asyncio.ensure_future(registry.flush_periodically())
+            await send({"type": "lifespan.startup.complete"})
+        elif event["type"] == "lifespan.shutdown":
+            if flusher:
+                flusher.cancel()
+            await registry.flush()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        return await playground_socket(scope, receive, send)
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from core.db import build_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,7 +26,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-svqz6!xj1od1(r8*%b4dv2&(z#9boc%og$$$$i(w!sf_hvtu!_"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "True") == "True"
 
 ALLOWED_HOSTS = []
 
@@ -37,8 +40,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
     "ai.apps.AiConfig",
+    "analytics.apps.AnalyticsConfig",
     "lessons.apps.LessonsConfig",
     "core.apps.CoreConfig",
     "profiles.apps.ProfilesConfig",
@@ -48,22 +51,51 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "profiles.middleware.TokenAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# debug_toolbar is development-only; production relies on the always-on
+# InstrumentationMiddleware and its /api/metrics/ endpoint instead.
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("core.middleware.ReplicaPinningMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Fraction of requests whose queries are counted and checked for N+1 patterns
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.environ.get("INSTRUMENTATION_SAMPLE_RATE", "0.1")
+)
+
+N_PLUS_ONE_THRESHOLD = 5
+
 AUTH_USER_MODEL = "profiles.User"
 
+# Bearer token signing keys as "kid:secret,kid2:secret2". The first key
+# signs new tokens; all of them verify, so keys can be rotated.
+AUTH_TOKEN_KEYS = dict(
+    item.split(":", 1)
+    for item in os.environ.get("AUTH_TOKEN_KEYS", "").split(",")
+    if ":" in item
+)
+AUTH_TOKEN_ACCESS_TTL = 15 * 60
+AUTH_TOKEN_REFRESH_TTL = 14 * 24 * 3600
+AUTH_TOKEN_REVOCATION_REFRESH = 30
+
 ROOT_URLCONF = "kids_App.urls"
 
 TEMPLATES = [
@@ -87,11 +119,144 @@ WSGI_APPLICATION = "kids_App.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Primary from DATABASE_URL, read replicas from comma-separated
+# DATABASE_REPLICA_URLS and the ML team's connection from ML_DATABASE_URL.
+# Several SQLite files work as local stand-ins for replicas.
+
+DATABASES = build_databases(
+    os.environ.get("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+    replica_urls=[
+        url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url
+    ],
+    ml_url=os.environ.get("ML_DATABASE_URL"),
+    conn_max_age=int(os.environ.get("CONN_MAX_AGE", "60")),
+)
+
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+
+# Apps whose reads may be served by replicas (catalog, dashboards, ML exports)
+DATABASE_REPLICA_APPS = ["lessons", "quizzes", "progress", "ai", "analytics"]
+
+
+# Cache
+# REDIS_URL selects the shared Redis cache; without it each process uses
+# local memory, which is enough for development and tests.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "learnify",
+        }
     }
+
+# Token-bucket limits per scope for core.ratelimit (see that module).
+# Buckets are per process unless RATE_LIMIT_REDIS_URL is set. Behind a load
+# balancer, set RATE_LIMIT_TRUSTED_PROXY_HEADER (e.g. HTTP_X_FORWARDED_FOR)
+# and the number of proxies that append to it; without it every anonymous
+# caller shares the proxy's REMOTE_ADDR.
+
+RATE_LIMITS = {
+    "auth": {"rate": "10/m", "burst": 20},
+    # Every login attempt from one client IP, whichever account it names.
+    "auth_ip": {"rate": "60/m", "burst": 100},
+    "ingest": {"rate": "600/m", "burst": 200},
+    "quiz_attempt": {"rate": "30/m", "burst": 10},
+}
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_TRUSTED_PROXY_HEADER = os.environ.get("RATE_LIMIT_TRUSTED_PROXY_HEADER")
+RATE_LIMIT_TRUSTED_PROXY_COUNT = int(
+    os.environ.get("RATE_LIMIT_TRUSTED_PROXY_COUNT", 1)
+)
+
+# Recommendation impressions/clicks are buffered per process and written in
+# batches (see ai.events).
+
+RECOMMENDATION_EVENT_BATCH_SIZE = 500
+RECOMMENDATION_EVENT_FLUSH_INTERVAL = 5
+
+# Batch recommendations older than this are ignored and the in-process
+# fallback (ai.fallback) serves instead; its lesson matrix is rebuilt every
+# FALLBACK_RECOMMENDER_REFRESH seconds and its stored picks are served for
+# FALLBACK_RECOMMENDATION_TTL seconds before being recomputed.
+
+RECOMMENDATION_STALE_AFTER = 7 * 24 * 3600
+FALLBACK_RECOMMENDER_REFRESH = 600
+FALLBACK_RECOMMENDATION_TTL = 3600
+
+# Feature tables (ai.pipeline) keep a version per student per day;
+# compact_features deletes superseded versions older than this many days.
+
+FEATURE_HISTORY_DAYS = 30
+
+# Domain events in core.outbox are dispatched by drain_outbox in batches.
+# Failed events are retried with exponential backoff and left in the table
+# after OUTBOX_MAX_ATTEMPTS; processed ones are deleted after
+# OUTBOX_KEEP_HOURS.
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_BACKOFF_BASE_SECONDS = 5
+OUTBOX_BACKOFF_MAX_SECONDS = 600
+OUTBOX_KEEP_HOURS = 24
+
+# Quiz submissions (quizzes.submission): the percentage of max_score that
+# completes the lesson, and the badge awarded for a perfect score.
+
+QUIZ_PASS_SCORE = 80
+QUIZ_PERFECT_SCORE_BADGE = "Perfect Score"
+
+# Nightly attention scorer (progress.attention, score_attention): lessons
+# left in progress this many days count as stalled, quiz trends cover the
+# last ATTENTION_TREND_DAYS, and each teacher keeps the top ATTENTION_LIST_SIZE.
+
+ATTENTION_STALL_DAYS = 14
+ATTENTION_TREND_DAYS = 60
+ATTENTION_LIST_SIZE = 25
+
+# Background report exports (progress.reports, run_report_exports) are
+# written here and downloaded through the API. Workers renew their lease
+# while writing; a job whose lease lapses is claimed again, up to
+# REPORT_EXPORT_MAX_ATTEMPTS times. Finished jobs and their files are
+# deleted after REPORT_EXPORT_KEEP_DAYS. Privacy erasure cannot edit these
+# files, so this also bounds how long an erased child's rows survive in them.
+
+REPORT_EXPORT_ROOT = os.environ.get("REPORT_EXPORT_ROOT", BASE_DIR / "reports")
+REPORT_EXPORT_LEASE_SECONDS = 600
+REPORT_EXPORT_MAX_ATTEMPTS = 3
+REPORT_EXPORT_KEEP_DAYS = 7
+
+# Playground activities over WebSockets (see playground.consumers). Finished
+# sessions are written to LessonInteractionsRaw in batches.
+
+PLAYGROUND_ROUNDS = 5
+PLAYGROUND_IDLE_TIMEOUT = 300
+PLAYGROUND_FLUSH_SIZE = 200
+PLAYGROUND_FLUSH_INTERVAL = 10
+
+# Per-model policies for core.cache.model_cache (see that module)
+
+MODEL_CACHE_POLICIES = {
+    "profiles.ChildProfile": {
+        "ttl": 300,
+        "keys": ["pk", "user_id"],
+        "select_related": ["user"],
+    },
+    "lessons.lesson": {
+        "ttl": 600,
+        "keys": ["pk", "slug"],
+        "select_related": ["teacher__user"],
+    },
+    "progress.Badge": {"ttl": 3600, "keys": ["pk", "name"]},
+    "ai.MLModel": {"ttl": 3600},
 }
 
 
@@ -131,6 +296,12 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded media (lesson videos, thumbnails)
+
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,31 @@
+"""
+Slim settings for batch and ETL entry points (ML cron commands)::
+
+    DJANGO_SETTINGS_MODULE=kids_App.settings_batch python manage.py compact_features
+
+Only ``profiles``, ``lessons`` and ``ai`` are installed, with the auth and
+contenttypes apps they need: no admin, sessions, messages, static files,
+debug toolbar, middleware, templates or URLs, so ``django.setup()`` imports a
+fraction of the web stack (see ``manage.py profile_startup``). Everything
+else (databases, routers, tunables) comes from ``kids_App.settings``.
+
+Commands and signal handlers of the other apps are not loaded. Do not
+create lessons or delete children under this profile: the ``progress``
+counters and the ``PROTECT`` checks of ``progress`` and ``quizzes`` would
+not run.
+"""
+
+from kids_App.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "profiles.apps.ProfilesConfig",
+    "lessons.apps.LessonsConfig",
+    "ai.apps.AiConfig",
+]
+
+ROOT_URLCONF = "kids_App.urls_batch"
+MIDDLEWARE = []
+TEMPLATES = []
+DATABASE_REPLICA_APPS = ["lessons", "ai"]
@@ -15,11 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-import debug_toolbar
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("__debug__/", include(debug_toolbar.urls)),
+    path("api/", include("core.urls")),
+    path("api/", include("analytics.urls")),
+    path("api/", include("profiles.urls")),
+    path("api/", include("lessons.urls")),
+    path("api/", include("progress.urls")),
+    path("api/", include("quizzes.urls")),
+    path("api/", include("ai.urls")),
 ]
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    import debug_toolbar
+
+    urlpatterns.append(path("__debug__/", include(debug_toolbar.urls)))
@@ -0,0 +1,7 @@
+"""
+Empty URLconf for ``kids_App.settings_batch``: batch processes serve no
+requests, and the full URLconf imports views of apps that are not installed
+there (the admin among them), which fails the system checks.
+"""
+
+urlpatterns = []
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from lessons.media_queue import InlineExecutor, MediaWorker, recover_stale_leases
+
+
+class Command(BaseCommand):
+    help = "Claim pending media uploads and probe them in a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=2, help="Process pool size (0 = inline)"
+        )
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when idle",
+        )
+        parser.add_argument(
+            "--sweep-interval",
+            type=float,
+            default=60.0,
+            help="Seconds between stale-lease recovery sweeps",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit"
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        executor = ProcessPoolExecutor(workers) if workers else InlineExecutor()
+        # Claim enough work to keep every pool process busy.
+        batch_size = max(options["batch_size"], workers)
+        worker = MediaWorker(executor, batch_size=batch_size)
+        processed, last_sweep = 0, 0.0
+        try:
+            while True:
+                if time.monotonic() - last_sweep >= options["sweep_interval"]:
+                    recovered = recover_stale_leases()
+                    if recovered:
+                        self.stdout.write(f"Recovered {recovered} stale uploads")
+                    last_sweep = time.monotonic()
+                claimed = worker.run_once()
+                processed += claimed
+                if claimed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} uploads"))
@@ -0,0 +1,243 @@
+"""
+Container header probing for lesson videos.
+
+Only the boxes/elements that carry duration and frame size are read, via
+positioned reads, so probing a 500 MB file touches a few KB: MP4 walks the
+top-level box headers to ``moov`` (skipping ``mdat`` by its size) and WebM
+reads the EBML ``Info`` and ``Tracks`` elements ahead of the first cluster.
+This module has no Django imports so it stays cheap in worker processes.
+"""
+
+import os
+import shutil
+import struct
+import subprocess
+
+
+class ProbeError(Exception):
+    """The file is not a container we can read."""
+
+
+class RangeReader:
+    """Positioned reads over a file object, counting the bytes fetched."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.size = os.fstat(fh.fileno()).st_size
+        self.bytes_read = 0
+
+    def read_at(self, offset, length):
+        self.fh.seek(offset)
+        data = self.fh.read(length)
+        self.bytes_read += len(data)
+        return data
+
+
+# MP4 / ISO BMFF
+
+
+def _mp4_boxes(reader, start, end):
+    """Yield ``(type, payload_start, box_end)`` for boxes in ``[start, end)``."""
+    offset = start
+    while offset + 8 <= end:
+        header = reader.read_at(offset, 16)
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_len = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", header[8:16])
+            header_len = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_len:
+            raise ProbeError(f"Corrupt MP4 box at offset {offset}")
+        yield box_type, offset + header_len, offset + size
+        offset += size
+
+
+def _mp4_mvhd(reader, start):
+    version = reader.read_at(start, 1)[0]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", reader.read_at(start + 20, 12))
+    else:
+        timescale, duration = struct.unpack(">II", reader.read_at(start + 12, 8))
+    if not timescale:
+        raise ProbeError("MP4 movie header has no timescale")
+    return duration / timescale
+
+
+def _mp4_tkhd_size(reader, start):
+    version = reader.read_at(start, 1)[0]
+    dims_offset = start + (88 if version == 1 else 76)
+    width, height = struct.unpack(">II", reader.read_at(dims_offset, 8))
+    return width >> 16, height >> 16
+
+
+def probe_mp4(reader):
+    for box_type, start, end in _mp4_boxes(reader, 0, reader.size):
+        if box_type != b"moov":
+            continue
+        info = {"container": "mp4"}
+        for child_type, child_start, child_end in _mp4_boxes(reader, start, end):
+            if child_type == b"mvhd":
+                info["duration_seconds"] = _mp4_mvhd(reader, child_start)
+            elif child_type == b"trak" and "width" not in info:
+                for leaf_type, leaf_start, _ in _mp4_boxes(
+                    reader, child_start, child_end
+                ):
+                    if leaf_type == b"tkhd":
+                        width, height = _mp4_tkhd_size(reader, leaf_start)
+                        if width and height:
+                            info["width"], info["height"] = width, height
+                        break
+        if "duration_seconds" not in info:
+            raise ProbeError("MP4 moov box has no mvhd")
+        return info
+    raise ProbeError("MP4 file has no moov box")
+
+
+# WebM / Matroska (EBML)
+
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+
+
+def _vint(data, pos, keep_marker):
+    first = data[pos]
+    length = 8 - first.bit_length() + 1
+    if not 1 <= length <= 8:
+        raise ProbeError("Invalid EBML variable-length integer")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1 : pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _ebml_elements(reader, start, end):
+    """Yield ``(id, data_start, data_end)`` for elements in ``[start, end)``."""
+    offset = start
+    while offset < end:
+        header = reader.read_at(offset, 12)
+        if len(header) < 2:
+            return
+        element_id, id_len, _ = _vint(header, 0, keep_marker=True)
+        size, size_len, unknown = _vint(header, id_len, keep_marker=False)
+        data_start = offset + id_len + size_len
+        data_end = end if unknown else data_start + size
+        yield element_id, data_start, data_end
+        offset = data_end
+
+
+def _ebml_uint(reader, start, end):
+    return int.from_bytes(reader.read_at(start, end - start), "big")
+
+
+def _ebml_float(reader, start, end):
+    data = reader.read_at(start, end - start)
+    return struct.unpack(">f" if len(data) == 4 else ">d", data)[0]
+
+
+def probe_webm(reader):
+    elements = _ebml_elements(reader, 0, reader.size)
+    if next(elements, (None,))[0] != EBML_HEADER:
+        raise ProbeError("Not an EBML file")
+    for element_id, start, end in elements:
+        if element_id == SEGMENT:
+            break
+    else:
+        raise ProbeError("WebM file has no segment")
+
+    info = {"container": "webm"}
+    timecode_scale, duration = 1_000_000, None
+    for element_id, child_start, child_end in _ebml_elements(reader, start, end):
+        if element_id == INFO:
+            for field_id, f_start, f_end in _ebml_elements(
+                reader, child_start, child_end
+            ):
+                if field_id == TIMECODE_SCALE:
+                    timecode_scale = _ebml_uint(reader, f_start, f_end)
+                elif field_id == DURATION:
+                    duration = _ebml_float(reader, f_start, f_end)
+        elif element_id == TRACKS:
+            info.update(_webm_video_size(reader, child_start, child_end))
+        elif element_id == CLUSTER:
+            break
+    if duration is None:
+        raise ProbeError("WebM segment info has no duration")
+    info["duration_seconds"] = duration * timecode_scale / 1e9
+    return info
+
+
+def _webm_video_size(reader, start, end):
+    for entry_id, e_start, e_end in _ebml_elements(reader, start, end):
+        if entry_id != TRACK_ENTRY:
+            continue
+        for field_id, f_start, f_end in _ebml_elements(reader, e_start, e_end):
+            if field_id != VIDEO:
+                continue
+            size = {}
+            for video_id, v_start, v_end in _ebml_elements(reader, f_start, f_end):
+                if video_id == PIXEL_WIDTH:
+                    size["width"] = _ebml_uint(reader, v_start, v_end)
+                elif video_id == PIXEL_HEIGHT:
+                    size["height"] = _ebml_uint(reader, v_start, v_end)
+            return size
+    return {}
+
+
+PROBES = {
+    "video/mp4": probe_mp4,
+    "video/webm": probe_webm,
+}
+
+
+def probe_video(path, file_type):
+    """Return container metadata plus how many bytes the probe read."""
+    with open(path, "rb") as fh:
+        reader = RangeReader(fh)
+        info = PROBES[file_type](reader)
+        info["size_bytes"] = reader.size
+        info["bytes_read"] = reader.bytes_read
+    return info
+
+
+def generate_thumbnail(path, duration_seconds, output_path, width=480, timeout=60):
+    """
+    Grab one frame with ffmpeg, seeking before the input so only the data
+    around the nearest keyframe is decoded. Returns False if ffmpeg is not
+    installed.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    at = min(1.0, (duration_seconds or 0) / 2)
+    subprocess.run(
+        [
+            ffmpeg,
+            "-v",
+            "error",
+            "-y",
+            "-ss",
+            f"{at:.3f}",
+            "-i",
+            path,
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale={width}:-2",
+            output_path,
+        ],
+        check=True,
+        timeout=timeout,
+        capture_output=True,
+    )
+    return True
@@ -0,0 +1,250 @@
+"""
+Processing queue for ``MediaUpload`` rows.
+
+Workers claim pending uploads in batches with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and lease them, so any number of workers (threads, processes or
+hosts) can poll the same table without double-processing. CPU-bound probing
+runs in an executor: a process pool in production, ``InlineExecutor`` in
+tests. Failed attempts are retried with exponential backoff and uploads
+whose worker died are returned to the queue by ``recover_stale_leases``.
+Every status change goes through ``_move``, which only allows the moves in
+``MediaUpload.TRANSITIONS``.
+Finished video uploads fill in their lesson's duration and thumbnail.
+"""
+
+import logging
+import os
+import random
+import socket
+import subprocess
+from concurrent.futures import Executor, Future
+from datetime import timedelta
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.routers import primary_only
+from lessons.media_probe import PROBES, ProbeError, generate_thumbnail, probe_video
+from lessons.models import MediaUpload, lesson
+
+logger = logging.getLogger(__name__)
+
+Status = MediaUpload.Status
+
+MAX_ATTEMPTS = getattr(settings, "MEDIA_QUEUE_MAX_ATTEMPTS", 5)
+LEASE_SECONDS = getattr(settings, "MEDIA_QUEUE_LEASE_SECONDS", 300)
+BACKOFF_BASE_SECONDS = getattr(settings, "MEDIA_QUEUE_BACKOFF_BASE_SECONDS", 30)
+BACKOFF_MAX_SECONDS = getattr(settings, "MEDIA_QUEUE_BACKOFF_MAX_SECONDS", 3600)
+
+# Retrying cannot fix these, so the upload fails on the first attempt.
+PERMANENT_ERRORS = (ProbeError,)
+
+
+class InlineExecutor(Executor):
+    """Runs submitted work immediately in the calling thread."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter, capped at ``BACKOFF_MAX_SECONDS``."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _move(uploads, source, target, **changes):
+    """Move the ``source`` rows of ``uploads`` to ``target``; returns the count."""
+    if target not in MediaUpload.TRANSITIONS[source]:
+        raise ValueError(f"Media upload cannot go from {source} to {target}")
+    return uploads.filter(status=source).update(status=target, **changes)
+
+
+def claim_batch(worker_id, batch_size=10):
+    """Lease up to ``batch_size`` pending uploads to ``worker_id``."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            MediaUpload.objects.select_for_update(skip_locked=True)
+            .filter(status=Status.PENDING, available_at__lte=now)
+            .order_by("created_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        # Re-checking the status keeps backends without row locks honest.
+        _move(
+            MediaUpload.objects.filter(pk__in=ids),
+            Status.PENDING,
+            Status.PROCESSING,
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=F("attempts") + 1,
+        )
+    return list(
+        MediaUpload.objects.filter(
+            pk__in=ids, status=Status.PROCESSING, locked_by=worker_id
+        )
+    )
+
+
+def _leased(upload):
+    return MediaUpload.objects.filter(pk=upload.pk, locked_by=upload.locked_by)
+
+
+def mark_done(upload, result):
+    """Record a successful result; returns False if the lease was lost."""
+    now = timezone.now()
+    updated = _move(
+        _leased(upload),
+        Status.PROCESSING,
+        Status.DONE,
+        metadata=result,
+        processed_at=now,
+        locked_by="",
+        lease_expires_at=None,
+        last_error=None,
+    )
+    if updated:
+        apply_result(upload, result)
+    return bool(updated)
+
+
+def mark_failed(upload, error, retry=True):
+    """Schedule a retry, or fail permanently once attempts are exhausted."""
+    now = timezone.now()
+    if not retry or upload.attempts >= MAX_ATTEMPTS:
+        target, changes = Status.FAILED, {"processed_at": now}
+    else:
+        target = Status.PENDING
+        changes = {"available_at": now + backoff_delay(upload.attempts)}
+    return bool(
+        _move(
+            _leased(upload),
+            Status.PROCESSING,
+            target,
+            locked_by="",
+            lease_expires_at=None,
+            last_error=str(error),
+            **changes,
+        )
+    )
+
+
+def recover_stale_leases():
+    """Requeue uploads whose worker stopped renewing its lease."""
+    now = timezone.now()
+    stale = MediaUpload.objects.filter(lease_expires_at__lt=now)
+    released = {
+        "locked_by": "",
+        "lease_expires_at": None,
+        "last_error": "Lease expired",
+    }
+    exhausted = _move(
+        stale.filter(attempts__gte=MAX_ATTEMPTS),
+        Status.PROCESSING,
+        Status.FAILED,
+        processed_at=now,
+        **released,
+    )
+    requeued = _move(
+        stale, Status.PROCESSING, Status.PENDING, available_at=now, **released
+    )
+    return requeued + exhausted
+
+
+def resolve_local_path(file_url):
+    """Map a MEDIA_URL or ``file://`` URL onto the local filesystem, if possible."""
+    parsed = urlparse(file_url)
+    if parsed.scheme == "file":
+        return unquote(parsed.path)
+    media_url = urlparse(getattr(settings, "MEDIA_URL", "") or "").path
+    media_root = getattr(settings, "MEDIA_ROOT", "")
+    if media_root and media_url and parsed.path.startswith(media_url):
+        return os.path.join(media_root, unquote(parsed.path[len(media_url) :]))
+    return None
+
+
+def process_media(payload):
+    """
+    Probe one upload. Runs inside the executor, so it only receives and
+    returns plain picklable data and never touches the database.
+    """
+    path = payload["path"]
+    if path is None:
+        return {"remote": True}
+    if payload["file_type"] not in PROBES:
+        return {"size_bytes": os.path.getsize(path)}
+    info = probe_video(path, payload["file_type"])
+    try:
+        if generate_thumbnail(path, info["duration_seconds"], f"{path}.jpg"):
+            info["thumbnail_url"] = f"{payload['file_url']}.jpg"
+    except (subprocess.SubprocessError, OSError) as exc:
+        info["thumbnail_error"] = str(exc)
+    return info
+
+
+def apply_result(upload, result):
+    """Fill the linked lesson's duration and thumbnail unless set by hand."""
+    if upload.lesson_id is None:
+        return
+    lessons = lesson.objects.filter(pk=upload.lesson_id)
+    if result.get("duration_seconds") is not None:
+        lessons.filter(duration_seconds__isnull=True).update(
+            duration_seconds=round(result["duration_seconds"])
+        )
+    if result.get("thumbnail_url"):
+        lessons.filter(Q(thumbnail_url__isnull=True) | Q(thumbnail_url="")).update(
+            thumbnail_url=result["thumbnail_url"]
+        )
+
+
+def _payload(upload):
+    return {
+        "id": upload.pk,
+        "file_type": upload.file_type,
+        "file_url": upload.file_url,
+        "path": resolve_local_path(upload.file_url),
+    }
+
+
+class MediaWorker:
+    """Claims batches and fans them out to an executor."""
+
+    def __init__(self, executor, worker_id=None, batch_size=10):
+        self.executor = executor
+        self.worker_id = worker_id or default_worker_id()
+        self.batch_size = batch_size
+
+    def run_once(self):
+        """Process one batch; returns the number of uploads claimed."""
+        with primary_only():
+            return self._run_once()
+
+    def _run_once(self):
+        uploads = claim_batch(self.worker_id, self.batch_size)
+        futures = [
+            (upload, self.executor.submit(process_media, _payload(upload)))
+            for upload in uploads
+        ]
+        for upload, future in futures:
+            try:
+                result = future.result()
+            except Exception as exc:
+                logger.warning("Media upload %s failed: %s", upload.pk, exc)
+                mark_failed(upload, exc, retry=not isinstance(exc, PERMANENT_ERRORS))
+            else:
+                mark_done(upload, result)
+        return len(uploads)
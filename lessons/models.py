@@ -1,6 +1,9 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
-from django.conf import settings
 
 from profiles.models import TeacherProfile
 
@@ -54,6 +57,12 @@ class lesson(models.Model):
             models.Index(fields=["slug"]),
             models.Index(fields=["difficulty"]),
             models.Index(fields=["is_published", "created_at"]),
+            # Catalog pages in display order; drafts are never listed.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_published=True),
+                name="lesson_catalog_idx",
+            ),
         ]
         ordering = ["-created_at"]
 
@@ -81,6 +90,15 @@ class MediaUpload(models.Model):
         IMAGE_PNG = "image/png", "PNG Image"
         IMAGE_JPG = "image/jpg", "JPG Image"
 
+    # Allowed status changes; anything else is a bug in the worker. A
+    # pending upload may be re-pointed at a new file until it is claimed.
+    TRANSITIONS = {
+        Status.PENDING: {Status.PROCESSING, Status.PENDING},
+        Status.PROCESSING: {Status.DONE, Status.PENDING, Status.FAILED},
+        Status.FAILED: {Status.PENDING},
+        Status.DONE: set(),
+    }
+
     uploader = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -88,6 +106,14 @@ class MediaUpload(models.Model):
         related_name="media_uploads",
         help_text="User who uploaded the file",
     )
+    lesson = models.ForeignKey(
+        lesson,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="media_uploads",
+        help_text="Lesson the file belongs to",
+    )
     file_url = models.URLField(max_length=500, help_text="URL of uploaded file")
     file_type = models.CharField(
         max_length=50, choices=FileType.choices, help_text="MIME type of the file"
@@ -98,13 +124,107 @@ class MediaUpload(models.Model):
         default=Status.PENDING,
         help_text="Current processing status",
     )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, help_text="Processing attempts so far"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Earliest time a worker may claim the upload"
+    )
+    locked_by = models.CharField(
+        max_length=100, blank=True, default="", help_text="Worker holding the lease"
+    )
+    lease_expires_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the worker lease lapses"
+    )
+    last_error = models.TextField(
+        null=True, blank=True, help_text="Error from the last failed attempt"
+    )
+    metadata = models.JSONField(
+        null=True, blank=True, help_text="Probe results from processing"
+    )
+    processed_at = models.DateTimeField(
+        null=True, blank=True, help_text="When processing finished"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "lessons_mediaupload"
         indexes = [
             models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["status", "lease_expires_at"]),
         ]
 
+    def can_transition(self, status):
+        return status in self.TRANSITIONS[self.status]
+
+    def accepts_new_file(self):
+        """Whether a finished upload session may requeue this row."""
+        return self.status != self.Status.PROCESSING and self.can_transition(
+            self.Status.PENDING
+        )
+
     def __str__(self):
         return f"{self.file_type} - {self.status}"
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload in flight"""
+
+    class Status(models.TextChoices):
+        OPEN = "open", "Open"
+        COMPLETE = "complete", "Complete"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        help_text="User sending the chunks",
+    )
+    lesson = models.ForeignKey(
+        lesson,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Lesson the finished file belongs to",
+    )
+    media_upload = models.ForeignKey(
+        MediaUpload,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_sessions",
+        help_text="Upload row created or advanced when the last chunk lands",
+    )
+    filename = models.CharField(max_length=255, help_text="Client file name")
+    file_type = models.CharField(
+        max_length=50,
+        choices=MediaUpload.FileType.choices,
+        help_text="MIME type of the file",
+    )
+    total_size = models.BigIntegerField(help_text="Final file size in bytes")
+    received_bytes = models.BigIntegerField(
+        default=0, help_text="Contiguous bytes stored so far (resume offset)"
+    )
+    storage_key = models.CharField(
+        max_length=255, help_text="Object key in the upload storage backend"
+    )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.OPEN
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "lessons_uploadsession"
+        indexes = [
+            models.Index(fields=["uploader", "status"]),
+        ]
+
+    @property
+    def is_complete(self):
+        return self.received_bytes >= self.total_size
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
@@ -0,0 +1,87 @@
+"""
+Storage backends for chunked uploads.
+
+Backends write each chunk at its byte offset as it streams in, so a worker
+never holds more than one read block of a video in memory. The backend is
+chosen with the ``MEDIA_UPLOAD_STORAGE`` setting (a dotted path).
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+from urllib.parse import quote, urljoin
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+BLOCK_SIZE = 64 * 1024
+
+
+class LocalChunkStorage:
+    """Writes uploads under ``MEDIA_ROOT/uploads``."""
+
+    prefix = "uploads"
+
+    def __init__(self, location=None, base_url=None):
+        self.location = os.fspath(location or settings.MEDIA_ROOT)
+        self.base_url = base_url or settings.MEDIA_URL
+
+    def path(self, key):
+        return os.path.join(self.location, self.prefix, key)
+
+    def create(self, key):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+
+    def write(self, key, offset, blocks):
+        """
+        Write ``blocks`` starting at ``offset``; returns the byte count and
+        SHA-256 hex digest of what was written.
+        """
+        digest = hashlib.sha256()
+        written = 0
+        with open(self.path(key), "r+b") as fh:
+            fh.seek(offset)
+            for block in blocks:
+                fh.write(block)
+                digest.update(block)
+                written += len(block)
+            fh.flush()
+            os.fsync(fh.fileno())
+        return written, digest.hexdigest()
+
+    def truncate(self, key, size):
+        with open(self.path(key), "r+b") as fh:
+            fh.truncate(size)
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def url(self, key):
+        return urljoin(self.base_url, quote(f"{self.prefix}/{key}"))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=1)
+def get_upload_storage():
+    backend = getattr(
+        settings, "MEDIA_UPLOAD_STORAGE", "lessons.storage.LocalChunkStorage"
+    )
+    return import_string(backend)()
+
+
+def read_blocks(stream, length, block_size=BLOCK_SIZE):
+    """Yield exactly ``length`` bytes from ``stream`` in bounded blocks."""
+    remaining = length
+    while remaining > 0:
+        block = stream.read(min(block_size, remaining))
+        if not block:
+            raise EOFError(f"Stream ended with {remaining} bytes outstanding")
+        remaining -= len(block)
+        yield block
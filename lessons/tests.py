@@ -1,3 +1,280 @@
-# from django.test import TestCase
+import hashlib
+import os
+import struct
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lessons import media_queue
+from lessons.media_probe import probe_video
+from lessons.media_queue import InlineExecutor, MediaWorker
+from lessons.models import MediaUpload, UploadSession, lesson
+from lessons.storage import get_upload_storage
+from profiles.models import TeacherProfile, User
+
+
+def _box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _ebml(element_id, payload):
+    return element_id + bytes([0x80 | len(payload)]) + payload
+
+
+def write_mp4(path, seconds, padding):
+    """moov after a huge (sparse) mdat, as in non-faststart files."""
+    mvhd = _box(b"mvhd", bytes(12) + struct.pack(">II", 1000, seconds * 1000))
+    with open(path, "wb") as fh:
+        fh.write(_box(b"ftyp", b"isom\0\0\0\0"))
+        fh.write(struct.pack(">I4s", 8 + padding, b"mdat"))
+        fh.seek(padding, os.SEEK_CUR)
+        fh.write(_box(b"moov", mvhd))
+
+
+def write_webm(path, seconds, padding):
+    info = _ebml(
+        b"\x15\x49\xa9\x66", _ebml(b"\x44\x89", struct.pack(">d", seconds * 1e3))
+    )
+    cluster = b"\x1f\x43\xb6\x75\x01\xff\xff\xff\xff\xff\xff\xff"
+    with open(path, "wb") as fh:
+        fh.write(_ebml(b"\x1a\x45\xdf\xa3", _ebml(b"\x42\x82", b"webm")))
+        fh.write(b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff")
+        fh.write(info + cluster)
+        fh.truncate(fh.tell() + padding)
+
+
+class MediaQueueTests(TestCase):
+    def _upload(self, **kwargs):
+        return MediaUpload.objects.create(
+            file_url="https://cdn.example.com/a.mp4",
+            file_type=MediaUpload.FileType.VIDEO_MP4,
+            **kwargs,
+        )
+
+    def test_claimed_uploads_are_not_claimed_twice(self):
+        for _ in range(3):
+            self._upload()
+
+        first = media_queue.claim_batch("worker-a", batch_size=2)
+        second = media_queue.claim_batch("worker-b", batch_size=2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({u.pk for u in first} & {u.pk for u in second})
+
+    def test_worker_marks_uploads_done(self):
+        upload = self._upload()
+
+        processed = MediaWorker(InlineExecutor(), worker_id="w").run_once()
+
+        upload.refresh_from_db()
+        self.assertEqual(processed, 1)
+        self.assertEqual(upload.status, MediaUpload.Status.DONE)
+        self.assertEqual(upload.metadata, {"remote": True})
+        self.assertEqual(upload.attempts, 1)
+
+    def test_failures_back_off_then_fail(self):
+        upload = self._upload()
+        worker = MediaWorker(InlineExecutor(), worker_id="w")
+
+        with mock.patch.object(media_queue, "process_media", side_effect=OSError):
+            worker.run_once()
+            upload.refresh_from_db()
+            self.assertEqual(upload.status, MediaUpload.Status.PENDING)
+            self.assertGreater(upload.available_at, timezone.now())
+
+            MediaUpload.objects.filter(pk=upload.pk).update(
+                attempts=media_queue.MAX_ATTEMPTS - 1, available_at=timezone.now()
+            )
+            worker.run_once()
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, MediaUpload.Status.FAILED)
+
+    def test_stale_leases_are_requeued(self):
+        upload = self._upload(
+            status=MediaUpload.Status.PROCESSING,
+            locked_by="dead-worker",
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+            attempts=1,
+        )
+
+        self.assertEqual(media_queue.recover_stale_leases(), 1)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, MediaUpload.Status.PENDING)
+        self.assertEqual(upload.locked_by, "")
+
+    def test_queue_refuses_status_changes_outside_transitions(self):
+        upload = self._upload(status=MediaUpload.Status.DONE)
+        with self.assertRaises(ValueError):
+            media_queue._move(
+                MediaUpload.objects.filter(pk=upload.pk),
+                MediaUpload.Status.DONE,
+                MediaUpload.Status.PENDING,
+            )
+        self.assertFalse(media_queue.mark_failed(upload, "late failure"))
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, MediaUpload.Status.DONE)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_upload_storage.cache_clear()
+        self.addCleanup(get_upload_storage.cache_clear)
+        self.teacher = User.objects.create_user(
+            "t@example.com", "t", "pw", role=User.Role.TEACHER
+        )
+        self.client.force_login(self.teacher)
+
+    def _put(self, session_id, data, start, total, checksum=None):
+        return self.client.put(
+            reverse("lessons:upload-chunk", args=[session_id]),
+            data,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{total}",
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(data).hexdigest(),
+        )
+
+    def test_resumable_upload_creates_media_upload(self):
+        payload = b"0123456789" * 10
+        response = self.client.post(
+            reverse("lessons:upload-start"),
+            {"filename": "intro.mp4", "file_type": "video/mp4", "total_size": 100},
+            content_type="application/json",
+        )
+        session_id = response.json()["id"]
+
+        self.assertEqual(self._put(session_id, payload[:40], 0, 100).status_code, 200)
+        bad = self._put(session_id, payload[40:], 40, 100, checksum="0" * 64)
+        self.assertEqual(bad.status_code, 422)
+        skipped = self._put(session_id, payload[60:], 60, 100)
+        self.assertEqual(skipped.status_code, 409)
+        self.assertEqual(skipped.json()["offset"], 40)
+        self.assertEqual(self._put(session_id, payload[40:], 40, 100).status_code, 200)
+
+        session = UploadSession.objects.get(pk=session_id)
+        self.assertEqual(session.status, UploadSession.Status.COMPLETE)
+        self.assertEqual(session.media_upload.status, MediaUpload.Status.PENDING)
+        storage = get_upload_storage()
+        with open(storage.path(session.storage_key), "rb") as fh:
+            self.assertEqual(fh.read(), payload)
+
+    def _start(self, **extra):
+        return self.client.post(
+            reverse("lessons:upload-start"),
+            {
+                "filename": "intro.mp4",
+                "file_type": "video/mp4",
+                "total_size": 10,
+                **extra,
+            },
+            content_type="application/json",
+        )
+
+    def test_dot_file_names_are_refused(self):
+        for name in ("..", "uploads/.", ""):
+            response = self._start(filename=name)
+            self.assertEqual(response.status_code, 400, name)
+
+    def test_finished_upload_cannot_be_replaced(self):
+        upload = MediaUpload.objects.create(
+            uploader=self.teacher,
+            file_url="http://example.com/a.mp4",
+            file_type=MediaUpload.FileType.VIDEO_MP4,
+            status=MediaUpload.Status.DONE,
+        )
+        response = self._start(media_upload_id=upload.pk)
+        self.assertEqual(response.status_code, 409)
+
+    def test_upload_claimed_mid_session_is_left_to_its_worker(self):
+        upload = MediaUpload.objects.create(
+            uploader=self.teacher,
+            file_url="http://example.com/a.mp4",
+            file_type=MediaUpload.FileType.VIDEO_MP4,
+        )
+        session_id = self._start(media_upload_id=upload.pk).json()["id"]
+        MediaUpload.objects.filter(pk=upload.pk).update(
+            status=MediaUpload.Status.PROCESSING, locked_by="worker-1", attempts=1
+        )
+
+        response = self._put(session_id, b"0123456789", 0, 10)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()["media_upload_id"], upload.pk)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, MediaUpload.Status.PROCESSING)
+        self.assertEqual(upload.locked_by, "worker-1")
+        self.assertEqual(upload.file_url, "http://example.com/a.mp4")
+
+
+class MediaProbeTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_probes_read_only_headers_of_large_files(self):
+        cases = [("video/mp4", write_mp4), ("video/webm", write_webm)]
+        for file_type, writer in cases:
+            with self.subTest(file_type):
+                path = os.path.join(self.dir, file_type.replace("/", "."))
+                writer(path, 95, padding=500 * 1024**2)
+
+                info = probe_video(path, file_type)
+
+                self.assertAlmostEqual(info["duration_seconds"], 95)
+                self.assertLess(info["bytes_read"], 4096)
+
+    def test_finished_upload_fills_lesson_duration(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        target = lesson.objects.create(
+            title="Shapes", description="", video_url="https://x", teacher=teacher
+        )
+        path = os.path.join(self.dir, "shapes.mp4")
+        write_mp4(path, 42, padding=1024)
+        MediaUpload.objects.create(
+            lesson=target, file_url=f"file://{path}", file_type="video/mp4"
+        )
+
+        MediaWorker(InlineExecutor(), worker_id="w").run_once()
+
+        target.refresh_from_db()
+        self.assertEqual(target.duration_seconds, 42)
+
+
+class CatalogTests(TestCase):
+    def test_lists_published_lessons_by_page(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        for n in range(3):
+            lesson.objects.create(
+                title=f"Lesson {n}",
+                description="",
+                video_url="https://x",
+                teacher=teacher,
+                is_published=n != 1,
+                difficulty="hard" if n == 2 else "easy",
+            )
+
+        response = self.client.get(reverse("lessons:catalog"))
+        hard = self.client.get(reverse("lessons:catalog"), {"difficulty": "hard"})
+
+        self.assertEqual(
+            [row["slug"] for row in response.json()["results"]],
+            ["lesson-2", "lesson-0"],
+        )
+        self.assertFalse(response.json()["has_next"])
+        self.assertEqual(len(hard.json()["results"]), 1)
+        self.assertEqual(
+            self.client.get(reverse("lessons:catalog"), {"page": "x"}).status_code, 400
+        )
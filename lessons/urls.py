@@ -0,0 +1,11 @@
+from django.urls import path
+
+from lessons import views
+
+app_name = "lessons"
+
+urlpatterns = [
+    path("lessons/", views.catalog, name="catalog"),
+    path("uploads/", views.start_upload, name="upload-start"),
+    path("uploads/<uuid:pk>/", views.upload_chunk, name="upload-chunk"),
+]
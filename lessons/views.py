@@ -1,3 +1,239 @@
-# from django.shortcuts import render
+import json
+import os
+import re
 
-# Create your views here.
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import (
+    require_GET,
+    require_http_methods,
+    require_POST,
+)
+
+from core.ratelimit import rate_limit
+from lessons.models import MediaUpload, UploadSession, lesson
+from lessons.storage import get_upload_storage, read_blocks
+from profiles.models import User
+
+MAX_UPLOAD_BYTES = getattr(settings, "MEDIA_UPLOAD_MAX_BYTES", 5 * 1024**3)
+MAX_CHUNK_BYTES = getattr(settings, "MEDIA_UPLOAD_MAX_CHUNK_BYTES", 64 * 1024**2)
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+UPLOADER_ROLES = {User.Role.TEACHER, User.Role.ADMIN}
+CATALOG_PAGE_SIZE = getattr(settings, "CATALOG_PAGE_SIZE", 20)
+CATALOG_FIELDS = (
+    "id",
+    "title",
+    "slug",
+    "difficulty",
+    "duration_seconds",
+    "thumbnail_url",
+    "tags",
+    "created_at",
+)
+
+
+def _forbidden(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"detail": "Authentication required"}, status=401)
+    if request.user.role not in UPLOADER_ROLES:
+        return JsonResponse({"detail": "Teacher account required"}, status=403)
+    return None
+
+
+@require_GET
+def catalog(request):
+    """Published lessons, newest first, optionally filtered by difficulty."""
+    lessons = lesson.objects.filter(is_published=True)
+    difficulty = request.GET.get("difficulty")
+    if difficulty:
+        if difficulty not in lesson.Difficulty.values:
+            return JsonResponse(
+                {"detail": f"Unknown difficulty {difficulty}"}, status=400
+            )
+        lessons = lessons.filter(difficulty=difficulty)
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        return JsonResponse({"detail": "page must be an integer"}, status=400)
+    start = (page - 1) * CATALOG_PAGE_SIZE
+    # One extra row tells us whether another page exists without a COUNT.
+    rows = list(
+        lessons.order_by("-created_at", "-id").values(*CATALOG_FIELDS)[
+            start : start + CATALOG_PAGE_SIZE + 1
+        ]
+    )
+    return JsonResponse(
+        {
+            "page": page,
+            "has_next": len(rows) > CATALOG_PAGE_SIZE,
+            "results": rows[:CATALOG_PAGE_SIZE],
+        }
+    )
+
+
+def _session_state(session):
+    return {
+        "id": str(session.id),
+        "status": session.status,
+        "offset": session.received_bytes,
+        "total_size": session.total_size,
+        "media_upload_id": session.media_upload_id,
+    }
+
+
+@require_POST
+@rate_limit("ingest")
+def start_upload(request):
+    """Open a resumable upload session and return its id and offset."""
+    denied = _forbidden(request)
+    if denied:
+        return denied
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(str(data["filename"]))[:255]
+        file_type = data["file_type"]
+        total_size = int(data["total_size"])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {"detail": "filename, file_type and total_size are required"}, status=400
+        )
+    if file_type not in MediaUpload.FileType.values:
+        return JsonResponse(
+            {"detail": f"Unsupported file type {file_type}"}, status=400
+        )
+    if not 0 < total_size <= MAX_UPLOAD_BYTES:
+        return JsonResponse({"detail": "total_size out of range"}, status=400)
+    if filename in ("", ".", ".."):
+        return JsonResponse({"detail": "filename is not a file name"}, status=400)
+
+    target_lesson = None
+    if data.get("lesson_id") is not None:
+        lessons = lesson.objects.all()
+        if request.user.role != User.Role.ADMIN:
+            lessons = lessons.filter(teacher__user=request.user)
+        target_lesson = get_object_or_404(lessons, pk=data["lesson_id"])
+    media_upload = None
+    if data.get("media_upload_id") is not None:
+        media_upload = get_object_or_404(
+            MediaUpload, pk=data["media_upload_id"], uploader=request.user
+        )
+        if not media_upload.accepts_new_file():
+            return JsonResponse(
+                {"detail": f"Media upload is {media_upload.status}"}, status=409
+            )
+
+    session = UploadSession(
+        uploader=request.user,
+        lesson=target_lesson,
+        media_upload=media_upload,
+        filename=filename,
+        file_type=file_type,
+        total_size=total_size,
+    )
+    session.storage_key = f"{session.id}/{filename}"
+    get_upload_storage().create(session.storage_key)
+    session.save()
+    return JsonResponse(
+        {**_session_state(session), "max_chunk_size": MAX_CHUNK_BYTES}, status=201
+    )
+
+
+@require_http_methods(["GET", "PUT"])
+@rate_limit("ingest")
+def upload_chunk(request, pk):
+    """
+    GET reports the resume offset; PUT appends one chunk described by a
+    ``Content-Range`` header and verified against ``X-Chunk-SHA256``.
+    """
+    denied = _forbidden(request)
+    if denied:
+        return denied
+    if request.method == "GET":
+        session = get_object_or_404(UploadSession, pk=pk, uploader=request.user)
+        return JsonResponse(_session_state(session))
+    # One PUT per session at a time: a concurrent one at the same offset
+    # waits here, then sees the new offset and gets 409 instead of writing
+    # (or truncating) over this one.
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(), pk=pk, uploader=request.user
+        )
+        return _append_chunk(request, session)
+
+
+def _append_chunk(request, session):
+    if session.status == UploadSession.Status.COMPLETE:
+        return JsonResponse(_session_state(session))
+    match = CONTENT_RANGE.match(request.headers.get("Content-Range", ""))
+    if not match:
+        return JsonResponse({"detail": "Content-Range header required"}, status=400)
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+    if total != session.total_size or end >= total or length <= 0:
+        return JsonResponse({"detail": "Content-Range does not fit upload"}, status=416)
+    if length > MAX_CHUNK_BYTES:
+        return JsonResponse({"detail": "Chunk too large"}, status=413)
+    if start != session.received_bytes:
+        # Out-of-order or duplicate chunk: tell the client where to resume.
+        return JsonResponse(_session_state(session), status=409)
+    if int(request.headers.get("Content-Length") or 0) != length:
+        return JsonResponse({"detail": "Content-Length mismatch"}, status=400)
+    expected = request.headers.get("X-Chunk-SHA256", "").lower()
+    if not expected:
+        return JsonResponse({"detail": "X-Chunk-SHA256 header required"}, status=400)
+
+    storage = get_upload_storage()
+    try:
+        written, checksum = storage.write(
+            session.storage_key, start, read_blocks(request, length)
+        )
+    except (EOFError, OSError):
+        storage.truncate(session.storage_key, start)
+        return JsonResponse(
+            {**_session_state(session), "detail": "Chunk interrupted"}, status=400
+        )
+    if checksum != expected:
+        storage.truncate(session.storage_key, start)
+        return JsonResponse(
+            {**_session_state(session), "detail": "Chunk checksum mismatch"},
+            status=422,
+        )
+
+    session.received_bytes = start + written
+    session.save(update_fields=["received_bytes", "updated_at"])
+    if session.is_complete:
+        _finish(request, session, storage)
+    return JsonResponse(_session_state(session))
+
+
+def _finish(request, session, storage):
+    """
+    Hand the assembled file to the media processing queue. An upload that
+    a worker claimed or finished since the session started is left alone
+    and the file gets a new one.
+    """
+    file_url = request.build_absolute_uri(storage.url(session.storage_key))
+    with transaction.atomic():
+        upload = (
+            MediaUpload.objects.select_for_update()
+            .filter(pk=session.media_upload_id)
+            .first()
+        )
+        if upload is None or not upload.accepts_new_file():
+            upload = MediaUpload(uploader=session.uploader)
+        upload.lesson = session.lesson or upload.lesson
+        upload.file_url = file_url
+        upload.file_type = session.file_type
+        upload.status = MediaUpload.Status.PENDING
+        upload.attempts = 0
+        upload.locked_by = ""
+        upload.lease_expires_at = None
+        upload.available_at = timezone.now()
+        upload.last_error = None
+        upload.save()
+        session.media_upload = upload
+        session.status = UploadSession.Status.COMPLETE
+        session.save(update_fields=["media_upload", "status", "updated_at"])
@@ -0,0 +1,147 @@
+"""
+Raw ASGI WebSocket endpoint for playground activities.
+
+Connect to ``/ws/playground/<lesson_id>/?token=<access token>`` with a
+child's bearer token (browsers cannot set headers on WebSockets). The
+token and lesson are checked once at connect; after that every message
+is answered from in-memory session state. Messages are JSON:
+
+    -> {"type": "drop"}            one more item in the basket
+    -> {"type": "drop", "delta": -1}
+    <- {"type": "count", "count": 3, "target": 5}
+    -> {"type": "submit"}
+    <- {"type": "result", "correct": true, "round": 2, "target": 7}
+    <- {"type": "complete", "correct": 4, "wrong": 1}
+
+The socket closes after the last round, after ``PLAYGROUND_IDLE_TIMEOUT``
+seconds of silence, or when the client leaves.
+"""
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ai.models import MLStudentMap
+from core.cache import model_cache
+from lessons.models import lesson
+from playground.sessions import ROUNDS, registry
+from profiles.models import User
+from profiles.tokens import TokenError, decode
+
+PATH = re.compile(r"^/ws/playground/(?P<lesson_id>\d+)/$")
+IDLE_TIMEOUT = getattr(settings, "PLAYGROUND_IDLE_TIMEOUT", 300)
+MAX_MESSAGE_BYTES = 1024
+
+# Application close codes (4000-4999 are free for applications).
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_IDLE = 4408
+
+
+def _authorize(token, lesson_id):
+    """``(child_id, ml_student_id, student_uuid)`` or a close code."""
+    try:
+        claims = decode(token)
+    except TokenError:
+        return CLOSE_UNAUTHORIZED
+    if claims.get("role") != User.Role.CHILD or not claims.get("pid"):
+        return CLOSE_FORBIDDEN
+    try:
+        found = model_cache.get(lesson, pk=lesson_id)
+    except lesson.DoesNotExist:
+        return CLOSE_NOT_FOUND
+    if not found.is_published:
+        return CLOSE_NOT_FOUND
+    ml_student_id = (
+        MLStudentMap.objects.filter(child_id=claims["pid"])
+        .values_list("ml_student_id", flat=True)
+        .first()
+    )
+    if ml_student_id is None:
+        return CLOSE_FORBIDDEN
+    return claims["pid"], ml_student_id, claims["uuid"]
+
+
+async def _send(send, message):
+    await send({"type": "websocket.send", "text": json.dumps(message)})
+
+
+async def playground_socket(scope, receive, send):
+    match = PATH.match(scope["path"])
+    event = await receive()
+    if event["type"] != "websocket.connect":
+        return
+    if match is None:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = (query.get("token") or [""])[0]
+    identity = await sync_to_async(_authorize)(token, int(match["lesson_id"]))
+    if isinstance(identity, int):
+        await send({"type": "websocket.close", "code": identity})
+        return
+
+    session = registry.open(*identity, int(match["lesson_id"]))
+    await send({"type": "websocket.accept"})
+    await _send(
+        send,
+        {
+            "type": "ready",
+            "session": session.id,
+            "rounds": ROUNDS,
+            "round": session.round,
+            "target": session.target,
+        },
+    )
+    try:
+        while not session.finished:
+            try:
+                event = await asyncio.wait_for(receive(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await send({"type": "websocket.close", "code": CLOSE_IDLE})
+                return
+            if event["type"] == "websocket.disconnect":
+                return
+            reply = _handle(session, event.get("text") or "")
+            if reply:
+                await _send(send, reply)
+        await _send(
+            send,
+            {"type": "complete", "correct": session.correct, "wrong": session.wrong},
+        )
+        await send({"type": "websocket.close", "code": 1000})
+    finally:
+        await registry.close(session)
+
+
+def _handle(session, text):
+    if len(text) > MAX_MESSAGE_BYTES:
+        return {"type": "error", "detail": "Message too large"}
+    try:
+        message = json.loads(text)
+        kind = message["type"]
+    except (ValueError, TypeError, KeyError):
+        return {"type": "error", "detail": "Expected a JSON object with a type"}
+    if kind == "drop":
+        delta = message.get("delta", 1)
+        try:
+            count = session.drop(delta if isinstance(delta, int) else 1)
+        except ValueError as error:
+            return {"type": "error", "detail": str(error)}
+        return {"type": "count", "count": count, "target": session.target}
+    if kind == "submit":
+        correct = session.submit(registry.next_target())
+        if session.finished:
+            return {"type": "result", "correct": correct, "round": None}
+        return {
+            "type": "result",
+            "correct": correct,
+            "round": session.round,
+            "target": session.target,
+        }
+    return {"type": "error", "detail": f"Unknown message type {kind!r}"}
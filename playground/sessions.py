@@ -0,0 +1,164 @@
+"""
+In-memory state for live playground activities.
+
+Each connected child has one ``ActivitySession`` holding only counters
+and the current round, in ``__slots__`` so thousands of sessions cost a
+few hundred bytes each. Nothing touches the database while a session is
+running: feedback is computed from this state alone. When a session ends
+its summary is queued as a ``LessonInteractionsRaw`` row and the queue is
+written with one ``bulk_create`` once it holds ``PLAYGROUND_FLUSH_SIZE``
+rows, every ``PLAYGROUND_FLUSH_INTERVAL`` seconds, and at shutdown.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+from ai import pipeline
+from ai.models import LessonInteractionsRaw
+
+logger = logging.getLogger(__name__)
+
+ROUNDS = getattr(settings, "PLAYGROUND_ROUNDS", 5)
+MAX_TARGET = getattr(settings, "PLAYGROUND_MAX_TARGET", 10)
+FLUSH_SIZE = getattr(settings, "PLAYGROUND_FLUSH_SIZE", 200)
+FLUSH_INTERVAL = getattr(settings, "PLAYGROUND_FLUSH_INTERVAL", 10)
+
+
+class ActivitySession:
+    """One child's counting game: drag items until the count hits the target."""
+
+    __slots__ = (
+        "id",
+        "child_id",
+        "ml_student_id",
+        "student_uuid",
+        "lesson_id",
+        "started",
+        "round",
+        "target",
+        "count",
+        "moves",
+        "correct",
+        "wrong",
+    )
+
+    def __init__(self, id, child_id, ml_student_id, student_uuid, lesson_id, target):
+        self.id = id
+        self.child_id = child_id
+        self.ml_student_id = ml_student_id
+        self.student_uuid = student_uuid
+        self.lesson_id = lesson_id
+        self.started = time.monotonic()
+        self.round = 1
+        self.target = target
+        self.count = 0
+        self.moves = 0
+        self.correct = 0
+        self.wrong = 0
+
+    @property
+    def finished(self):
+        return self.round > ROUNDS
+
+    def drop(self, delta=1):
+        """
+        Add (or with a negative ``delta`` remove) an item; returns the new
+        count. A zero ``delta`` moves nothing and raises ``ValueError``.
+        """
+        if delta == 0:
+            raise ValueError("delta must not be zero")
+        self.moves += 1
+        self.count = max(0, self.count + (1 if delta > 0 else -1))
+        return self.count
+
+    def submit(self, next_target):
+        """Check the current count, then start the next round."""
+        correct = self.count == self.target
+        if correct:
+            self.correct += 1
+        else:
+            self.wrong += 1
+        self.moves += 1
+        self.round += 1
+        self.count = 0
+        self.target = None if self.finished else next_target
+        return correct
+
+    def summary(self):
+        """A ``LessonInteractionsRaw`` row describing the whole session."""
+        answered = self.correct + self.wrong
+        return {
+            "ml_student_id": self.ml_student_id,
+            "student_uuid": self.student_uuid,
+            "child_id": self.child_id,
+            "lesson_id": self.lesson_id,
+            "time_spent": (time.monotonic() - self.started) / 60,
+            # An activity has no video to watch.
+            "video_watch_percentage": 0.0,
+            "activity_completion_percentage": 100.0 * answered / ROUNDS,
+            "number_of_clicks": self.moves,
+            "completion_status": self.finished,
+        }
+
+
+class SessionRegistry:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.sessions = {}
+        self.pending = []
+        self.rng = random.Random()
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def next_target(self):
+        return self.rng.randint(1, MAX_TARGET)
+
+    def open(self, child_id, ml_student_id, student_uuid, lesson_id):
+        session = ActivitySession(
+            next(self._ids),
+            child_id,
+            ml_student_id,
+            student_uuid,
+            lesson_id,
+            self.next_target(),
+        )
+        self.sessions[session.id] = session
+        return session
+
+    async def close(self, session):
+        """Forget ``session`` and queue its summary for writing."""
+        if self.sessions.pop(session.id, None) is None:
+            return
+        self.pending.append(session.summary())
+        if len(self.pending) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        """Write queued summaries; returns how many were written."""
+        rows, self.pending = self.pending, []
+        if not rows:
+            return 0
+        try:
+            return await sync_to_async(pipeline.ingest)(LessonInteractionsRaw, rows)
+        except DatabaseError:
+            logger.exception("Dropped %d playground session summaries", len(rows))
+            return 0
+
+    async def flush_periodically(self):
+        """Run for the life of the process (started by the ASGI lifespan)."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+registry = SessionRegistry()
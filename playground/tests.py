@@ -1,3 +1,120 @@
-# from django.test import TestCase
+import json
 
-# Create your tests here.
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase
+
+from ai.models import LessonInteractionsRaw, MLStudentMap
+from kids_App.asgi import application
+from lessons.models import lesson
+from playground import sessions
+from profiles import tokens
+from profiles.models import ChildProfile, TeacherProfile, User
+
+
+class PlaygroundSocketTests(TestCase):
+    def setUp(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(
+                "t@example.com", "t", "pw", role=User.Role.TEACHER
+            )
+        )
+        self.teacher_token = tokens.issue_pair(teacher.user)[tokens.ACCESS]
+        self.lesson = lesson.objects.create(
+            title="Counting apples",
+            description="",
+            video_url="https://x",
+            teacher=teacher,
+            is_published=True,
+        )
+        self.child = ChildProfile.objects.create(
+            user=User.objects.create_user("c@example.com", "c", "pw"), age=5
+        )
+        MLStudentMap.objects.create(
+            ml_student_id=42, student_uuid=str(self.child.user.uuid), child=self.child
+        )
+        self.token = tokens.issue_pair(self.child.user)[tokens.ACCESS]
+        self.addCleanup(sessions.registry.pending.clear)
+
+    def _connect(self, token=None, lesson_id=None):
+        scope = {
+            "type": "websocket",
+            "path": f"/ws/playground/{lesson_id or self.lesson.pk}/",
+            "query_string": f"token={token or self.token}".encode(),
+        }
+        return ApplicationCommunicator(application, scope)
+
+    async def _receive(self, socket):
+        return json.loads((await socket.receive_output(1))["text"])
+
+    async def test_game_round_trip_is_persisted_on_close(self):
+        socket = self._connect()
+        await socket.send_input({"type": "websocket.connect"})
+        self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+        ready = await self._receive(socket)
+        self.assertEqual(ready["rounds"], sessions.ROUNDS)
+
+        target, correct = ready["target"], 0
+        for round_number in range(sessions.ROUNDS):
+            drops = target if round_number % 2 == 0 else target + 1
+            for _ in range(drops):
+                await socket.send_input(
+                    {"type": "websocket.receive", "text": '{"type": "drop"}'}
+                )
+                count = await self._receive(socket)
+            self.assertEqual(count["count"], drops)
+            await socket.send_input(
+                {"type": "websocket.receive", "text": '{"type": "submit"}'}
+            )
+            result = await self._receive(socket)
+            self.assertEqual(result["correct"], drops == target)
+            correct += result["correct"]
+            target = result.get("target")
+
+        complete = await self._receive(socket)
+        self.assertEqual(
+            complete,
+            {
+                "type": "complete",
+                "correct": correct,
+                "wrong": sessions.ROUNDS - correct,
+            },
+        )
+        self.assertEqual((await socket.receive_output(1))["code"], 1000)
+        await socket.wait(1)
+
+        self.assertEqual(len(sessions.registry), 0)
+        self.assertEqual(await sessions.registry.flush(), 1)
+        row = await LessonInteractionsRaw.objects.aget()
+        self.assertEqual(row.ml_student_id, 42)
+        self.assertEqual(row.lesson_id, self.lesson.pk)
+        self.assertTrue(row.completion_status)
+        self.assertEqual(row.video_watch_percentage, 0.0)
+        self.assertEqual(row.activity_completion_percentage, 100.0)
+
+    async def test_rejects_bad_token_and_non_child(self):
+        for token, code in [("not-a-token", 4401), (self.teacher_token, 4403)]:
+            socket = self._connect(token)
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual(
+                await socket.receive_output(1),
+                {"type": "websocket.close", "code": code},
+            )
+
+    async def test_disconnect_queues_partial_summary(self):
+        socket = self._connect()
+        await socket.send_input({"type": "websocket.connect"})
+        await socket.receive_output(1)
+        await self._receive(socket)
+        await socket.send_input({"type": "websocket.receive", "text": "oops"})
+        self.assertEqual((await self._receive(socket))["type"], "error")
+        await socket.send_input(
+            {"type": "websocket.receive", "text": '{"type": "drop", "delta": 0}'}
+        )
+        self.assertEqual((await self._receive(socket))["type"], "error")
+
+        await socket.send_input({"type": "websocket.disconnect", "code": 1001})
+        await socket.wait(1)
+
+        (summary,) = sessions.registry.pending
+        self.assertFalse(summary["completion_status"])
+        self.assertEqual(summary["number_of_clicks"], 0)
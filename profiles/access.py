@@ -0,0 +1,21 @@
+from django.http import JsonResponse
+
+from core.cache import model_cache
+from profiles.models import ChildProfile, User
+
+
+def child_id(request):
+    """``(child_id, None)`` for a child caller, else ``(None, error response)``."""
+    user = request.user
+    if not user.is_authenticated:
+        return None, JsonResponse({"detail": "Authentication required"}, status=401)
+    if user.role != User.Role.CHILD:
+        return None, JsonResponse({"detail": "Child account required"}, status=403)
+    # Bearer tokens carry the profile id; sessions go through the model cache.
+    profile_id = getattr(user, "profile_id", None)
+    if profile_id is None:
+        try:
+            profile_id = model_cache.get(ChildProfile, user_id=user.pk).pk
+        except ChildProfile.DoesNotExist:
+            return None, JsonResponse({"detail": "No child profile"}, status=403)
+    return profile_id, None
@@ -0,0 +1,54 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.models import ChildProfile, User
+from profiles.privacy import SOURCES, ChildKeys, erase
+
+
+class Command(BaseCommand):
+    help = "Permanently delete children's accounts and every row stored about them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("child_ids", nargs="*", type=int, help="ChildProfile ids")
+        parser.add_argument(
+            "--roster", help="CSV with an email column (e.g. a school's roster)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1_000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count rows without deleting"
+        )
+
+    def handle(self, *args, **options):
+        child_ids = set(options["child_ids"])
+        if options["roster"]:
+            with open(options["roster"], newline="", encoding="utf-8-sig") as fh:
+                reader = csv.DictReader(fh)
+                if "email" not in (reader.fieldnames or ()):
+                    raise CommandError("Roster needs an email column")
+                emails = [
+                    User.objects.normalize_email(row["email"].strip()) for row in reader
+                ]
+            child_ids.update(
+                ChildProfile.objects.filter(user__email__in=emails).values_list(
+                    "pk", flat=True
+                )
+            )
+        if not child_ids:
+            raise CommandError("No children to erase")
+
+        if options["dry_run"]:
+            keys = ChildKeys(sorted(child_ids))
+            for source in SOURCES:
+                count = source.queryset(keys).count()
+                self.stdout.write(f"{source.label}: {count}")
+            self.stdout.write(f"children: {len(keys.accounts)}")
+            return
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} children")
+
+        counts = erase(child_ids, chunk_size=options["chunk_size"], progress=progress)
+        for label, count in counts.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Erased {counts['children']} children"))
@@ -0,0 +1,47 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.routers import primary_only
+from profiles.provisioning import RosterError, parse_roster, provision
+
+
+class Command(BaseCommand):
+    help = "Create child accounts, profiles and ML mappings from a CSV roster"
+
+    def add_arguments(self, parser):
+        parser.add_argument("roster", help="Path to the roster CSV")
+        parser.add_argument("--workers", type=int, help="Password hashing processes")
+        parser.add_argument(
+            "--invites-out",
+            help="Write email, invite uid and token for password-less rows here",
+        )
+
+    def handle(self, *args, **options):
+        # Validation must see accounts created moments ago.
+        with primary_only():
+            with open(options["roster"], newline="", encoding="utf-8-sig") as fh:
+                try:
+                    rows = parse_roster(fh)
+                except RosterError as exc:
+                    for error in exc.errors:
+                        self.stderr.write(
+                            f"line {error['line']}: {error['field'] or '-'}: "
+                            f"{error['message']}"
+                        )
+                    raise CommandError(str(exc)) from None
+            results = provision(rows, workers=options["workers"])
+            invites = [row for row in results if row["invite_token"]]
+            if options["invites_out"] and invites:
+                with open(options["invites_out"], "w", newline="") as fh:
+                    writer = csv.writer(fh)
+                    writer.writerow(["email", "invite_uid", "invite_token"])
+                    for row in invites:
+                        writer.writerow(
+                            [row["email"], row["invite_uid"], row["invite_token"]]
+                        )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Provisioned {len(results)} children ({len(invites)} invites)"
+                )
+            )
@@ -0,0 +1,29 @@
+from django.http import JsonResponse
+
+from profiles.tokens import TokenError, decode, user_from_claims
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Authenticates ``Authorization: Bearer <access token>`` requests from
+    the token claims alone, with no database query. Install it after
+    ``AuthenticationMiddleware``; requests without a bearer token keep
+    their session user. Bearer tokens are never sent implicitly by
+    browsers, so these requests skip the CSRF check.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                claims = decode(token.strip())
+            except TokenError as exc:
+                response = JsonResponse({"detail": str(exc)}, status=401)
+                response["WWW-Authenticate"] = 'Bearer error="invalid_token"'
+                return response
+            request.user = user_from_claims(claims)
+            request._dont_enforce_csrf_checks = True
+        return self.get_response(request)
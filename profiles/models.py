@@ -139,3 +139,20 @@ class TeacherProfile(models.Model):
 
     def __str__(self):
         return f"Teacher: {self.user.username}"
+
+
+class RevokedToken(models.Model):
+    """Revoked auth token ids, kept until the token would have expired"""
+
+    jti = models.CharField(max_length=64, unique=True, help_text="Token ID claim")
+    expires_at = models.DateTimeField(help_text="When the token expires anyway")
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "accounts_revokedtoken"
+        indexes = [
+            models.Index(fields=["expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"Revoked {self.jti}"
@@ -0,0 +1,244 @@
+"""
+Export and erasure of everything stored about a child.
+
+A child's rows are found through indexed keys only: ``child_id`` foreign
+keys, plus the ML ids from ``MLStudentMap`` for ML tables whose rows may
+carry only ``ml_student_id``/``student_id``. Outbox events are the one
+exception: they are matched on their payload's ``child_id``, which is not
+indexed, but that table only holds events until ``core.outbox.purge``.
+``SOURCES`` lists every table in erasure order, dependents before the rows
+they ``PROTECT``.
+
+``export_archive`` yields a zip archive (one JSON-lines file per table)
+chunk by chunk, so a response can stream it without holding it in memory.
+
+``erase`` deletes in primary-key chunks of ``PRIVACY_ERASURE_CHUNK`` rows,
+each in its own short transaction, so only the rows being deleted are
+locked and a large request (a whole school) never blocks a table. It is
+safe to rerun after an interruption. Audit log entries are kept for
+their security value but detached from the user and stripped of metadata.
+Report export files (``progress.reports``) mix many children and are not
+edited; they disappear with their job after ``REPORT_EXPORT_KEEP_DAYS``.
+"""
+
+import json
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ai.models import (
+    LessonFeatures,
+    LessonInteractionsClean,
+    LessonInteractionsRaw,
+    MLStudentMap,
+    ProgressClean,
+    ProgressLabeled,
+    ProgressRaw,
+    QuizAttemptsClean,
+    QuizAttemptsRaw,
+    QuizFeatures,
+    Recommendation,
+    RecommendationEvent,
+    StudentMLDataset,
+)
+from core.models import AuditLog, OutboxEvent
+from core.routers import primary_only
+from profiles.models import ChildProfile, User
+from progress.models import AttentionScore, ChildBadge, Progress
+from quizzes.models import QuizAttempt
+
+CHUNK_SIZE = getattr(settings, "PRIVACY_ERASURE_CHUNK", 1_000)
+# Children handled per pass, which bounds the size of ``IN (...)`` lists.
+CHILD_BATCH = 200
+EXPORT_CHUNK = 2_000
+USER_FIELDS = (
+    "id",
+    "uuid",
+    "username",
+    "email",
+    "role",
+    "profile_picture_url",
+    "date_joined",
+    "last_login",
+)
+
+
+class Source:
+    """One table holding child data and the indexed columns that find it."""
+
+    def __init__(self, label, model, child_field="child_id", ml_field=None):
+        self.label = label
+        self.model = model
+        self.child_field = child_field
+        self.ml_field = ml_field
+
+    def queryset(self, keys):
+        condition = Q(**{f"{self.child_field}__in": keys.child_ids})
+        if self.ml_field and keys.ml_ids:
+            condition |= Q(**{f"{self.ml_field}__in": keys.ml_ids})
+        return self.model.objects.filter(condition)
+
+
+SOURCES = [
+    Source("outbox_events", OutboxEvent, child_field="payload__child_id"),
+    Source("recommendation_events", RecommendationEvent),
+    Source("recommendations", Recommendation),
+    Source("quiz_attempts", QuizAttempt),
+    Source("badges", ChildBadge),
+    Source("progress", Progress),
+    Source("attention_scores", AttentionScore),
+    Source("lesson_interactions_raw", LessonInteractionsRaw, ml_field="ml_student_id"),
+    Source("quiz_attempts_raw", QuizAttemptsRaw, ml_field="ml_student_id"),
+    Source("progress_raw", ProgressRaw, ml_field="ml_student_id"),
+    Source(
+        "lesson_interactions_clean", LessonInteractionsClean, ml_field="ml_student_id"
+    ),
+    Source("quiz_attempts_clean", QuizAttemptsClean, ml_field="ml_student_id"),
+    Source("progress_clean", ProgressClean, ml_field="ml_student_id"),
+    Source("lesson_features", LessonFeatures, ml_field="student_id"),
+    Source("quiz_features", QuizFeatures, ml_field="student_id"),
+    Source("progress_labeled", ProgressLabeled, ml_field="student_id"),
+    Source("ml_dataset", StudentMLDataset, ml_field="student_id"),
+    Source("ml_student_map", MLStudentMap, ml_field="ml_student_id"),
+]
+
+
+class ChildKeys:
+    """Every key a batch of children's rows can be found by."""
+
+    def __init__(self, child_ids):
+        self.child_ids = list(child_ids)
+        self.accounts = list(
+            ChildProfile.objects.filter(pk__in=self.child_ids).values_list(
+                "pk", "user_id", "user__uuid"
+            )
+        )
+        self.user_ids = [user_id for _, user_id, _ in self.accounts]
+        uuids = [str(uuid) for _, _, uuid in self.accounts]
+        self.ml_ids = list(
+            MLStudentMap.objects.filter(
+                Q(child_id__in=self.child_ids) | Q(student_uuid__in=uuids)
+            ).values_list("ml_student_id", flat=True)
+        )
+
+
+class _Sink:
+    """Write-only file object whose contents are drained after each write."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _lines(queryset, fields=()):
+    for row in queryset.values(*fields).iterator(chunk_size=EXPORT_CHUNK):
+        yield (json.dumps(row, cls=DjangoJSONEncoder) + "\n").encode()
+
+
+def export_archive(child_id):
+    """Yield a zip archive of one child's data as byte chunks."""
+    keys = ChildKeys([child_id])
+    files = [
+        ("user", User.objects.filter(pk__in=keys.user_ids), USER_FIELDS),
+        ("child_profile", ChildProfile.objects.filter(pk=child_id), ()),
+        ("audit_log", AuditLog.objects.filter(user_id__in=keys.user_ids), ()),
+        *((source.label, source.queryset(keys), ()) for source in SOURCES),
+    ]
+    counts = {}
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for label, queryset, fields in files:
+            counts[label] = 0
+            with archive.open(f"{label}.jsonl", "w") as member:
+                for line in _lines(queryset, fields):
+                    member.write(line)
+                    counts[label] += 1
+                    if len(sink.parts) > 64:
+                        yield sink.drain()
+            if sink.parts:
+                yield sink.drain()
+        manifest = {
+            "child_id": child_id,
+            "exported_at": timezone.now(),
+            "rows": counts,
+        }
+        archive.writestr(
+            "manifest.json", json.dumps(manifest, cls=DjangoJSONEncoder, indent=2)
+        )
+    yield sink.drain()
+
+
+def _delete_in_chunks(queryset, chunk_size):
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+def _anonymize_audit_log(user_ids, chunk_size):
+    entries = AuditLog.objects.filter(user_id__in=user_ids)
+    updated = 0
+    while True:
+        pks = list(entries.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return updated
+        updated += AuditLog.objects.filter(pk__in=pks).update(user=None, meta=None)
+
+
+def _delete_accounts(accounts, chunk_size):
+    # Profile and user go together, so a rerun can still find every user.
+    for start in range(0, len(accounts), chunk_size):
+        chunk = accounts[start : start + chunk_size]
+        with transaction.atomic():
+            ChildProfile.objects.filter(pk__in=[pk for pk, _, _ in chunk]).delete()
+            User.objects.filter(pk__in=[user_id for _, user_id, _ in chunk]).delete()
+    return len(accounts)
+
+
+def erase(child_ids, actor=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Delete the children, their accounts and all their rows; returns rows
+    removed per table. ``progress(done, total)`` is called per batch.
+    """
+    child_ids = sorted(set(child_ids))
+    counts = Counter()
+    # Reads must see this run's own deletes, so never use a replica.
+    with primary_only():
+        for start in range(0, len(child_ids), CHILD_BATCH):
+            keys = ChildKeys(child_ids[start : start + CHILD_BATCH])
+            for source in SOURCES:
+                counts[source.label] += _delete_in_chunks(
+                    source.queryset(keys), chunk_size
+                )
+            counts["audit_log_anonymized"] += _anonymize_audit_log(
+                keys.user_ids, chunk_size
+            )
+            counts["children"] += _delete_accounts(keys.accounts, chunk_size)
+            if progress:
+                progress(min(start + CHILD_BATCH, len(child_ids)), len(child_ids))
+        AuditLog.objects.create(
+            user=actor,
+            action="children_erased",
+            meta={"children": counts["children"], "rows": dict(counts)},
+        )
+    return dict(counts)
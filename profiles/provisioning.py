@@ -0,0 +1,344 @@
+"""
+Bulk onboarding of a school's children from a CSV roster.
+
+The roster is validated in one pass, with one query per uniqueness check
+rather than one per row, and every problem is reported together.
+Passwords are hashed in a process pool, since the hasher is deliberately
+slow. Rows without a password get an unusable one plus an invite token
+(Django's password-reset token, so it stops working once a password is
+set). Users, child profiles and ``MLStudentMap`` rows are then inserted
+with ``bulk_create`` in a single transaction. New ML ids are allocated
+after the highest one under a transaction-scoped lock. If a concurrent
+sign-up or roster still takes an email, username or id first, ``provision``
+raises ``RosterError`` naming the conflicting rows.
+
+Roster columns: ``email`` and ``age`` are required; ``username``,
+``password``, ``learning_level``, ``parent_phone_no`` and
+``ml_student_id`` are optional.
+"""
+
+import csv
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from ai.models import MLStudentMap
+from core.models import AuditLog
+from profiles.models import ChildProfile, User
+
+REQUIRED_COLUMNS = {"email", "age"}
+MAX_ROWS = getattr(settings, "ROSTER_MAX_ROWS", 5_000)
+# Below this many passwords a pool costs more than it saves.
+POOL_THRESHOLD = 32
+LOOKUP_CHUNK = 500
+LEVELS = {value.lower(): value for value in ChildProfile.LearningLevel.values}
+# Application-wide pg_advisory_xact_lock key serializing ML id allocation.
+ML_ID_LOCK = 0x4D4C4944
+
+
+class RosterError(Exception):
+    """Raised with every problem found in a roster."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} roster error(s)")
+        self.errors = errors
+
+
+def _existing(field, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        found.update(
+            User.objects.filter(
+                **{f"{field}__in": values[start : start + LOOKUP_CHUNK]}
+            ).values_list(field, flat=True)
+        )
+    return found
+
+
+def parse_roster(lines):
+    """Validate CSV text lines; return clean row dicts or raise ``RosterError``."""
+    reader = csv.DictReader(lines)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or ())
+    if missing:
+        raise RosterError(
+            [
+                {
+                    "line": 1,
+                    "field": None,
+                    "message": f"Missing columns: {sorted(missing)}",
+                }
+            ]
+        )
+
+    rows, errors = [], []
+    seen = {"email": {}, "username": {}, "ml_student_id": {}}
+
+    def error(line, field, message):
+        errors.append({"line": line, "field": field, "message": message})
+
+    for line, raw in enumerate(reader, start=2):
+        if len(rows) + len(errors) >= MAX_ROWS:
+            error(line, None, f"Roster is limited to {MAX_ROWS} rows")
+            break
+        raw = {key: (value or "").strip() for key, value in raw.items() if key}
+        email = User.objects.normalize_email(raw["email"])
+        try:
+            validate_email(email)
+        except ValidationError:
+            error(line, "email", f"Invalid email {raw['email']!r}")
+            continue
+        username = raw.get("username") or email.split("@")[0]
+        try:
+            age = int(raw["age"])
+        except ValueError:
+            age = None
+        if age is None or not 4 <= age <= 6:
+            error(line, "age", "Age must be a whole number from 4 to 6")
+            continue
+        level = raw.get("learning_level") or ChildProfile.LearningLevel.BEGINNER
+        if level.lower() not in LEVELS:
+            error(line, "learning_level", f"Unknown learning level {level!r}")
+            continue
+        phone = raw.get("parent_phone_no", "")
+        if phone:
+            try:
+                ChildProfile.phone_regex(phone)
+            except ValidationError as exc:
+                error(line, "parent_phone_no", exc.messages[0])
+                continue
+        ml_student_id = raw.get("ml_student_id") or None
+        if ml_student_id is not None:
+            if not ml_student_id.isdigit():
+                error(line, "ml_student_id", "ml_student_id must be a number")
+                continue
+            ml_student_id = int(ml_student_id)
+
+        row = {
+            "line": line,
+            "email": email,
+            "username": username,
+            "password": raw.get("password") or None,
+            "age": age,
+            "learning_level": LEVELS[level.lower()],
+            "parent_phone_no": phone,
+            "ml_student_id": ml_student_id,
+        }
+        duplicate = False
+        for field, values in seen.items():
+            value = row[field]
+            if value is None:
+                continue
+            if value in values:
+                error(line, field, f"Duplicate of line {values[value]}")
+                duplicate = True
+            else:
+                values[value] = line
+        if not duplicate:
+            rows.append(row)
+
+    errors.extend(_taken(rows))
+    if errors:
+        raise RosterError(sorted(errors, key=lambda e: e["line"]))
+    return rows
+
+
+def _taken(rows):
+    """Errors for rows whose email, username or ML id is already stored."""
+    errors = []
+    # One pass over the database per unique column, not one query per row.
+    for field in ("email", "username"):
+        taken = _existing(field, {row[field] for row in rows})
+        errors.extend(
+            {
+                "line": row["line"],
+                "field": field,
+                "message": f"{row[field]} is already registered",
+            }
+            for row in rows
+            if row[field] in taken
+        )
+    taken_ml = set(
+        MLStudentMap.objects.filter(
+            ml_student_id__in=[row["ml_student_id"] for row in rows]
+        ).values_list("ml_student_id", flat=True)
+    )
+    errors.extend(
+        {
+            "line": row["line"],
+            "field": "ml_student_id",
+            "message": "ml_student_id is already mapped",
+        }
+        for row in rows
+        if row["ml_student_id"] in taken_ml
+    )
+    return errors
+
+
+def _lock_ml_ids():
+    """
+    Hold the ML id allocation lock until the transaction ends. Other
+    backends serialize writers already, and the caller has written by now.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ML_ID_LOCK])
+
+
+def _init_worker():
+    # Spawned (not forked) workers start without Django configured.
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "kids_App.settings")
+    django.setup()
+
+
+def _hash(item):
+    password, algorithm = item
+    return make_password(password, hasher=algorithm)
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash with the default hasher, in parallel processes for large batches."""
+    algorithm = get_hasher("default").algorithm
+    items = [(password, algorithm) for password in passwords]
+    if len(items) < POOL_THRESHOLD or workers == 1:
+        return [_hash(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(_hash, items, chunksize=16))
+
+
+def invite_token(user):
+    """``(uid, token)`` pair for setting the first password."""
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    return uid, default_token_generator.make_token(user)
+
+
+def _insert(rows, actor, workers):
+    with_password = [row for row in rows if row["password"]]
+    hashed = dict(
+        zip(
+            (row["line"] for row in with_password),
+            hash_passwords([row["password"] for row in with_password], workers),
+        )
+    )
+    unusable = make_password(None)
+    users = [
+        User(
+            uuid=uuid.uuid4(),
+            email=row["email"],
+            username=row["username"],
+            password=hashed.get(row["line"], unusable),
+            role=User.Role.CHILD,
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from a bulk insert.
+            ids = {}
+            emails = [user.email for user in users]
+            for start in range(0, len(emails), LOOKUP_CHUNK):
+                ids.update(
+                    User.objects.filter(
+                        email__in=emails[start : start + LOOKUP_CHUNK]
+                    ).values_list("email", "pk")
+                )
+            for user in users:
+                user.pk = ids[user.email]
+        children = ChildProfile.objects.bulk_create(
+            [
+                ChildProfile(
+                    user_id=user.pk,
+                    age=row["age"],
+                    learning_level=row["learning_level"],
+                    parent_phone_no=row["parent_phone_no"],
+                )
+                for user, row in zip(users, rows)
+            ]
+        )
+        if any(child.pk is None for child in children):
+            ids = dict(
+                ChildProfile.objects.filter(
+                    user_id__in=[user.pk for user in users]
+                ).values_list("user_id", "pk")
+            )
+            for child in children:
+                child.pk = ids[child.user_id]
+
+        _lock_ml_ids()
+        next_ml_id = (MLStudentMap.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+        reserved = {row["ml_student_id"] for row in rows if row["ml_student_id"]}
+        maps = []
+        for user, child, row in zip(users, children, rows):
+            ml_student_id = row["ml_student_id"]
+            if ml_student_id is None:
+                while next_ml_id in reserved:
+                    next_ml_id += 1
+                ml_student_id = next_ml_id
+                next_ml_id += 1
+            maps.append(
+                MLStudentMap(
+                    ml_student_id=ml_student_id,
+                    student_uuid=str(user.uuid),
+                    child_id=child.pk,
+                )
+            )
+        MLStudentMap.objects.bulk_create(maps)
+
+        results = []
+        for user, child, mapping, row in zip(users, children, maps, rows):
+            invite = None if row["password"] else invite_token(user)
+            results.append(
+                {
+                    "email": user.email,
+                    "username": user.username,
+                    "uuid": str(user.uuid),
+                    "child_id": child.pk,
+                    "ml_student_id": mapping.ml_student_id,
+                    "invite_uid": invite[0] if invite else None,
+                    "invite_token": invite[1] if invite else None,
+                }
+            )
+        AuditLog.objects.create(
+            user=actor,
+            action="roster_provisioned",
+            meta={
+                "children": len(results),
+                "invites": sum(1 for r in results if r["invite_token"]),
+            },
+        )
+    return results
+
+
+def provision(rows, actor=None, workers=None):
+    """
+    Create users, child profiles and ML mappings for validated rows; raises
+    ``RosterError`` if a row conflicts with data written since validation.
+    """
+    try:
+        return _insert(rows, actor, workers)
+    except IntegrityError:
+        # A concurrent sign-up or roster took a value after validation.
+        raise RosterError(
+            sorted(_taken(rows), key=lambda e: e["line"])
+            or [
+                {
+                    "line": None,
+                    "field": None,
+                    "message": "Roster conflicts with a concurrent change",
+                }
+            ]
+        )
@@ -1,3 +1,301 @@
-# from django.test import TestCase
+import io
+import json
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.tokens import default_token_generator
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ai.models import LessonInteractionsRaw, MLStudentMap, ProgressClean, Recommendation
+from core import outbox
+from core.models import AuditLog, OutboxEvent
+from lessons.models import lesson
+from profiles import privacy, tokens
+from profiles.middleware import TokenAuthenticationMiddleware
+from profiles.models import ChildProfile, TeacherProfile, User
+from profiles.provisioning import RosterError, hash_passwords, parse_roster
+from progress.models import Badge, ChildBadge, Progress
+from quizzes import submission
+from quizzes.models import Quiz, QuizAttempt
+
+ROSTER = """email,username,password,age,learning_level,ml_student_id
+Ana@School.test,ana,s3cret-pass,5,intermidate,
+ben@school.test,,,4,,700
+"""
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RosterProvisioningTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            "office@school.test", "office", "pw", is_staff=True
+        )
+        self.client.force_login(self.staff)
+
+    def _post(self, body):
+        return self.client.post(
+            reverse("profiles:provision-roster"), body, content_type="text/csv"
+        )
+
+    def test_creates_users_profiles_and_mappings(self):
+        response = self._post(ROSTER)
+
+        self.assertEqual(response.status_code, 201)
+        ana = User.objects.get(username="ana")
+        self.assertEqual(ana.email, "Ana@school.test")
+        self.assertTrue(ana.check_password("s3cret-pass"))
+        self.assertEqual(ana.child_profile.learning_level, "INTERMIDATE")
+        ben = User.objects.get(email="ben@school.test")
+        self.assertFalse(ben.has_usable_password())
+        invite = response.json()["children"][1]
+        self.assertTrue(
+            default_token_generator.check_token(ben, invite["invite_token"])
+        )
+        self.assertEqual(
+            MLStudentMap.objects.get(ml_student_id=700).child, ben.child_profile
+        )
+        self.assertEqual(MLStudentMap.objects.count(), 2)
+        self.assertEqual(
+            AuditLog.objects.get(action="roster_provisioned").meta["invites"], 1
+        )
+
+    def test_conflict_after_validation_answers_409_with_the_rows(self):
+        def parse_then_race(lines):
+            rows = parse_roster(lines)
+            # Another request registers ben between validation and insert.
+            User.objects.create_user("ben@school.test", "ben-elsewhere", "pw")
+            return rows
+
+        with mock.patch("profiles.views.parse_roster", side_effect=parse_then_race):
+            response = self._post(ROSTER)
+
+        self.assertEqual(response.status_code, 409)
+        [error] = response.json()["errors"]
+        self.assertEqual((error["line"], error["field"]), (3, "email"))
+        self.assertFalse(User.objects.filter(username="ana").exists())
+
+    def test_reports_every_error_and_writes_nothing(self):
+        roster = (
+            "email,age\n"
+            "office@school.test,5\n"
+            "not-an-email,5\n"
+            "kid@school.test,9\n"
+            "kid2@school.test,4\n"
+            "kid2@school.test,4\n"
+        )
+        with self.assertRaises(RosterError) as caught:
+            parse_roster(io.StringIO(roster))
+
+        self.assertEqual(
+            [(e["line"], e["field"]) for e in caught.exception.errors],
+            [
+                (2, "email"),
+                (2, "username"),
+                (3, "email"),
+                (4, "age"),
+                (6, "email"),
+                (6, "username"),
+            ],
+        )
+        self.assertEqual(self._post(roster).status_code, 400)
+        self.assertEqual(ChildProfile.objects.count(), 0)
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user("p@x.test", "p", "pw"))
+
+        self.assertEqual(self._post(ROSTER).status_code, 403)
+
+    def test_pool_hashes_match_inline_hashes(self):
+        passwords = [f"pw-{n}" for n in range(40)]
+
+        hashed = hash_passwords(passwords, workers=2)
+
+        user = User(email="x@x.test", username="x")
+        user.password = hashed[7]
+        self.assertTrue(user.check_password("pw-7"))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        tokens.revocations.clear()
+        self.teacher = User.objects.create_user(
+            "t@school.test", "t", "pw", role=User.Role.TEACHER
+        )
+        self.pair = self.client.post(
+            reverse("profiles:token-obtain"),
+            {"email": "t@school.test", "password": "pw"},
+            content_type="application/json",
+        ).json()
+
+    def _bearer(self, token):
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_authenticates_from_claims_without_queries(self):
+        request = RequestFactory().get("/", **self._bearer(self.pair["access"]))
+        middleware = TokenAuthenticationMiddleware(lambda request: None)
+
+        tokens.revocations.refresh()
+        with self.assertNumQueries(0):
+            middleware(request)
+
+        self.assertEqual(request.user.pk, self.teacher.pk)
+        self.assertEqual(request.user.role, User.Role.TEACHER)
+        self.assertEqual(request.user.username, "t")  # deferred, loads lazily
+
+    def test_bearer_requests_can_write_without_csrf(self):
+        staff = User.objects.create_user("s@school.test", "s", "pw", is_staff=True)
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.post(
+            reverse("profiles:provision-roster"),
+            ROSTER,
+            content_type="text/csv",
+            **self._bearer(tokens.issue_pair(staff)["access"]),
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(AuditLog.objects.get().user, staff)
+
+    def test_rejects_tampered_and_refresh_tokens(self):
+        header, claims, signature = self.pair["access"].split(".")
+        for token in (f"{header}.{claims}.{signature[::-1]}", self.pair["refresh"]):
+            response = self.client.get(
+                reverse("progress:teacher-dashboard"), **self._bearer(token)
+            )
+            self.assertEqual(response.status_code, 401)
+
+    def test_refresh_token_cannot_be_replayed_on_another_worker(self):
+        body = {"refresh": self.pair["refresh"]}
+        url = reverse("profiles:token-refresh")
+        first = self.client.post(url, body, content_type="application/json")
+        # A worker whose revocation snapshot predates the first refresh.
+        with mock.patch.object(
+            tokens.revocations, "_jtis", frozenset()
+        ), mock.patch.object(tokens.revocations, "_next_refresh", float("inf")):
+            replay = self.client.post(url, body, content_type="application/json")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(replay.status_code, 401)
+
+    def test_refresh_rotates_and_revoke_logs_out(self):
+        refreshed = self.client.post(
+            reverse("profiles:token-refresh"),
+            {"refresh": self.pair["refresh"]},
+            content_type="application/json",
+        )
+        self.assertEqual(refreshed.status_code, 200)
+        reused = self.client.post(
+            reverse("profiles:token-refresh"),
+            {"refresh": self.pair["refresh"]},
+            content_type="application/json",
+        )
+        self.assertEqual(reused.status_code, 401)
+
+        access = refreshed.json()["access"]
+        response = self.client.post(
+            reverse("profiles:token-revoke"), **self._bearer(access)
+        )
+        self.assertEqual(response.status_code, 204)
+        tokens.revocations.clear()  # another process reloading the list
+        response = self.client.get(
+            reverse("progress:teacher-dashboard"), **self._bearer(access)
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class PrivacyTests(TestCase):
+    def setUp(self):
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.lesson = lesson.objects.create(
+            title="Birds", description="", video_url="https://x", teacher=teacher
+        )
+        quiz = Quiz.objects.create(lesson=self.lesson, title="Birds quiz")
+        badge = Badge.objects.create(name="Explorer")
+        self.child, self.other = [
+            self._child(n, quiz, badge, ml_student_id=900 + n) for n in range(2)
+        ]
+
+    def _child(self, n, quiz, badge, ml_student_id):
+        user = User.objects.create_user(f"c{n}@example.com", f"c{n}", "pw")
+        child = ChildProfile.objects.create(user=user, age=5)
+        Progress.objects.create(child=child, lesson=self.lesson)
+        ChildBadge.objects.create(child=child, badge=badge)
+        attempt = QuizAttempt.objects.create(child=child, quiz=quiz, score=80)
+        outbox.publish(
+            submission.TOPIC, {"attempt_id": attempt.pk, "child_id": child.pk}
+        )
+        Recommendation.objects.create(
+            child=child, lesson=self.lesson, confidence_score=0.5
+        )
+        MLStudentMap.objects.create(
+            ml_student_id=ml_student_id, student_uuid=str(user.uuid), child=child
+        )
+        # ML rows that only carry the ML id.
+        for _ in range(3):
+            LessonInteractionsRaw.objects.create(
+                ml_student_id=ml_student_id,
+                lesson_id=self.lesson.pk,
+                time_spent=3.0,
+                video_watch_percentage=80.0,
+                number_of_clicks=2,
+                completion_status=False,
+            )
+        ProgressClean.objects.create(
+            ml_student_id=ml_student_id,
+            lessons_completed=1,
+            badges_earned=1,
+            streak_days=1,
+            topic_mastery=10.0,
+        )
+        AuditLog.objects.create(user=user, action="login", meta={"ip": "10.0.0.1"})
+        return child
+
+    def test_export_streams_every_table_without_password(self):
+        staff = User.objects.create_user("s@example.com", "s", "pw", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(
+            reverse("profiles:export-child-data", args=[self.child.pk])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual(manifest["rows"]["lesson_interactions_raw"], 3)
+        self.assertEqual(manifest["rows"]["badges"], 1)
+        self.assertEqual(manifest["rows"]["outbox_events"], 1)
+        user = json.loads(archive.read("user.jsonl"))
+        self.assertEqual(user["email"], "c0@example.com")
+        self.assertNotIn("password", user)
+        self.assertTrue(
+            AuditLog.objects.filter(action="child_data_exported", user=staff).exists()
+        )
+
+    def test_erase_removes_rows_in_chunks_and_keeps_other_children(self):
+        user_id = self.child.user_id
+        ml_ids = privacy.ChildKeys([self.child.pk]).ml_ids
+        other = privacy.ChildKeys([self.other.pk])
+        before = {s.label: s.queryset(other).count() for s in privacy.SOURCES}
+
+        counts = privacy.erase([self.child.pk], chunk_size=2)
+
+        self.assertEqual(counts["children"], 1)
+        self.assertEqual(counts["lesson_interactions_raw"], 3)
+        self.assertEqual(counts["outbox_events"], 1)
+        # Events that name no child (lesson counters) are left alone.
+        self.assertTrue(OutboxEvent.objects.exclude(topic=submission.TOPIC))
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+        self.assertFalse(LessonInteractionsRaw.objects.filter(ml_student_id__in=ml_ids))
+        self.assertEqual(
+            {s.label: s.queryset(other).count() for s in privacy.SOURCES}, before
+        )
+        login = AuditLog.objects.get(action="login", user=None)
+        self.assertIsNone(login.meta)
+        self.assertEqual(AuditLog.objects.filter(action="login").count(), 2)
+        self.assertTrue(AuditLog.objects.filter(action="children_erased").exists())
+
+        # Rerunning finds nothing left to delete.
+        self.assertEqual(privacy.erase([self.child.pk])["children"], 0)
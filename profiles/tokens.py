@@ -0,0 +1,201 @@
+"""
+Stateless HS256 access/refresh tokens (JWT compact format).
+
+Claims carry everything most API requests need to know about the caller
+(``sub`` user id, ``uuid``, ``role``, ``pid`` profile id, ``staff``), so
+authenticating a request costs no database query. Signing keys come from
+``AUTH_TOKEN_KEYS`` (``{"kid": "secret"}``, first entry signs, all verify,
+which allows rotation) and are derived once per process. Revocation is a
+compact in-memory set of token ids, refreshed from ``RevokedToken`` every
+``AUTH_TOKEN_REVOCATION_REFRESH`` seconds.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+from profiles.models import ChildProfile, RevokedToken, TeacherProfile, User
+
+ACCESS_TTL = getattr(settings, "AUTH_TOKEN_ACCESS_TTL", 15 * 60)
+REFRESH_TTL = getattr(settings, "AUTH_TOKEN_REFRESH_TTL", 14 * 24 * 3600)
+REVOCATION_REFRESH = getattr(settings, "AUTH_TOKEN_REVOCATION_REFRESH", 30)
+LEEWAY = 30
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class TokenError(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+@lru_cache(maxsize=None)
+def signing_keys():
+    """``{kid: key}`` with the signing key first; derived once per process."""
+    configured = getattr(settings, "AUTH_TOKEN_KEYS", None) or {
+        "default": settings.SECRET_KEY
+    }
+    return {
+        kid: hmac.new(secret.encode(), b"learnify-auth-token", hashlib.sha256).digest()
+        for kid, secret in configured.items()
+    }
+
+
+def _sign(signing_input, key):
+    return _b64encode(hmac.new(key, signing_input, hashlib.sha256).digest())
+
+
+def encode(claims):
+    kid, key = next(iter(signing_keys().items()))
+    header = {"alg": "HS256", "typ": "JWT", "kid": kid}
+    signing_input = b".".join(
+        _b64encode(json.dumps(part, separators=(",", ":")).encode())
+        for part in (header, claims)
+    )
+    return (signing_input + b"." + _sign(signing_input, key)).decode()
+
+
+def decode(token, kind=ACCESS):
+    """Verify signature, expiry, type and revocation; return the claims."""
+    try:
+        header_b64, claims_b64, signature = token.encode().split(b".")
+        header = json.loads(_b64decode(header_b64))
+        claims = json.loads(_b64decode(claims_b64))
+    except (ValueError, UnicodeError):
+        raise TokenError("Malformed token") from None
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise TokenError("Malformed token")
+    key = signing_keys().get(header.get("kid"))
+    if header.get("alg") != "HS256" or key is None:
+        raise TokenError("Unknown signing key")
+    if not hmac.compare_digest(_sign(header_b64 + b"." + claims_b64, key), signature):
+        raise TokenError("Bad signature")
+    if claims.get("typ") != kind:
+        raise TokenError(f"Expected a {kind} token")
+    if claims.get("exp", 0) + LEEWAY < time.time():
+        raise TokenError("Token expired")
+    if claims.get("jti") in revocations:
+        raise TokenError("Token revoked")
+    return claims
+
+
+def profile_id(user):
+    if user.role == User.Role.CHILD:
+        return (
+            ChildProfile.objects.filter(user_id=user.pk)
+            .values_list("pk", flat=True)
+            .first()
+        )
+    if user.role == User.Role.TEACHER:
+        return (
+            TeacherProfile.objects.filter(user_id=user.pk)
+            .values_list("pk", flat=True)
+            .first()
+        )
+    return None
+
+
+def issue_pair(user):
+    """Fresh access and refresh tokens for ``user``."""
+    now = int(time.time())
+    base = {
+        "sub": str(user.pk),
+        "uuid": str(user.uuid),
+        "role": user.role,
+        "pid": profile_id(user),
+        "staff": user.is_staff,
+        "iat": now,
+    }
+    return {
+        ACCESS: encode({**base, "typ": ACCESS, "exp": now + ACCESS_TTL, "jti": _jti()}),
+        REFRESH: encode(
+            {**base, "typ": REFRESH, "exp": now + REFRESH_TTL, "jti": _jti()}
+        ),
+        "expires_in": ACCESS_TTL,
+    }
+
+
+def _jti():
+    return secrets.token_urlsafe(12)
+
+
+def user_from_claims(claims):
+    """
+    A ``User`` built from claims without a query. Fields the claims do not
+    carry are deferred and load on first access, like ``.only()``.
+    """
+    user = User.from_db(
+        "default",
+        ["id", "uuid", "role", "is_staff", "is_active"],
+        [
+            int(claims["sub"]),
+            uuid.UUID(claims["uuid"]),
+            claims["role"],
+            claims["staff"],
+            True,
+        ],
+    )
+    user.profile_id = claims.get("pid")
+    user.token_claims = claims
+    return user
+
+
+class RevocationList:
+    """Revoked, not yet expired token ids, reloaded every ``interval`` s."""
+
+    def __init__(self, interval=REVOCATION_REFRESH):
+        self.interval = interval
+        self._jtis = frozenset()
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        return jti in self._jtis
+
+    def refresh(self):
+        with self._lock:
+            self._next_refresh = time.monotonic() + self.interval
+            self._jtis = frozenset(
+                RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list(
+                    "jti", flat=True
+                )
+            )
+
+    def revoke(self, claims):
+        """Record ``claims["jti"]``; ``False`` if it was already revoked."""
+        expires_at = datetime.fromtimestamp(claims["exp"] + LEEWAY, dt_timezone.utc)
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        _, created = RevokedToken.objects.get_or_create(
+            jti=claims["jti"], defaults={"expires_at": expires_at}
+        )
+        with self._lock:
+            self._jtis = self._jtis | {claims["jti"]}
+        return created
+
+    def clear(self):
+        with self._lock:
+            self._jtis = frozenset()
+            self._next_refresh = 0.0
+
+
+revocations = RevocationList()
@@ -0,0 +1,17 @@
+from django.urls import path
+
+from profiles import views
+
+app_name = "profiles"
+
+urlpatterns = [
+    path("auth/token/", views.obtain_token, name="token-obtain"),
+    path("auth/token/refresh/", views.refresh_token, name="token-refresh"),
+    path("auth/token/revoke/", views.revoke_token, name="token-revoke"),
+    path("admin/roster/", views.provision_roster, name="provision-roster"),
+    path(
+        "admin/children/<int:pk>/export/",
+        views.export_child_data,
+        name="export-child-data",
+    ),
+]
@@ -1,3 +1,128 @@
-# from django.shortcuts import render
+import io
+import json
 
-# Create your views here.
+from django.contrib.auth import authenticate
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from core.models import AuditLog
+from core.ratelimit import rate_limit
+from profiles import tokens
+from profiles.models import ChildProfile, User
+from profiles.privacy import export_archive
+from profiles.provisioning import RosterError, parse_roster, provision
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _submitted_email(request):
+    return str(_json_body(request).get("email") or "").strip().lower()
+
+
+@csrf_exempt
+@require_POST
+@rate_limit("auth_ip")
+@rate_limit("auth", key=_submitted_email)
+def obtain_token(request):
+    """Exchange email and password for an access/refresh token pair."""
+    data = _json_body(request)
+    user = authenticate(request, email=data.get("email"), password=data.get("password"))
+    if user is None:
+        return JsonResponse({"detail": "Invalid credentials"}, status=401)
+    return JsonResponse(tokens.issue_pair(user))
+
+
+@csrf_exempt
+@require_POST
+@rate_limit("auth")
+def refresh_token(request):
+    """Rotate a refresh token: the old one is revoked, a new pair issued."""
+    try:
+        claims = tokens.decode(
+            str(_json_body(request).get("refresh", "")), tokens.REFRESH
+        )
+    except tokens.TokenError as exc:
+        return JsonResponse({"detail": str(exc)}, status=401)
+    # The one query on this path: pick up role changes and deactivation.
+    user = User.objects.filter(pk=claims["sub"], is_active=True).first()
+    if user is None:
+        return JsonResponse({"detail": "Account is inactive"}, status=401)
+    # The in-memory list lags other workers; the unique jti row does not, so
+    # only the request that inserts it gets a new pair.
+    if not tokens.revocations.revoke(claims):
+        return JsonResponse({"detail": "Token revoked"}, status=401)
+    return JsonResponse(tokens.issue_pair(user))
+
+
+@csrf_exempt
+@require_POST
+def revoke_token(request):
+    """Log out: revoke the bearer access token and, if given, the refresh one."""
+    claims = getattr(request.user, "token_claims", None)
+    if claims is None:
+        return JsonResponse({"detail": "Bearer token required"}, status=401)
+    refresh = _json_body(request).get("refresh")
+    if refresh:
+        try:
+            refresh_claims = tokens.decode(str(refresh), tokens.REFRESH)
+        except tokens.TokenError as exc:
+            return JsonResponse({"detail": str(exc)}, status=400)
+        if refresh_claims["sub"] != claims["sub"]:
+            return JsonResponse({"detail": "Token belongs to another user"}, status=403)
+        tokens.revocations.revoke(refresh_claims)
+    tokens.revocations.revoke(claims)
+    return HttpResponse(status=204)
+
+
+@require_POST
+@rate_limit("ingest")
+def provision_roster(request):
+    """Create child accounts from a CSV roster (body or ``roster`` upload)."""
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff account required"}, status=403)
+    upload = request.FILES.get("roster")
+    raw = upload.read() if upload else request.body
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return JsonResponse({"detail": "Roster must be UTF-8 CSV"}, status=400)
+    try:
+        rows = parse_roster(io.StringIO(text))
+    except RosterError as exc:
+        return JsonResponse(
+            {"detail": "Roster has errors", "errors": exc.errors}, status=400
+        )
+    if not rows:
+        return JsonResponse({"detail": "Roster is empty"}, status=400)
+    try:
+        results = provision(rows, actor=request.user)
+    except RosterError as exc:
+        return JsonResponse(
+            {"detail": "Roster conflicts with existing accounts", "errors": exc.errors},
+            status=409,
+        )
+    return JsonResponse({"created": len(results), "children": results}, status=201)
+
+
+@require_GET
+def export_child_data(request, pk):
+    """Stream a zip of everything stored about one child (staff only)."""
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff account required"}, status=403)
+    child = get_object_or_404(ChildProfile.objects.only("pk"), pk=pk)
+    AuditLog.objects.create(
+        user=request.user, action="child_data_exported", meta={"child_id": child.pk}
+    )
+    response = StreamingHttpResponse(
+        export_archive(child.pk), content_type="application/zip"
+    )
+    response["Content-Disposition"] = f'attachment; filename="child-{child.pk}.zip"'
+    return response
@@ -0,0 +1,219 @@
+"""
+Nightly "children needing attention" scores.
+
+``Signals.load`` reads every child's inputs with a handful of set-based
+queries into NumPy arrays, one row per child:
+
+* lessons in progress, and how many of them were not opened for
+  ``ATTENTION_STALL_DAYS``;
+* slope and mean of quiz scores over the last ``ATTENTION_TREND_DAYS``
+  (least squares against attempt order, from per-child sums);
+* current ``topic_mastery`` from the ``ProgressLabeled`` features.
+
+Each signal is scaled to 0-1 and ``WEIGHTS`` combine them into the risk
+score. ``run`` ranks, for every teacher, the children with progress on one
+of the teacher's lessons and replaces the stored ``AttentionScore`` rows
+with each teacher's top ``ATTENTION_LIST_SIZE``, so dashboards read a
+precomputed list. NumPy is imported on first use (see ``ai.fallback``).
+"""
+
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ai.fallback import numpy
+from ai.models import ProgressLabeled
+from profiles.models import ChildProfile
+from progress.models import AttentionScore, Progress
+from quizzes.models import QuizAttempt
+
+STALL_DAYS = getattr(settings, "ATTENTION_STALL_DAYS", 14)
+TREND_DAYS = getattr(settings, "ATTENTION_TREND_DAYS", 60)
+LIST_SIZE = getattr(settings, "ATTENTION_LIST_SIZE", 25)
+WEIGHTS = {
+    "load": 0.15,
+    "stalled": 0.25,
+    "declining": 0.25,
+    "low_scores": 0.15,
+    "low_mastery": 0.2,
+}
+# In-progress lessons at which the load signal saturates, and the score
+# drop per attempt at which the decline signal does.
+FULL_LOAD = 5
+FULL_DECLINE = 10.0
+
+
+class Signals:
+    """Per-child inputs as parallel arrays, one row per child id (sorted)."""
+
+    def __init__(self, child_ids):
+        np = numpy()
+        self.child_ids = np.array(sorted(child_ids), dtype=np.int64)
+        size = len(self.child_ids)
+        self.in_progress = np.zeros(size, dtype=np.int64)
+        self.stalled = np.zeros(size, dtype=np.int64)
+        self.trend = np.full(size, np.nan)
+        self.average = np.full(size, np.nan)
+        self.mastery = np.full(size, np.nan)
+
+    def __len__(self):
+        return len(self.child_ids)
+
+    def index(self, ids):
+        """``(positions, found)`` of ``ids``; children created mid-run are not found."""
+        np = numpy()
+        positions = np.searchsorted(self.child_ids, ids)
+        found = positions < len(self)
+        found[found] = self.child_ids[positions[found]] == ids[found]
+        return positions[found], found
+
+    @classmethod
+    def load(cls, now=None):
+        now = now or timezone.now()
+        signals = cls(ChildProfile.objects.values_list("pk", flat=True))
+        signals.load_progress(now - timedelta(days=STALL_DAYS))
+        signals.load_quiz_trend(now - timedelta(days=TREND_DAYS))
+        signals.load_mastery()
+        return signals
+
+    def load_progress(self, stall_cutoff):
+        np = numpy()
+        rows = (
+            Progress.objects.filter(status=Progress.Status.IN_PROGRESS)
+            .values("child_id")
+            .annotate(
+                total=Count("id"),
+                stalled=Count(
+                    "id",
+                    filter=Q(last_accessed__isnull=True)
+                    | Q(last_accessed__lt=stall_cutoff),
+                ),
+            )
+            .order_by()
+            .values_list("child_id", "total", "stalled")
+        )
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+        positions, found = self.index(data[:, 0])
+        self.in_progress[positions] = data[found, 1]
+        self.stalled[positions] = data[found, 2]
+
+    def load_quiz_trend(self, since):
+        np = numpy()
+        attempts = (
+            QuizAttempt.objects.filter(created_at__gte=since)
+            .order_by("child_id", "created_at", "pk")
+            .values_list("child_id", "score")
+            .iterator(chunk_size=10_000)
+        )
+        data = np.fromiter(
+            chain.from_iterable((child_id, score) for child_id, score in attempts),
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        positions, found = self.index(data[:, 0].astype(np.int64))
+        scores = data[found, 1]
+        if not len(scores):
+            return
+        # Rows are grouped by child, so x is each attempt's order per child.
+        starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+        x = np.arange(len(positions)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(positions)])
+        )
+        size = len(self)
+        n = np.bincount(positions, minlength=size)
+        sx = np.bincount(positions, weights=x, minlength=size)
+        sy = np.bincount(positions, weights=scores, minlength=size)
+        sxy = np.bincount(positions, weights=x * scores, minlength=size)
+        sxx = np.bincount(positions, weights=x * x, minlength=size)
+        denominator = n * sxx - sx * sx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.trend = np.where(
+                denominator > 0, (n * sxy - sx * sy) / denominator, np.nan
+            )
+            self.average = np.where(n > 0, sy / n, np.nan)
+
+    def load_mastery(self):
+        np = numpy()
+        rows = (
+            ProgressLabeled.objects.current()
+            .filter(child__isnull=False)
+            .values_list("child_id", "topic_mastery")
+        )
+        data = np.array(list(rows), dtype=np.float64).reshape(-1, 2)
+        positions, found = self.index(data[:, 0].astype(np.int64))
+        self.mastery[positions] = data[found, 1]
+
+    def risk(self):
+        """Weighted risk score from 0 to 1 per child; unknown signals count as fine."""
+        np = numpy()
+        signals = {
+            "load": np.minimum(self.in_progress / FULL_LOAD, 1.0),
+            "stalled": self.stalled / np.maximum(self.in_progress, 1),
+            "declining": np.clip(-np.nan_to_num(self.trend) / FULL_DECLINE, 0, 1),
+            "low_scores": np.clip(1 - np.nan_to_num(self.average, nan=100) / 100, 0, 1),
+            "low_mastery": np.clip(
+                1 - np.nan_to_num(self.mastery, nan=100) / 100, 0, 1
+            ),
+        }
+        return sum(WEIGHTS[name] * values for name, values in signals.items())
+
+
+def _optional(value):
+    return None if numpy().isnan(value) else float(value)
+
+
+def rank_for_teachers(signals, scores, list_size=LIST_SIZE, now=None):
+    """Unsaved ``AttentionScore`` rows: each teacher's top children by score."""
+    np = numpy()
+    now = now or timezone.now()
+    pairs = np.array(
+        list(
+            Progress.objects.values_list("lesson__teacher_id", "child_id")
+            .distinct()
+            .order_by()
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    positions, found = signals.index(pairs[:, 1])
+    teachers = pairs[found, 0]
+    keep = scores[positions] > 0
+    teachers, positions = teachers[keep], positions[keep]
+    # By teacher, then highest score first (child id breaks ties).
+    order = np.lexsort((signals.child_ids[positions], -scores[positions], teachers))
+    teachers, positions = teachers[order], positions[order]
+    starts = np.flatnonzero(np.r_[True, teachers[1:] != teachers[:-1]])
+    ranks = np.arange(len(teachers)) - np.repeat(
+        starts, np.diff(np.r_[starts, len(teachers)])
+    )
+    return [
+        AttentionScore(
+            teacher_id=int(teacher),
+            child_id=int(signals.child_ids[position]),
+            rank=int(rank) + 1,
+            score=round(float(scores[position]), 4),
+            in_progress=int(signals.in_progress[position]),
+            stalled=int(signals.stalled[position]),
+            score_trend=_optional(signals.trend[position]),
+            average_score=_optional(signals.average[position]),
+            topic_mastery=_optional(signals.mastery[position]),
+            computed_at=now,
+        )
+        for teacher, position, rank in zip(teachers, positions, ranks)
+        if rank < list_size
+    ]
+
+
+def run(list_size=LIST_SIZE, now=None):
+    """Score every child and replace the stored lists; ``(children, rows)``."""
+    if numpy() is None:
+        raise RuntimeError("NumPy is required to score children")
+    now = now or timezone.now()
+    signals = Signals.load(now)
+    rows = rank_for_teachers(signals, signals.risk(), list_size, now)
+    with transaction.atomic():
+        AttentionScore.objects.all().delete()
+        AttentionScore.objects.bulk_create(rows, batch_size=1000)
+    return len(signals), len(rows)
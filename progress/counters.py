@@ -0,0 +1,134 @@
+"""
+Incremental lesson and teacher counters.
+
+Writes bump the counters with atomic ``F()`` updates so dashboards read a
+single row instead of running ``COUNT(*)`` over progress and attempt tables.
+Lesson counter deltas go through the outbox (``publish_lesson_stats``):
+the write path pays for one insert and ``apply_lesson_stats`` sums a whole
+batch of deltas into one update per lesson. ``progress.signals`` follows
+single-row creates, deletes, status and score edits, and rows moved to
+another lesson or quiz. Bulk writes bypass signals, so ``reconcile_*``
+recomputes the truth periodically (see the ``reconcile_counters`` command).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from core import outbox
+from lessons.models import lesson
+from profiles.models import TeacherProfile
+from progress.models import LessonStats, Progress
+from quizzes.models import QuizAttempt
+
+COUNTER_FIELDS = (
+    "view_count",
+    "completion_count",
+    "quiz_attempt_count",
+    "quiz_score_total",
+)
+LESSON_STATS_TOPIC = "lesson_stats.changed"
+
+
+def bump_lesson_stats(lesson_id, **deltas):
+    """Atomically add ``deltas`` to the counters of one lesson."""
+    values = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    values["updated_at"] = timezone.now()
+    stats = LessonStats.objects.filter(lesson_id=lesson_id)
+    if stats.update(**values):
+        return
+    # First write for this lesson: create the row, then retry the increment
+    # so concurrent creators still add up correctly.
+    LessonStats.objects.get_or_create(lesson_id=lesson_id)
+    stats.update(**values)
+
+
+def publish_lesson_stats(lesson_id, **deltas):
+    """Queue counter ``deltas`` for one lesson on the outbox."""
+    # Scores travel as strings in the JSON payload.
+    deltas = {
+        name: delta if isinstance(delta, int) else str(delta)
+        for name, delta in deltas.items()
+        if delta
+    }
+    if deltas:
+        outbox.publish(LESSON_STATS_TOPIC, {"lesson_id": lesson_id, **deltas})
+
+
+@outbox.handler(LESSON_STATS_TOPIC)
+def apply_lesson_stats(payloads):
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for payload in payloads:
+        counters = totals[payload["lesson_id"]]
+        for name in COUNTER_FIELDS:
+            delta = payload.get(name, 0)
+            counters[name] += Decimal(delta) if isinstance(delta, str) else delta
+    # Lessons deleted since the events were published have no stats row.
+    live = set(lesson.objects.filter(pk__in=totals).values_list("pk", flat=True))
+    for lesson_id, counters in sorted(totals.items()):
+        if lesson_id in live:
+            bump_lesson_stats(lesson_id, **counters)
+
+
+def bump_upload_count(teacher_id, delta):
+    TeacherProfile.objects.filter(pk=teacher_id).update(
+        upload_count=F("upload_count") + delta
+    )
+
+
+def reconcile_lesson_stats(batch_size=500):
+    """Recompute every lesson's counters; returns the number of rows fixed."""
+    expected = {
+        pk: dict.fromkeys(COUNTER_FIELDS, 0)
+        for pk in lesson.objects.values_list("pk", flat=True)
+    }
+    progress_rows = Progress.objects.values("lesson_id").annotate(
+        views=Count("id"),
+        completions=Count("id", filter=Q(status=Progress.Status.COMPLETED)),
+    )
+    for row in progress_rows:
+        counters = expected[row["lesson_id"]]
+        counters["view_count"] = row["views"]
+        counters["completion_count"] = row["completions"]
+    attempt_rows = QuizAttempt.objects.values(lesson_id=F("quiz__lesson_id")).annotate(
+        attempts=Count("id"), score_total=Sum("score")
+    )
+    for row in attempt_rows:
+        counters = expected[row["lesson_id"]]
+        counters["quiz_attempt_count"] = row["attempts"]
+        counters["quiz_score_total"] = row["score_total"] or Decimal("0")
+
+    existing = LessonStats.objects.in_bulk(list(expected))
+    to_create, to_update = [], []
+    now = timezone.now()
+    for lesson_id, counters in expected.items():
+        stats = existing.get(lesson_id)
+        if stats is None:
+            to_create.append(LessonStats(lesson_id=lesson_id, **counters))
+        elif any(getattr(stats, name) != value for name, value in counters.items()):
+            for name, value in counters.items():
+                setattr(stats, name, value)
+            stats.updated_at = now
+            to_update.append(stats)
+    LessonStats.objects.bulk_create(to_create, batch_size=batch_size)
+    LessonStats.objects.bulk_update(
+        to_update, [*COUNTER_FIELDS, "updated_at"], batch_size=batch_size
+    )
+    return len(to_create) + len(to_update)
+
+
+def reconcile_upload_counts(batch_size=500):
+    """Reset ``TeacherProfile.upload_count`` wherever it drifted."""
+    drifted = list(
+        TeacherProfile.objects.annotate(actual=Count("lessons"))
+        .exclude(upload_count=F("actual"))
+        .only("pk")
+    )
+    for teacher in drifted:
+        teacher.upload_count = teacher.actual
+    TeacherProfile.objects.bulk_update(drifted, ["upload_count"], batch_size=batch_size)
+    return len(drifted)
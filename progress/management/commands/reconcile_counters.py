@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.routers import primary_only
+from progress.counters import reconcile_lesson_stats, reconcile_upload_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute lesson statistics and teacher upload counts from source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Compare against the primary, which the fixes are written to.
+        with primary_only():
+            batch_size = options["batch_size"]
+            lessons_fixed = reconcile_lesson_stats(batch_size=batch_size)
+            teachers_fixed = reconcile_upload_counts(batch_size=batch_size)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Reconciled {lessons_fixed} lesson stats and {teachers_fixed} teacher counts"
+                )
+            )
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.routers import primary_only
+from progress import reports
+
+
+class Command(BaseCommand):
+    help = "Run queued report exports, writing each to a downloadable file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when idle",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=float,
+            default=reports.KEEP_DAYS,
+            help="Delete finished exports and their files older than this when idle",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit"
+        )
+
+    def handle(self, *args, **options):
+        # Claiming re-reads the job it just leased.
+        with primary_only():
+            worker_id = reports.default_worker_id()
+            finished = purged = 0
+            purged_at = None
+            try:
+                while True:
+                    job = reports.claim_next(worker_id)
+                    if job is not None:
+                        reports.run_export(job)
+                        finished += 1
+                        self.stdout.write(
+                            f"{job.report}.{job.format} {job.pk}: {job.status} "
+                            f"({job.size or 0} bytes)"
+                        )
+                        continue
+                    if purged_at is None or time.monotonic() - purged_at >= 3600:
+                        purged += reports.purge(options["keep_days"])
+                        purged_at = time.monotonic()
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+            except KeyboardInterrupt:
+                pass
+            self.stdout.write(
+                self.style.SUCCESS(f"Finished {finished} exports, purged {purged}")
+            )
@@ -0,0 +1,36 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.routers import primary_only
+from progress import attention
+
+
+class Command(BaseCommand):
+    help = (
+        "Score every child for stalling progress and falling quiz results and "
+        "store each teacher's ranked attention list"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--list-size",
+            type=int,
+            default=attention.LIST_SIZE,
+            help="Children kept per teacher",
+        )
+
+    def handle(self, *args, **options):
+        # Score what the primary holds, not a lagging replica.
+        with primary_only():
+            started = perf_counter()
+            try:
+                children, rows = attention.run(options["list_size"])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Scored {children} children, stored {rows} ranked rows in "
+                    f"{perf_counter() - started:.1f}s"
+                )
+            )
@@ -1,7 +1,10 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
 from lessons.models import lesson
-from profiles.models import ChildProfile
+from profiles.models import ChildProfile, TeacherProfile
 
 
 class Progress(models.Model):
@@ -50,6 +53,8 @@ class Progress(models.Model):
         indexes = [
             models.Index(fields=["child", "last_accessed"]),
             models.Index(fields=["status", "completion_date"]),
+            # Per-lesson completion counts (stats reconcile, fallback matrix).
+            models.Index(fields=["lesson", "status"]),
         ]
 
     def __str__(self):
@@ -102,3 +107,144 @@ class ChildBadge(models.Model):
 
     def __str__(self):
         return f"{self.child.user.username} - {self.badge.name}"
+
+
+class LessonStats(models.Model):
+    """Precomputed per-lesson counters"""
+
+    lesson = models.OneToOneField(
+        lesson,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        help_text="Lesson these counters describe",
+    )
+    view_count = models.IntegerField(
+        default=0, help_text="Children who opened the lesson"
+    )
+    completion_count = models.IntegerField(
+        default=0, help_text="Children who completed the lesson"
+    )
+    quiz_attempt_count = models.IntegerField(
+        default=0, help_text="Quiz attempts on the lesson's quizzes"
+    )
+    quiz_score_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of quiz attempt scores (for the running average)",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "progress_lessonstats"
+        verbose_name_plural = "Lesson stats"
+
+    @property
+    def average_quiz_score(self):
+        if not self.quiz_attempt_count:
+            return None
+        return self.quiz_score_total / self.quiz_attempt_count
+
+    def __str__(self):
+        return f"Stats for lesson {self.lesson_id}"
+
+
+class AttentionScore(models.Model):
+    """Nightly rank of a child on a teacher's "needs attention" list"""
+
+    teacher = models.ForeignKey(
+        TeacherProfile,
+        on_delete=models.CASCADE,
+        related_name="attention_scores",
+        help_text="Teacher whose list this row is on",
+    )
+    child = models.ForeignKey(
+        ChildProfile,
+        on_delete=models.CASCADE,
+        related_name="attention_scores",
+        help_text="Child being scored",
+    )
+    rank = models.IntegerField(help_text="1 is the child most in need of attention")
+    score = models.FloatField(help_text="Risk score from 0 to 1")
+    in_progress = models.IntegerField(help_text="Lessons started but not completed")
+    stalled = models.IntegerField(
+        help_text="In-progress lessons not opened for ATTENTION_STALL_DAYS"
+    )
+    score_trend = models.FloatField(
+        null=True, blank=True, help_text="Recent quiz score change per attempt"
+    )
+    average_score = models.FloatField(
+        null=True, blank=True, help_text="Recent average quiz score"
+    )
+    topic_mastery = models.FloatField(
+        null=True, blank=True, help_text="Current topic mastery from ML features"
+    )
+    computed_at = models.DateTimeField(help_text="When the scorer ran")
+
+    class Meta:
+        db_table = "progress_attentionscore"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["teacher", "child"], name="unique_attention_teacher_child"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["teacher", "rank"]),
+        ]
+        ordering = ["teacher", "rank"]
+
+    def __str__(self):
+        return f"#{self.rank} {self.child_id} for teacher {self.teacher_id}"
+
+
+class ReportExport(models.Model):
+    """Background export of a report to a downloadable file"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="report_exports",
+        help_text="Teacher or staff member who asked for the export",
+    )
+    report = models.CharField(max_length=30, help_text="Name in progress.reports")
+    format = models.CharField(max_length=10, help_text="csv or ndjson")
+    compressed = models.BooleanField(default=True, help_text="Whether gzipped")
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    file_name = models.CharField(
+        max_length=255, blank=True, default="", help_text="Download file name"
+    )
+    size = models.BigIntegerField(null=True, blank=True, help_text="File size in bytes")
+    error = models.TextField(null=True, blank=True, help_text="Why the export failed")
+    attempts = models.PositiveSmallIntegerField(
+        default=0, help_text="Times a worker claimed the export"
+    )
+    locked_by = models.CharField(
+        max_length=100, blank=True, default="", help_text="Worker holding the lease"
+    )
+    lease_expires_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the worker lease lapses"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "progress_reportexport"
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["status", "lease_expires_at"]),
+            models.Index(fields=["status", "finished_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.report}.{self.format} - {self.status}"
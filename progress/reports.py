@@ -0,0 +1,351 @@
+"""
+Class-wide CSV/NDJSON exports of progress, quiz scores and badges.
+
+Rows are read with ``values_list`` over the joined columns (one query, no
+model instances) through a server-side cursor (``.iterator``), encoded
+line by line and handed out in blocks of about ``BLOCK_SIZE`` bytes,
+optionally gzipped on the fly. Memory stays flat however many rows a
+report has, both when a view streams it and when ``run_export`` writes
+it to a file for a background ``ReportExport`` job.
+
+Teachers see rows for their own lessons (badges of children who took
+one of them); staff see everything.
+
+Export workers lease jobs like the media queue does. A job whose worker
+died is claimed again once ``REPORT_EXPORT_LEASE_SECONDS`` pass without a
+renewal, and it fails after ``REPORT_EXPORT_MAX_ATTEMPTS`` claims. Files
+are written under a temporary name and moved into place only while the
+lease is still held. ``purge`` deletes finished jobs and their files after
+``REPORT_EXPORT_KEEP_DAYS``. A file mixes many children, so privacy
+erasure (``profiles.privacy.erase``) cannot remove one child from it. Only
+this retention window bounds how long an erased child stays in old
+exports.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from profiles.models import TeacherProfile
+from progress.models import ChildBadge, Progress, ReportExport
+from quizzes.models import QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2_000
+BLOCK_SIZE = 64 * 1024
+# Not under MEDIA_ROOT: exports hold children's data and go through the API.
+EXPORT_ROOT = getattr(
+    settings, "REPORT_EXPORT_ROOT", os.path.join(settings.BASE_DIR, "reports")
+)
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+LEASE_SECONDS = getattr(settings, "REPORT_EXPORT_LEASE_SECONDS", 600)
+MAX_ATTEMPTS = getattr(settings, "REPORT_EXPORT_MAX_ATTEMPTS", 3)
+KEEP_DAYS = getattr(settings, "REPORT_EXPORT_KEEP_DAYS", 7)
+
+Status = ReportExport.Status
+
+
+class LeaseLost(Exception):
+    """Another worker claimed the export while this one was writing it."""
+
+
+class Report:
+    """A queryset and the joined columns exported from it."""
+
+    def __init__(self, name, model, columns, for_teacher):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.for_teacher = for_teacher
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def rows(self, teacher=None):
+        queryset = self.model.objects.all()
+        if teacher is not None:
+            queryset = queryset.filter(self.for_teacher(teacher))
+        return (
+            queryset.order_by("pk")
+            .values_list(*(path for _, path in self.columns))
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+
+
+REPORTS = {
+    report.name: report
+    for report in (
+        Report(
+            "progress",
+            Progress,
+            [
+                ("child_id", "child_id"),
+                ("child", "child__user__username"),
+                ("lesson_id", "lesson_id"),
+                ("lesson", "lesson__title"),
+                ("status", "status"),
+                ("points_earned", "points_earned"),
+                ("last_accessed", "last_accessed"),
+                ("completion_date", "completion_date"),
+            ],
+            lambda teacher: Q(lesson__teacher=teacher),
+        ),
+        Report(
+            "quiz_scores",
+            QuizAttempt,
+            [
+                ("child_id", "child_id"),
+                ("child", "child__user__username"),
+                ("quiz_id", "quiz_id"),
+                ("quiz", "quiz__title"),
+                ("lesson", "quiz__lesson__title"),
+                ("score", "score"),
+                ("max_score", "max_score"),
+                ("duration_seconds", "duration_seconds"),
+                ("created_at", "created_at"),
+            ],
+            lambda teacher: Q(quiz__lesson__teacher=teacher),
+        ),
+        Report(
+            "badges",
+            ChildBadge,
+            [
+                ("child_id", "child_id"),
+                ("child", "child__user__username"),
+                ("badge", "badge__name"),
+                ("awarded_at", "awarded_at"),
+            ],
+            # Children who have taken at least one of the teacher's lessons.
+            lambda teacher: Q(
+                child__in=Progress.objects.filter(lesson__teacher=teacher).values(
+                    "child_id"
+                )
+            ),
+        ),
+    )
+}
+
+
+def teacher_scope(user):
+    """``(allowed, teacher)``; staff get every row (``teacher`` is ``None``)."""
+    if user.is_staff:
+        return True, None
+    teacher = TeacherProfile.objects.filter(user_id=user.pk).first()
+    return teacher is not None, teacher
+
+
+def _csv_lines(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _ndjson_lines(headers, rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    yield "".join(lines).encode()
+
+
+def _gzipped(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(report, fmt, teacher=None, compress=False):
+    """Yield the encoded report as byte blocks."""
+    encode = _csv_lines if fmt == "csv" else _ndjson_lines
+    blocks = encode(report.headers, report.rows(teacher))
+    return _gzipped(blocks) if compress else blocks
+
+
+def filename(report, fmt, compress=False):
+    day = timezone.localdate().isoformat()
+    return f"{report.name}-{day}.{fmt}" + (".gz" if compress else "")
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _fail_abandoned(now):
+    """Give up on expired leases that have used every attempt."""
+    return ReportExport.objects.filter(
+        status=Status.RUNNING, lease_expires_at__lt=now, attempts__gte=MAX_ATTEMPTS
+    ).update(
+        status=Status.FAILED,
+        error="Export worker stopped",
+        finished_at=now,
+        locked_by="",
+        lease_expires_at=None,
+    )
+
+
+def claim_next(worker_id=None):
+    """
+    Lease the oldest pending export, or one whose worker's lease expired,
+    to ``worker_id`` and return it, or ``None``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        _fail_abandoned(now)
+        job = (
+            ReportExport.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Status.PENDING)
+                | Q(status=Status.RUNNING, lease_expires_at__lt=now)
+            )
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Status.RUNNING
+        job.started_at = now
+        job.attempts += 1
+        job.locked_by = worker_id or default_worker_id()
+        job.lease_expires_at = now + timedelta(seconds=LEASE_SECONDS)
+        job.save(
+            update_fields=[
+                "status",
+                "started_at",
+                "attempts",
+                "locked_by",
+                "lease_expires_at",
+            ]
+        )
+    return job
+
+
+def _leased(job):
+    return ReportExport.objects.filter(
+        pk=job.pk, status=Status.RUNNING, locked_by=job.locked_by
+    )
+
+
+def _renew(job):
+    job.lease_expires_at = timezone.now() + timedelta(seconds=LEASE_SECONDS)
+    if not _leased(job).update(lease_expires_at=job.lease_expires_at):
+        raise LeaseLost()
+
+
+def artifact_path(job):
+    return os.path.join(EXPORT_ROOT, f"{job.pk}-{job.file_name}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write(job, path, report, teacher):
+    renew_every = LEASE_SECONDS / 3
+    renewed = timezone.now()
+    with open(path, "wb") as fh:
+        for block in stream(report, job.format, teacher, job.compressed):
+            fh.write(block)
+            if (timezone.now() - renewed).total_seconds() >= renew_every:
+                _renew(job)
+                renewed = timezone.now()
+
+
+def run_export(job):
+    """
+    Write ``job``'s report under ``EXPORT_ROOT`` and record the outcome,
+    unless another worker took the job over meanwhile.
+    """
+    report = REPORTS[job.report]
+    allowed, teacher = teacher_scope(job.requested_by)
+    job.file_name = filename(report, job.format, job.compressed)
+    path = artifact_path(job)
+    partial = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        if not allowed:
+            raise PermissionError("Requester is no longer a teacher or staff")
+        os.makedirs(EXPORT_ROOT, exist_ok=True)
+        _write(job, partial, report, teacher)
+        job.size = os.path.getsize(partial)
+    except LeaseLost:
+        logger.warning("Lost the lease on report export %s", job.pk)
+        _remove(partial)
+        return job
+    except Exception as exc:
+        logger.exception("Report export %s failed", job.pk)
+        _remove(partial)
+        job.status = Status.FAILED
+        job.error = str(exc)
+    else:
+        job.status = Status.DONE
+    job.finished_at = timezone.now()
+    with transaction.atomic():
+        finished = _leased(job).update(
+            status=job.status,
+            file_name=job.file_name,
+            size=job.size,
+            error=job.error,
+            finished_at=job.finished_at,
+            locked_by="",
+            lease_expires_at=None,
+        )
+        if finished and job.status == Status.DONE:
+            os.replace(partial, path)
+    if not finished:
+        logger.warning("Lost the lease on report export %s", job.pk)
+        _remove(partial)
+    return job
+
+
+def purge(keep_days=KEEP_DAYS, now=None):
+    """
+    Delete exports finished more than ``keep_days`` ago together with their
+    files, and partial files left by dead workers; returns the job count.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=keep_days)
+    deleted = 0
+    for job in ReportExport.objects.filter(
+        status__in=[Status.DONE, Status.FAILED], finished_at__lt=cutoff
+    ).iterator():
+        if job.file_name:
+            _remove(artifact_path(job))
+        deleted += ReportExport.objects.filter(pk=job.pk).delete()[0]
+    if os.path.isdir(EXPORT_ROOT):
+        for entry in os.scandir(EXPORT_ROOT):
+            if (
+                entry.name.endswith(".part")
+                and entry.stat().st_mtime < cutoff.timestamp()
+            ):
+                _remove(entry.path)
+    return deleted
@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from lessons.models import lesson
+from progress.counters import bump_upload_count, publish_lesson_stats
+from progress.models import Progress
+from quizzes.models import Quiz, QuizAttempt
+
+COMPLETED = Progress.Status.COMPLETED
+
+
+@receiver(post_init, sender=lesson, dispatch_uid="counters_lesson_loaded")
+def lesson_loaded(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not fetched.
+    instance._counted_teacher_id = instance.__dict__.get("teacher_id")
+
+
+@receiver(post_save, sender=lesson, dispatch_uid="counters_lesson_saved")
+def lesson_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_upload_count(instance.teacher_id, 1)
+    elif instance._counted_teacher_id not in (None, instance.teacher_id):
+        # Reassigned: the upload now counts for the new teacher.
+        bump_upload_count(instance._counted_teacher_id, -1)
+        bump_upload_count(instance.teacher_id, 1)
+    instance._counted_teacher_id = instance.teacher_id
+
+
+@receiver(post_delete, sender=lesson, dispatch_uid="counters_lesson_deleted")
+def lesson_deleted(sender, instance, **kwargs):
+    bump_upload_count(instance._counted_teacher_id or instance.teacher_id, -1)
+
+
+@receiver(post_init, sender=Progress, dispatch_uid="counters_progress_loaded")
+def progress_loaded(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not fetched.
+    instance._counted_status = instance.__dict__.get("status")
+    instance._counted_lesson_id = instance.__dict__.get("lesson_id")
+
+
+def _progress_deltas(status, sign):
+    return {
+        "view_count": sign,
+        "completion_count": sign if status == COMPLETED else 0,
+    }
+
+
+@receiver(post_save, sender=Progress, dispatch_uid="counters_progress_saved")
+def progress_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    moved = not created and instance._counted_lesson_id not in (
+        None,
+        instance.lesson_id,
+    )
+    if moved:
+        # Counted against the old lesson; move the row's counts over.
+        publish_lesson_stats(
+            instance._counted_lesson_id,
+            **_progress_deltas(instance._counted_status, -1),
+        )
+        publish_lesson_stats(instance.lesson_id, **_progress_deltas(instance.status, 1))
+    else:
+        was_completed = not created and instance._counted_status == COMPLETED
+        is_completed = instance.status == COMPLETED
+        publish_lesson_stats(
+            instance.lesson_id,
+            view_count=1 if created else 0,
+            completion_count=int(is_completed) - int(was_completed),
+        )
+    instance._counted_status = instance.status
+    instance._counted_lesson_id = instance.lesson_id
+
+
+@receiver(post_delete, sender=Progress, dispatch_uid="counters_progress_deleted")
+def progress_deleted(sender, instance, **kwargs):
+    publish_lesson_stats(
+        instance._counted_lesson_id or instance.lesson_id,
+        **_progress_deltas(instance._counted_status or instance.status, -1),
+    )
+
+
+def _lesson_of(quiz_id):
+    return Quiz.objects.filter(pk=quiz_id).values_list("lesson_id", flat=True).first()
+
+
+def _score(value):
+    return Decimal(str(value))
+
+
+@receiver(post_init, sender=QuizAttempt, dispatch_uid="counters_attempt_loaded")
+def quiz_attempt_loaded(sender, instance, **kwargs):
+    instance._counted_quiz_id = instance.__dict__.get("quiz_id")
+    instance._counted_score = instance.__dict__.get("score")
+
+
+@receiver(post_save, sender=QuizAttempt, dispatch_uid="counters_attempt_saved")
+def quiz_attempt_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Values deferred when the row was loaded count as unchanged.
+    old_quiz_id = instance._counted_quiz_id or instance.quiz_id
+    old_score = (
+        instance.score if instance._counted_score is None else instance._counted_score
+    )
+    instance._counted_quiz_id = instance.quiz_id
+    instance._counted_score = instance.score
+    if not created and (old_quiz_id, old_score) == (instance.quiz_id, instance.score):
+        return
+    if QuizAttempt.quiz.is_cached(instance):
+        lesson_id = instance.quiz.lesson_id
+    else:
+        lesson_id = _lesson_of(instance.quiz_id)
+    if created:
+        publish_lesson_stats(
+            lesson_id, quiz_attempt_count=1, quiz_score_total=instance.score
+        )
+        return
+    old_lesson_id = (
+        lesson_id if old_quiz_id == instance.quiz_id else _lesson_of(old_quiz_id)
+    )
+    if old_lesson_id == lesson_id:
+        publish_lesson_stats(
+            lesson_id, quiz_score_total=_score(instance.score) - _score(old_score)
+        )
+        return
+    publish_lesson_stats(
+        old_lesson_id, quiz_attempt_count=-1, quiz_score_total=-_score(old_score)
+    )
+    publish_lesson_stats(
+        lesson_id, quiz_attempt_count=1, quiz_score_total=instance.score
+    )
+
+
+@receiver(post_delete, sender=QuizAttempt, dispatch_uid="counters_attempt_deleted")
+def quiz_attempt_deleted(sender, instance, **kwargs):
+    publish_lesson_stats(
+        _lesson_of(instance.quiz_id),
+        quiz_attempt_count=-1,
+        quiz_score_total=-_score(instance.score),
+    )
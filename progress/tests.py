@@ -1,3 +1,346 @@
-# from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ai.fallback import numpy
+from ai.models import ProgressLabeled
+from core import outbox
+from lessons.models import lesson
+from profiles.models import ChildProfile, TeacherProfile, User
+from progress import attention, reports
+from progress.counters import reconcile_lesson_stats, reconcile_upload_counts
+from progress.models import (
+    AttentionScore,
+    Badge,
+    ChildBadge,
+    LessonStats,
+    Progress,
+    ReportExport,
+)
+from quizzes.models import Quiz, QuizAttempt
+
+
+class LessonCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher_user = User.objects.create_user(
+            "teacher@example.com", "teacher", "pw", role=User.Role.TEACHER
+        )
+        cls.teacher = TeacherProfile.objects.create(user=teacher_user)
+        cls.lesson = lesson.objects.create(
+            title="Counting to ten",
+            description="Numbers",
+            video_url="https://cdn.example.com/count.mp4",
+            teacher=cls.teacher,
+        )
+        cls.quiz = Quiz.objects.create(lesson=cls.lesson, title="Count quiz")
+        child_user = User.objects.create_user("kid@example.com", "kid", "pw")
+        cls.child = ChildProfile.objects.create(user=child_user, age=5)
+
+    def test_lesson_creation_bumps_upload_count(self):
+        self.teacher.refresh_from_db()
+        self.assertEqual(self.teacher.upload_count, 1)
+
+    def test_reassigning_a_lesson_moves_its_upload(self):
+        other = TeacherProfile.objects.create(
+            user=User.objects.create_user(
+                "other@example.com", "other", "pw", role=User.Role.TEACHER
+            )
+        )
+        moved = lesson.objects.get(pk=self.lesson.pk)
+        moved.teacher = other
+        moved.save()
+        moved.save()
+
+        self.teacher.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.teacher.upload_count, other.upload_count), (0, 1))
+        self.assertEqual(reconcile_upload_counts(), 0)
+
+    def test_progress_and_attempts_maintain_stats(self):
+        progress = Progress.objects.create(child=self.child, lesson=self.lesson)
+        progress.status = Progress.Status.COMPLETED
+        progress.save()
+        progress.save()
+        QuizAttempt.objects.create(child=self.child, quiz=self.quiz, score=80)
+        QuizAttempt.objects.create(child=self.child, quiz=self.quiz, score=60)
+        self.assertEqual(outbox.drain(), (4, 0))
+
+        stats = LessonStats.objects.get(lesson=self.lesson)
+        self.assertEqual(stats.view_count, 1)
+        self.assertEqual(stats.completion_count, 1)
+        self.assertEqual(stats.quiz_attempt_count, 2)
+        self.assertEqual(stats.average_quiz_score, Decimal("70"))
+
+    def test_edits_moves_and_deletes_keep_stats_exact(self):
+        other = lesson.objects.create(
+            title="Shapes",
+            description="",
+            video_url="https://cdn.example.com/shapes.mp4",
+            teacher=self.teacher,
+        )
+        other_quiz = Quiz.objects.create(lesson=other, title="Shapes quiz")
+        progress = Progress.objects.create(
+            child=self.child, lesson=self.lesson, status=Progress.Status.COMPLETED
+        )
+        progress.lesson = other
+        progress.save()
+        edited = QuizAttempt.objects.create(child=self.child, quiz=self.quiz, score=80)
+        edited.score = 95
+        edited.save()
+        moved = QuizAttempt.objects.create(child=self.child, quiz=self.quiz, score=60)
+        moved = QuizAttempt.objects.get(pk=moved.pk)
+        moved.quiz = other_quiz
+        moved.save()
+        QuizAttempt.objects.create(child=self.child, quiz=other_quiz, score=10).delete()
+        outbox.drain()
+
+        first, second = LessonStats.objects.get(lesson=self.lesson), other.stats
+        self.assertEqual((first.view_count, first.completion_count), (0, 0))
+        self.assertEqual((second.view_count, second.completion_count), (1, 1))
+        self.assertEqual((first.quiz_attempt_count, first.quiz_score_total), (1, 95))
+        self.assertEqual((second.quiz_attempt_count, second.quiz_score_total), (1, 60))
+        self.assertEqual(reconcile_lesson_stats(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        Progress.objects.bulk_create([Progress(child=self.child, lesson=self.lesson)])
+        TeacherProfile.objects.update(upload_count=7)
+
+        self.assertEqual(reconcile_lesson_stats(), 1)
+        self.assertEqual(reconcile_upload_counts(), 1)
+        self.assertEqual(LessonStats.objects.get(lesson=self.lesson).view_count, 1)
+        self.teacher.refresh_from_db()
+        self.assertEqual(self.teacher.upload_count, 1)
+
+    def test_dashboard_reads_counters(self):
+        Progress.objects.create(child=self.child, lesson=self.lesson)
+        outbox.drain()
+        self.client.force_login(self.teacher.user)
+
+        response = self.client.get(reverse("progress:teacher-dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["lessons"][0]["views"], 1)
+
+
+class ReportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers = []
+        cls.children = []
+        badge = Badge.objects.create(name="Explorer")
+        for name in ("ada", "bo"):
+            teacher = TeacherProfile.objects.create(
+                user=User.objects.create_user(
+                    f"{name}@example.com", name, "pw", role=User.Role.TEACHER
+                )
+            )
+            item = lesson.objects.create(
+                title=f"{name} lesson",
+                description="",
+                video_url="https://cdn.example.com/v.mp4",
+                teacher=teacher,
+            )
+            quiz = Quiz.objects.create(lesson=item, title=f"{name} quiz")
+            child = ChildProfile.objects.create(
+                user=User.objects.create_user(
+                    f"kid-{name}@example.com", f"kid-{name}", "pw"
+                ),
+                age=6,
+            )
+            Progress.objects.create(child=child, lesson=item)
+            QuizAttempt.objects.create(child=child, quiz=quiz, score=75)
+            ChildBadge.objects.create(child=child, badge=badge)
+            cls.teachers.append(teacher)
+            cls.children.append(child)
+        cls.staff = User.objects.create_user(
+            "staff@example.com", "staff", "pw", is_staff=True, role=User.Role.ADMIN
+        )
+
+    def get(self, user, name, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("progress:report", args=[name]), params)
+
+    def test_teacher_csv_covers_only_their_lessons(self):
+        response = self.get(self.teachers[0].user, "progress")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(
+            csv.reader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(rows[0][:2], ["child_id", "child"])
+        self.assertEqual([row[1] for row in rows[1:]], ["kid-ada"])
+
+    def test_staff_gets_gzipped_ndjson_of_everything(self):
+        response = self.get(self.staff, "badges", format="ndjson", gzip="1")
+
+        body = gzip.decompress(b"".join(response.streaming_content))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(sorted(row["child"] for row in rows), ["kid-ada", "kid-bo"])
+        self.assertTrue(response["Content-Disposition"].endswith('.ndjson.gz"'))
+
+    def test_children_and_unknown_reports_are_refused(self):
+        self.assertEqual(self.get(self.children[0].user, "progress").status_code, 403)
+        self.assertEqual(self.get(self.staff, "passwords").status_code, 404)
+
+    def test_background_export_is_downloadable(self):
+        user = self.teachers[1].user
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("progress:report-export-start", args=["quiz_scores"])
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], ReportExport.Status.PENDING)
+
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch.object(reports, "EXPORT_ROOT", root):
+                reports.run_export(reports.claim_next())
+                self.assertIsNone(reports.claim_next())
+                state = self.client.get(response["Location"]).json()
+                download = self.client.get(state["download_url"])
+                body = gzip.decompress(b"".join(download.streaming_content))
+                download.close()
+
+        self.assertEqual(state["status"], ReportExport.Status.DONE)
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual(
+            [(r["child"], r["score"]) for r in rows], [("kid-bo", "75.00")]
+        )
+
+    def test_expired_export_lease_is_claimed_again(self):
+        job = ReportExport.objects.create(
+            requested_by=self.staff, report="badges", format="csv"
+        )
+        first = reports.claim_next("worker-a")
+        ReportExport.objects.filter(pk=job.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        second = reports.claim_next("worker-b")
+        self.assertEqual((second.pk, second.attempts), (job.pk, 2))
+
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch.object(reports, "EXPORT_ROOT", root):
+                reports.run_export(first)
+                self.assertEqual(os.listdir(root), [])
+                reports.run_export(second)
+                self.assertEqual(len(os.listdir(root)), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (ReportExport.Status.DONE, ""))
+
+        ReportExport.objects.filter(pk=job.pk).update(
+            status=ReportExport.Status.RUNNING,
+            attempts=reports.MAX_ATTEMPTS,
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertIsNone(reports.claim_next("worker-c"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportExport.Status.FAILED)
+
+    def test_purge_deletes_old_exports_and_files(self):
+        old, recent = [
+            ReportExport.objects.create(
+                requested_by=self.staff,
+                report="badges",
+                format="csv",
+                status=ReportExport.Status.DONE,
+                file_name="badges.csv",
+                finished_at=timezone.now() - timedelta(days=days),
+            )
+            for days in (reports.KEEP_DAYS + 1, 1)
+        ]
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch.object(reports, "EXPORT_ROOT", root):
+                for job in (old, recent):
+                    open(reports.artifact_path(job), "wb").close()
+                self.assertEqual(reports.purge(), 1)
+                self.assertFalse(os.path.exists(reports.artifact_path(old)))
+                self.assertTrue(os.path.exists(reports.artifact_path(recent)))
+        self.assertQuerySetEqual(ReportExport.objects.all(), [recent])
+
+
+@skipIf(numpy() is None, "numpy is not installed")
+class AttentionScoreTests(TestCase):
+    def setUp(self):
+        self.teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(
+                "teach@example.com", "teach", "pw", role=User.Role.TEACHER
+            )
+        )
+        lessons = [
+            lesson.objects.create(
+                title=f"Lesson {n}",
+                description="",
+                video_url="https://x",
+                teacher=self.teacher,
+            )
+            for n in range(3)
+        ]
+        quiz = Quiz.objects.create(lesson=lessons[0], title="Quiz")
+        self.stalling, self.steady = [
+            ChildProfile.objects.create(
+                user=User.objects.create_user(f"{name}@example.com", name, "pw"),
+                age=6,
+            )
+            for name in ("stalling", "steady")
+        ]
+        long_ago = timezone.now() - timedelta(days=30)
+        for item in lessons:
+            Progress.objects.create(
+                child=self.stalling,
+                lesson=item,
+                status=Progress.Status.IN_PROGRESS,
+                last_accessed=long_ago,
+            )
+        Progress.objects.create(
+            child=self.steady, lesson=lessons[0], status=Progress.Status.COMPLETED
+        )
+        for child, scores in ((self.stalling, (90, 70, 40)), (self.steady, (80, 90))):
+            for score in scores:
+                QuizAttempt.objects.create(child=child, quiz=quiz, score=score)
+        ProgressLabeled.objects.create(
+            student_id=1,
+            child=self.stalling,
+            lessons_completed=0,
+            badges_earned=0,
+            streak_days=0,
+            topic_mastery=20,
+            mastery_level=ProgressLabeled.MasteryLevel.LOW,
+        )
+
+    def test_stalling_child_ranks_first(self):
+        self.assertEqual(attention.run(), (2, 2))
+
+        rows = list(AttentionScore.objects.filter(teacher=self.teacher))
+        self.assertEqual([row.child for row in rows], [self.stalling, self.steady])
+        first = rows[0]
+        self.assertEqual((first.rank, first.in_progress, first.stalled), (1, 3, 3))
+        self.assertAlmostEqual(first.score_trend, -25.0)
+        self.assertAlmostEqual(first.average_score, 200 / 3)
+        self.assertEqual(first.topic_mastery, 20)
+        self.assertGreater(first.score, 0.7)
+        self.assertLess(rows[1].score, 0.1)
+
+    def test_teachers_read_their_ranked_list(self):
+        attention.run()
+        self.client.force_login(self.teacher.user)
+
+        response = self.client.get(reverse("progress:teacher-attention"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["username"] for row in response.json()["children"]],
+            ["stalling", "steady"],
+        )
+        self.client.force_login(self.steady.user)
+        response = self.client.get(reverse("progress:teacher-attention"))
+        self.assertEqual(response.status_code, 403)
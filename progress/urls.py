@@ -0,0 +1,22 @@
+from django.urls import path
+
+from progress import views
+
+app_name = "progress"
+
+urlpatterns = [
+    path("teachers/dashboard/", views.teacher_dashboard, name="teacher-dashboard"),
+    path("teachers/attention/", views.attention_list, name="teacher-attention"),
+    path("reports/<str:name>/", views.export_report, name="report"),
+    path(
+        "reports/<str:name>/exports/",
+        views.start_report_export,
+        name="report-export-start",
+    ),
+    path("reports/exports/<uuid:pk>/", views.report_export, name="report-export"),
+    path(
+        "reports/exports/<uuid:pk>/download/",
+        views.download_report_export,
+        name="report-download",
+    ),
+]
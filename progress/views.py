@@ -1,3 +1,189 @@
-# from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.db.models import F
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from core.models import AuditLog
+from lessons.models import lesson
+from profiles.models import TeacherProfile
+from progress import reports
+from progress.models import AttentionScore, ReportExport
+
+
+def _teacher_for(request):
+    if not request.user.is_authenticated:
+        return None
+    try:
+        return TeacherProfile.objects.get(user_id=request.user.pk)
+    except TeacherProfile.DoesNotExist:
+        return None
+
+
+@require_GET
+def teacher_dashboard(request):
+    """Per-lesson counters for the signed-in teacher (no table scans)."""
+    teacher = _teacher_for(request)
+    if teacher is None:
+        return JsonResponse({"detail": "Teacher account required"}, status=403)
+
+    lessons = (
+        lesson.objects.filter(teacher=teacher)
+        .select_related("stats")
+        .only("id", "title", "slug", "is_published", "stats")
+    )
+    rows = []
+    for item in lessons:
+        stats = getattr(item, "stats", None)
+        average = stats.average_quiz_score if stats else None
+        rows.append(
+            {
+                "id": item.pk,
+                "title": item.title,
+                "slug": item.slug,
+                "is_published": item.is_published,
+                "views": stats.view_count if stats else 0,
+                "completions": stats.completion_count if stats else 0,
+                "quiz_attempts": stats.quiz_attempt_count if stats else 0,
+                "average_quiz_score": float(average) if average is not None else None,
+            }
+        )
+    return JsonResponse({"upload_count": teacher.upload_count, "lessons": rows})
+
+
+@require_GET
+def attention_list(request):
+    """The signed-in teacher's children ranked by the nightly attention scorer."""
+    teacher = _teacher_for(request)
+    if teacher is None:
+        return JsonResponse({"detail": "Teacher account required"}, status=403)
+
+    rows = list(
+        AttentionScore.objects.filter(teacher=teacher)
+        .order_by("rank")
+        .values(
+            "rank",
+            "child_id",
+            "score",
+            "in_progress",
+            "stalled",
+            "score_trend",
+            "average_score",
+            "topic_mastery",
+            "computed_at",
+            username=F("child__user__username"),
+        )
+    )
+    computed_at = rows[0]["computed_at"] if rows else None
+    for row in rows:
+        del row["computed_at"]
+    return JsonResponse({"computed_at": computed_at, "children": rows})
+
+
+def _report_request(request, name):
+    """``((report, fmt, compress, teacher), None)`` or ``(None, error)``."""
+    if not request.user.is_authenticated:
+        return None, JsonResponse({"detail": "Authentication required"}, status=401)
+    allowed, teacher = reports.teacher_scope(request.user)
+    if not allowed:
+        return None, JsonResponse({"detail": "Teacher account required"}, status=403)
+    report = reports.REPORTS.get(name)
+    if report is None:
+        return None, JsonResponse({"detail": f"Unknown report {name}"}, status=404)
+    fmt = request.GET.get("format", "csv")
+    if fmt not in reports.FORMATS:
+        return None, JsonResponse(
+            {"detail": "format must be csv or ndjson"}, status=400
+        )
+    compress = request.GET.get("gzip") in ("1", "true")
+    return (report, fmt, compress, teacher), None
+
+
+@require_GET
+def export_report(request, name):
+    """Stream a report as CSV or NDJSON (``?format=``), gzipped with ``?gzip=1``."""
+    args, error = _report_request(request, name)
+    if error:
+        return error
+    report, fmt, compress, teacher = args
+    AuditLog.objects.create(
+        user=request.user, action="report_exported", meta={"report": name}
+    )
+    response = StreamingHttpResponse(
+        reports.stream(report, fmt, teacher, compress),
+        content_type="application/gzip" if compress else reports.FORMATS[fmt],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{reports.filename(report, fmt, compress)}"'
+    )
+    return response
+
+
+def _job_state(job):
+    state = {
+        "id": str(job.pk),
+        "report": job.report,
+        "format": job.format,
+        "status": job.status,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == ReportExport.Status.DONE:
+        state["size"] = job.size
+        state["download_url"] = reverse("progress:report-download", args=[job.pk])
+    if job.status == ReportExport.Status.FAILED:
+        state["error"] = job.error
+    return state
+
+
+@require_POST
+def start_report_export(request, name):
+    """Queue a background export (gzipped unless ``?gzip=0``)."""
+    args, error = _report_request(request, name)
+    if error:
+        return error
+    report, fmt, _, _ = args
+    job = ReportExport.objects.create(
+        requested_by=request.user,
+        report=report.name,
+        format=fmt,
+        compressed=request.GET.get("gzip") not in ("0", "false"),
+    )
+    AuditLog.objects.create(
+        user=request.user, action="report_export_queued", meta={"report": name}
+    )
+    response = JsonResponse(_job_state(job), status=202)
+    response["Location"] = reverse("progress:report-export", args=[job.pk])
+    return response
+
+
+def _own_job(request, pk):
+    if not request.user.is_authenticated:
+        return None, JsonResponse({"detail": "Authentication required"}, status=401)
+    jobs = ReportExport.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(requested_by=request.user)
+    return get_object_or_404(jobs, pk=pk), None
+
+
+@require_GET
+def report_export(request, pk):
+    """Status of a background export."""
+    job, error = _own_job(request, pk)
+    if error:
+        return error
+    return JsonResponse(_job_state(job))
+
+
+@require_GET
+def download_report_export(request, pk):
+    """The finished export file."""
+    job, error = _own_job(request, pk)
+    if error:
+        return error
+    path = reports.artifact_path(job)
+    if job.status != ReportExport.Status.DONE or not os.path.exists(path):
+        return JsonResponse({"detail": "Export is not ready"}, status=409)
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=job.file_name)
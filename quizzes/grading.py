@@ -0,0 +1,48 @@
+"""
+Quiz grading against a cached answer key.
+
+The key (``correct_option_index`` per question, in display order) is read
+once and kept in the shared cache; saving or deleting a ``Question`` drops
+it (see ``quizzes.signals``).
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from quizzes.models import Question
+
+ANSWER_KEY_TTL = getattr(settings, "QUIZ_ANSWER_KEY_TTL", 3600)
+
+
+def _cache_key(quiz_id):
+    return f"quiz-answer-key:{quiz_id}"
+
+
+def answer_key(quiz_id):
+    key = cache.get(_cache_key(quiz_id))
+    if key is None:
+        key = list(
+            Question.objects.filter(quiz_id=quiz_id)
+            .order_by("order", "pk")
+            .values_list("correct_option_index", flat=True)
+        )
+        cache.set(_cache_key(quiz_id), key, ANSWER_KEY_TTL)
+    return key
+
+
+def invalidate_answer_key(quiz_id):
+    cache.delete(_cache_key(quiz_id))
+
+
+def grade(quiz_id, answers, max_score=100):
+    """Return ``(score, correct, total)`` for a list of selected indices."""
+    key = answer_key(quiz_id)
+    if not key:
+        return Decimal("0.00"), 0, 0
+    correct = sum(1 for given, expected in zip(answers, key) if given == expected)
+    score = (Decimal(correct * max_score) / len(key)).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP
+    )
+    return score, correct, len(key)
@@ -1,6 +1,8 @@
 from decimal import Decimal
+
 from django.core.validators import MinValueValidator
 from django.db import models
+
 from lessons.models import lesson
 
 
@@ -100,9 +102,21 @@ class QuizAttempt(models.Model):
     completed_at = models.DateTimeField(
         null=True, blank=True, help_text="When the attempt was completed"
     )
+    idempotency_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Client key that makes resubmitting the attempt a no-op",
+    )
 
     class Meta:
         db_table = "quizzes_quizattempt"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["child", "idempotency_key"],
+                name="unique_attempt_idempotency_key",
+            )
+        ]
         indexes = [
             models.Index(fields=["child", "created_at"]),
             models.Index(fields=["quiz", "created_at"]),
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from quizzes.grading import invalidate_answer_key
+from quizzes.models import Question
+
+
+@receiver(post_save, sender=Question, dispatch_uid="answer_key_question_saved")
+@receiver(post_delete, sender=Question, dispatch_uid="answer_key_question_deleted")
+def question_changed(sender, instance, **kwargs):
+    invalidate_answer_key(instance.quiz_id)
@@ -0,0 +1,184 @@
+"""
+Quiz attempt submission.
+
+``submit`` grades the answers against the cached key and inserts the
+``QuizAttempt`` together with one outbox event in a single transaction;
+that is all a request waits for. Every attempt carries a client
+idempotency key, unique per child, so a retried submission returns the
+stored attempt instead of appending a second one. The side effects run in
+``attempts_submitted`` when the outbox is drained (``drain_outbox``), a
+batch of attempts at a time: the ML ``QuizAttemptsRaw`` rows, the
+lessons' ``Progress``, perfect-score badges and audit log entries.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ai.models import MLStudentMap, QuizAttemptsRaw
+from core import outbox
+from core.models import AuditLog
+from progress.models import Badge, ChildBadge, Progress
+from quizzes.grading import grade
+from quizzes.models import QuizAttempt
+
+TOPIC = "quiz_attempt.submitted"
+# Percentage of max_score that completes the quiz's lesson.
+PASS_SCORE = getattr(settings, "QUIZ_PASS_SCORE", 80)
+PERFECT_SCORE_BADGE = getattr(settings, "QUIZ_PERFECT_SCORE_BADGE", "Perfect Score")
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for an attempt at another quiz."""
+
+
+def _existing(child_id, idempotency_key, quiz):
+    attempt = QuizAttempt.objects.filter(
+        child_id=child_id, idempotency_key=idempotency_key
+    ).first()
+    if attempt is not None and attempt.quiz_id != quiz.pk:
+        raise IdempotencyConflict(idempotency_key)
+    return attempt
+
+
+def submit(child_id, quiz, answers, idempotency_key, duration_seconds=None, user=None):
+    """``(attempt, created)``; a known key returns its attempt unchanged."""
+    attempt = _existing(child_id, idempotency_key, quiz)
+    if attempt is not None:
+        return attempt, False
+    score, correct, total = grade(quiz.pk, answers)
+    try:
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.create(
+                child_id=child_id,
+                quiz=quiz,
+                answers=answers,
+                score=score,
+                duration_seconds=duration_seconds,
+                completed_at=timezone.now(),
+                idempotency_key=idempotency_key,
+            )
+            outbox.publish(
+                TOPIC,
+                {
+                    "attempt_id": attempt.pk,
+                    "child_id": child_id,
+                    "user_id": user.pk if user else None,
+                    "quiz_id": quiz.pk,
+                    "lesson_id": quiz.lesson_id,
+                    "score": str(score),
+                    "max_score": attempt.max_score,
+                    "correct": correct,
+                    "total": total,
+                    "duration_seconds": duration_seconds,
+                },
+            )
+    except IntegrityError:
+        # A concurrent retry with the same key inserted first.
+        attempt = _existing(child_id, idempotency_key, quiz)
+        if attempt is None:
+            raise
+        return attempt, False
+    return attempt, True
+
+
+def _attempt_numbers(payloads):
+    """Attempt number of each payload's attempt among its child's tries at the quiz."""
+    attempts = QuizAttempt.objects.filter(
+        child_id__in={payload["child_id"] for payload in payloads},
+        quiz_id__in={payload["quiz_id"] for payload in payloads},
+        pk__lte=max(payload["attempt_id"] for payload in payloads),
+    ).order_by("pk")
+    seen = Counter()
+    numbers = {}
+    for pk, child_id, quiz_id in attempts.values_list("pk", "child_id", "quiz_id"):
+        seen[child_id, quiz_id] += 1
+        numbers[pk] = seen[child_id, quiz_id]
+    return numbers
+
+
+@outbox.handler(TOPIC)
+def attempts_submitted(payloads):
+    now = timezone.now()
+    child_ids = {payload["child_id"] for payload in payloads}
+
+    mappings = {
+        row.pop("child_id"): row
+        for row in MLStudentMap.objects.filter(child_id__in=child_ids).values(
+            "child_id", "ml_student_id", "student_uuid"
+        )
+    }
+    if mappings:
+        numbers = _attempt_numbers(
+            [payload for payload in payloads if payload["child_id"] in mappings]
+        )
+        QuizAttemptsRaw.objects.bulk_create(
+            QuizAttemptsRaw(
+                **mappings[payload["child_id"]],
+                child_id=payload["child_id"],
+                lesson_id=payload["lesson_id"],
+                attempt_number=numbers[payload["attempt_id"]],
+                score=float(payload["score"]),
+                wrong_questions=payload["total"] - payload["correct"],
+                response_time=float(payload["duration_seconds"] or 0),
+            )
+            for payload in payloads
+            if payload["child_id"] in mappings
+        )
+
+    # Saved one by one: Progress saves publish the lesson counter events.
+    progress = {
+        (row.child_id, row.lesson_id): row
+        for row in Progress.objects.filter(
+            child_id__in=child_ids,
+            lesson_id__in={payload["lesson_id"] for payload in payloads},
+        )
+    }
+    for payload in payloads:
+        key = (payload["child_id"], payload["lesson_id"])
+        row = progress.get(key) or Progress(child_id=key[0], lesson_id=key[1])
+        score = Decimal(payload["score"])
+        row.last_accessed = now
+        row.points_earned = max(row.points_earned, int(score))
+        if score * 100 >= PASS_SCORE * payload["max_score"]:
+            if row.status != Progress.Status.COMPLETED:
+                row.status = Progress.Status.COMPLETED
+                row.completion_date = now
+        elif row.status == Progress.Status.NOT_STARTED:
+            row.status = Progress.Status.IN_PROGRESS
+        row.save()
+        progress[key] = row
+
+    perfect = {
+        payload["child_id"]
+        for payload in payloads
+        if Decimal(payload["score"]) >= payload["max_score"]
+    }
+    badge_id = (
+        Badge.objects.filter(name=PERFECT_SCORE_BADGE)
+        .values_list("pk", flat=True)
+        .first()
+        if perfect
+        else None
+    )
+    if badge_id is not None:
+        ChildBadge.objects.bulk_create(
+            [ChildBadge(child_id=child_id, badge_id=badge_id) for child_id in perfect],
+            ignore_conflicts=True,
+        )
+
+    AuditLog.objects.bulk_create(
+        AuditLog(
+            user_id=payload["user_id"],
+            action="quiz_attempt_submitted",
+            meta={
+                "attempt_id": payload["attempt_id"],
+                "quiz_id": payload["quiz_id"],
+                "score": payload["score"],
+            },
+        )
+        for payload in payloads
+    )
@@ -1,3 +1,123 @@
-# from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ai.models import MLStudentMap, QuizAttemptsRaw
+from core import outbox
+from core.models import AuditLog, OutboxEvent
+from lessons.models import lesson
+from profiles.models import ChildProfile, TeacherProfile, User
+from progress.models import Badge, ChildBadge, Progress
+from quizzes.grading import grade
+from quizzes.models import Question, Quiz, QuizAttempt
+from quizzes.submission import TOPIC
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.quiz = Quiz.objects.create(
+            title="Counting",
+            lesson=lesson.objects.create(
+                title="Numbers", description="", video_url="https://x", teacher=teacher
+            ),
+        )
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz,
+                question_text=f"Q{order}",
+                options=["a", "b", "c"],
+                correct_option_index=order % 3,
+                order=order,
+            )
+            for order in range(3)
+        ]
+
+    def test_grades_from_cached_key(self):
+        self.assertEqual(grade(self.quiz.pk, [0, 1, 0]), (Decimal("66.67"), 2, 3))
+        with self.assertNumQueries(0):
+            self.assertEqual(grade(self.quiz.pk, [0, 1, 2])[1], 3)
+
+    def test_editing_a_question_refreshes_the_key(self):
+        grade(self.quiz.pk, [0, 1, 2])
+        question = self.questions[2]
+        question.correct_option_index = 0
+        question.save()
+
+        self.assertEqual(grade(self.quiz.pk, [0, 1, 2])[1], 2)
+
+
+class AttemptSubmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user("t@example.com", "t", "pw")
+        )
+        self.lesson = lesson.objects.create(
+            title="Shapes",
+            description="",
+            video_url="https://x",
+            teacher=teacher,
+            is_published=True,
+        )
+        self.quiz = Quiz.objects.create(title="Shapes", lesson=self.lesson)
+        for order in range(2):
+            Question.objects.create(
+                quiz=self.quiz,
+                question_text=f"Q{order}",
+                options=["a", "b"],
+                correct_option_index=order,
+                order=order,
+            )
+        self.child = ChildProfile.objects.create(
+            user=User.objects.create_user("c@example.com", "c", "pw"), age=6
+        )
+        self.client.force_login(self.child.user)
+
+    def post(self, quiz, key="attempt-1", answers=(0, 1)):
+        return self.client.post(
+            reverse("quizzes:attempt", args=[quiz.pk]),
+            {"answers": list(answers), "duration_seconds": 40},
+            content_type="application/json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retries_return_the_stored_attempt(self):
+        first = self.post(self.quiz)
+        retry = self.post(self.quiz, answers=(1, 1))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()["score"], 100.0)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()["id"], first.json()["id"])
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+        self.assertEqual(OutboxEvent.objects.filter(topic=TOPIC).count(), 1)
+
+        other = Quiz.objects.create(title="Colours", lesson=self.lesson)
+        self.assertEqual(self.post(other).status_code, 409)
+
+    def test_side_effects_run_when_the_outbox_is_drained(self):
+        MLStudentMap.objects.create(ml_student_id=7, child=self.child)
+        badge = Badge.objects.create(name="Perfect Score")
+        attempt_id = self.post(self.quiz).json()["id"]
+        self.assertFalse(Progress.objects.exists())
+
+        # The attempt and its lesson counters, then the counters of Progress.
+        self.assertEqual(outbox.drain(), (2, 0))
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(outbox.drain(), (0, 0))
+
+        progress = Progress.objects.get(child=self.child, lesson=self.lesson)
+        self.assertEqual(progress.status, Progress.Status.COMPLETED)
+        self.assertTrue(ChildBadge.objects.filter(child=self.child, badge=badge))
+        raw = QuizAttemptsRaw.objects.get(ml_student_id=7)
+        self.assertEqual((raw.attempt_number, raw.wrong_questions), (1, 0))
+        self.assertEqual(
+            AuditLog.objects.get(action="quiz_attempt_submitted").meta["attempt_id"],
+            attempt_id,
+        )
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from quizzes import views
+
+app_name = "quizzes"
+
+urlpatterns = [
+    path("quizzes/<int:pk>/attempt/", views.submit_attempt, name="attempt"),
+]
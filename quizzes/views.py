@@ -1,3 +1,70 @@
-# from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from core.ratelimit import rate_limit
+from profiles import access
+from quizzes.models import Quiz
+from quizzes.submission import IdempotencyConflict, submit
+
+
+def _parse_attempt(request):
+    """``(answers, duration_seconds, idempotency_key)``; raises ``ValueError``."""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        raise ValueError("Body must be a JSON object")
+    answers = data["answers"]
+    if not isinstance(answers, list) or not all(
+        isinstance(answer, int) for answer in answers
+    ):
+        raise ValueError("answers must be a list of option indices")
+    duration = data.get("duration_seconds")
+    if duration is not None:
+        duration = int(duration)
+        if duration < 1:
+            raise ValueError("duration_seconds must be positive")
+    key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        raise ValueError("An Idempotency-Key of up to 64 characters is required")
+    return answers, duration, key
+
+
+@require_POST
+@rate_limit("quiz_attempt")
+def submit_attempt(request, pk):
+    """
+    Grade and store an attempt at quiz ``pk``. Resubmitting with the same
+    ``Idempotency-Key`` returns the stored attempt with status 200.
+    """
+    child_id, error = access.child_id(request)
+    if error:
+        return error
+    quiz = get_object_or_404(
+        Quiz.objects.only("id", "lesson_id"), pk=pk, lesson__is_published=True
+    )
+    try:
+        answers, duration, key = _parse_attempt(request)
+    except (ValueError, KeyError, TypeError) as exc:
+        detail = str(exc) if isinstance(exc, ValueError) else "answers are required"
+        return JsonResponse({"detail": detail}, status=400)
+    try:
+        attempt, created = submit(
+            child_id, quiz, answers, key, duration_seconds=duration, user=request.user
+        )
+    except IdempotencyConflict:
+        return JsonResponse(
+            {"detail": "Idempotency-Key was used for another quiz"}, status=409
+        )
+    return JsonResponse(
+        {
+            "id": attempt.pk,
+            "quiz_id": quiz.pk,
+            "score": float(attempt.score),
+            "max_score": attempt.max_score,
+            "created_at": attempt.created_at,
+        },
+        status=201 if created else 200,
+    )